@@ -1,6 +1,7 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, FileResponse
+from starlette.background import BackgroundTask
 import csv
 import io
 from pydantic import BaseModel
@@ -14,15 +15,23 @@ import sys
 import uuid
 import time
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from urllib.parse import urlparse
 from playwright.async_api import async_playwright
-from collections import Counter
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor
 import functools
+import zlib
+import hashlib
+import tempfile
 from contextlib import asynccontextmanager
 
-from scraper import Scraper, DiffTracker
+from scraper import (
+    Scraper, DiffTracker, initialize_database, connection_pragmas, decompress_text,
+    PRUNE_PAGE_TEXTS_SQL, BUMP_WRITE_GENERATION_SQL, build_fts_query, build_file_search_query, page_domain,
+    ROLLUP_GRANULARITIES
+)
+import columnar_export
 import config
 
 os.environ['PYTHONUNBUFFERED'] = '1'
@@ -90,6 +99,18 @@ app.add_middleware(
 scraper_instance = None
 scraper_task = None
 
+@app.on_event("startup")
+async def prepare_database():
+    db_path = config.get_db_path()
+    os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+    await asyncio.get_running_loop().run_in_executor(None, initialize_database, db_path)
+
+@app.on_event("shutdown")
+async def close_database_pools():
+    for pool in list(db_pools.values()):
+        await pool.close()
+    db_pools.clear()
+
 
 websocket_connections = []
 websocket_lock = asyncio.Lock()
@@ -222,14 +243,188 @@ async def create_selector_finder_browser():
         finally:
             await browser.close()
 
-@asynccontextmanager
-async def get_db_connection():
-    conn = await aiosqlite.connect(config.get_db_path())
-    conn.row_factory = aiosqlite.Row
+# Requests borrow long-lived connections from a small pool instead of opening
+# a connection, and with it an aiosqlite thread, every time. Pragmas and the
+# page_text function are set up once per connection, and sqlite3's statement
+# cache keeps the dashboard's repeated queries prepared. The endpoints that
+# delete rows share one writer connection, so writes queue behind each other
+# instead of tying up readers. A pool belongs to the event loop it was created
+# on.
+class DatabasePool:
+    # _slots counts connections that may be handed out, open or not. A
+    # request waits on the semaphore rather than on the idle list, so a slot
+    # freed by a dropped or failed connection still wakes the next waiter.
+    def __init__(self, db_path: str, size: int, cached_statements: int):
+        self.db_path = db_path
+        self.size = size
+        self.cached_statements = cached_statements
+        self.loop = asyncio.get_running_loop()
+        self._slots = asyncio.Semaphore(size)
+        self._idle = []
+        self._connections = set()
+        self._writer = None
+        self._writer_lock = asyncio.Lock()
+    
+    async def _connect(self):
+        conn = await aiosqlite.connect(self.db_path, cached_statements=self.cached_statements)
+        conn.row_factory = aiosqlite.Row
+        for pragma in connection_pragmas():
+            await conn.execute(pragma)
+        await conn.create_function('page_text', 2, decompress_text, deterministic=True)
+        return conn
+    
+    @asynccontextmanager
+    async def acquire(self):
+        await self._slots.acquire()
+        try:
+            if self._idle:
+                conn = self._idle.pop()
+            else:
+                conn = await self._connect()
+                self._connections.add(conn)
+        except BaseException:
+            self._slots.release()
+            raise
+        
+        try:
+            yield conn
+        finally:
+            try:
+                if conn.in_transaction:
+                    await conn.rollback()
+            except Exception:
+                # A broken connection is dropped; its slot opens a new one
+                self._connections.discard(conn)
+                await self._close(conn)
+            else:
+                self._idle.append(conn)
+            finally:
+                self._slots.release()
+    
+    @asynccontextmanager
+    async def writer(self):
+        async with self._writer_lock:
+            if self._writer is None:
+                self._writer = await self._connect()
+            try:
+                yield self._writer
+            finally:
+                if self._writer.in_transaction:
+                    await self._writer.rollback()
+    
+    async def _close(self, conn):
+        try:
+            await conn.close()
+        except Exception:
+            pass
+    
+    async def close(self):
+        connections = list(self._connections) + ([self._writer] if self._writer else [])
+        self._connections.clear()
+        self._idle.clear()
+        self._writer = None
+        for conn in connections:
+            await self._close(conn)
+
+db_pools: Dict[str, DatabasePool] = {}
+
+def get_db_pool(db_path: Optional[str] = None) -> DatabasePool:
+    db_path = db_path or config.get_db_path()
+    pool = db_pools.get(db_path)
+    if pool is None or pool.loop is not asyncio.get_running_loop():
+        if pool is not None:
+            asyncio.ensure_future(pool.close())
+        pool = db_pools[db_path] = DatabasePool(
+            db_path, config.DATABASE['api_pool_size'], config.DATABASE['api_cached_statements']
+        )
+    return pool
+
+def get_db_connection():
+    return get_db_pool().acquire()
+
+def get_db_writer():
+    return get_db_pool().writer()
+
+# Dashboard polls hit the analytics endpoints every few seconds and each call
+# recomputes whole-table aggregates. Their JSON responses are cached per path
+# and query string together with the write generation they were computed at;
+# an entry is only served while the generation is unchanged, so new pages,
+# snapshots or deletes invalidate it on the next request. ttl_seconds caps an
+# entry's age regardless, for writes made outside the crawler, and the least
+# recently used entries are evicted past max_entries.
+class ResponseCache:
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0}
+    
+    def get(self, key: str, generation: int):
+        entry = self.entries.get(key)
+        if entry is None or entry['generation'] != generation or time.monotonic() - entry['stored'] > self.ttl_seconds:
+            self.stats['misses'] += 1
+            return None
+        self.entries.move_to_end(key)
+        self.stats['hits'] += 1
+        return entry
+    
+    def put(self, key: str, generation: int, body: bytes, media_type: str):
+        entry = {
+            'generation': generation,
+            'stored': time.monotonic(),
+            'body': body,
+            'media_type': media_type,
+            'etag': '"' + hashlib.sha1(body).hexdigest()[:20] + '"',
+        }
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return entry
+    
+    def clear(self):
+        self.entries.clear()
+
+response_cache = ResponseCache(config.DATABASE['api_cache_entries'], config.DATABASE['api_cache_ttl_seconds'])
+
+CACHED_PATHS = ('/api/data/stats', '/api/analytics/performance', '/api/diff/stats', '/api/analytics/rollups')
+CACHED_PATH_PREFIXES = ('/api/data/analytics/',)
+
+async def current_write_generation() -> Optional[int]:
     try:
-        yield conn
-    finally:
-        await conn.close()
+        async with get_db_connection() as conn:
+            cursor = await conn.execute('SELECT generation FROM write_generation WHERE id = 1')
+            row = await cursor.fetchone()
+            return row[0] if row else None
+    except Exception:
+        return None
+
+def cached_entry_response(entry, request: Request) -> Response:
+    headers = {'ETag': entry['etag'], 'Cache-Control': 'no-cache'}
+    if request.headers.get('if-none-match') == entry['etag']:
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry['body'], media_type=entry['media_type'], headers=headers)
+
+@app.middleware("http")
+async def cache_analytics_responses(request: Request, call_next):
+    path = request.url.path
+    if request.method != 'GET' or not (path in CACHED_PATHS or path.startswith(CACHED_PATH_PREFIXES)):
+        return await call_next(request)
+    
+    generation = await current_write_generation()
+    if generation is None:
+        return await call_next(request)
+    
+    key = f"{path}?{request.url.query}"
+    entry = response_cache.get(key, generation)
+    if entry is None:
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+        body = b''.join([chunk async for chunk in response.body_iterator])
+        entry = response_cache.put(key, generation, body, response.media_type or response.headers.get('content-type'))
+    
+    return cached_entry_response(entry, request)
 
 async def generate_robust_selectors(page, element) -> list:
     selectors = []
@@ -502,6 +697,10 @@ class ScraperConfig(BaseModel):
     success_indicator: Optional[str] = None
     manual_login_mode: Optional[bool] = False
     smart_scroll_iterations: Optional[int] = 5
+    frontier: Optional[str] = None
+    frontier_scoring: Optional[str] = None
+    resume_crawl: Optional[bool] = None
+    worker_processes: Optional[int] = None
     captcha_enabled: bool = True
     captcha_pause_workers: bool = True
     captcha_sound_alert: bool = True
@@ -547,6 +746,13 @@ class SearchRequest(BaseModel):
     keyword: str
     limit: Optional[int] = 20
 
+class FileSearchRequest(SearchRequest):
+    extension: Optional[str] = None
+    status: Optional[str] = None
+    min_size: Optional[int] = None
+    max_size: Optional[int] = None
+    domain: Optional[str] = None
+
 
 async def broadcast_message(message: dict, connection_type: str = "scraper"):
     target_connections = websocket_connections if connection_type == "scraper" else diff_subscribers
@@ -631,6 +837,10 @@ async def start_scraper(config_data: ScraperConfig):
         download_file_assets=config_data.download_file_assets,
         max_file_size_mb=config_data.max_file_size_mb,
         smart_scroll_iterations=config_data.smart_scroll_iterations,
+        frontier=config_data.frontier,
+        frontier_scoring=config_data.frontier_scoring,
+        resume_crawl=config_data.resume_crawl,
+        worker_processes=config_data.worker_processes,
         login_url=config_data.login_url,
         username=config_data.username,
         password=config_data.password,
@@ -703,7 +913,7 @@ async def get_scraper_status():
     is_paused = getattr(scraper_instance, 'is_paused', False)
     
     pages_scraped = scraper_instance.pages_scraped
-    queue_size = len(scraper_instance.queue)
+    queue_size = len(scraper_instance.frontier)
     visited_count = len(scraper_instance.visited)
     max_pages = scraper_instance.max_pages
     downloads = scraper_instance.downloads_stats if hasattr(scraper_instance, 'downloads_stats') else {}
@@ -712,36 +922,25 @@ async def get_scraper_status():
     concurrent_limit = scraper_instance.concurrent_limit
     authenticated = bool(scraper_instance.storage_state) if hasattr(scraper_instance, 'storage_state') else False
     
-    def fetch_db_data():
-        recent_pages = []
-        recent_files = []
-        file_types = {}
-        total_pages_in_db = 0
-        conn = None
-        
-        try:
-            conn = sqlite3.connect(scraper_instance.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute('SELECT COUNT(*) as count FROM pages')
-            total_pages_in_db = cursor.fetchone()['count']
+    all_pages = []
+    all_files = []
+    total_pages_in_db = 0
+    
+    try:
+        async with get_db_pool(scraper_instance.db_path).acquire() as conn:
+            cursor = await conn.execute('SELECT COUNT(*) as count FROM pages')
+            total_pages_in_db = (await cursor.fetchone())['count']
             
-            cursor.execute('''
+            cursor = await conn.execute('''
                 SELECT id, url, title, depth, datetime(timestamp, 'unixepoch') as scraped_at
                 FROM pages
                 ORDER BY timestamp DESC
                 LIMIT 50
             ''')
-            all_pages = [dict(row) for row in cursor.fetchall()]
-            
-            if hasattr(scraper_instance, 'visited') and is_running:
-                recent_pages = [p for p in all_pages if p['url'] in scraper_instance.visited][:20]
-            else:
-                recent_pages = all_pages[:20]
+            all_pages = [dict(row) for row in await cursor.fetchall()]
             
             try:
-                cursor.execute('''
+                cursor = await conn.execute('''
                     SELECT fa.file_name, fa.file_extension, fa.file_size_bytes,
                            fa.download_status, p.url as page_url,
                            datetime(fa.download_timestamp, 'unixepoch') as downloaded_at
@@ -750,41 +949,29 @@ async def get_scraper_status():
                     ORDER BY fa.download_timestamp DESC
                     LIMIT 30
                 ''')
-                all_files = [dict(row) for row in cursor.fetchall()]
-                
-                if hasattr(scraper_instance, 'visited') and is_running:
-                    recent_files = [f for f in all_files if f['page_url'] in scraper_instance.visited][:15]
-                else:
-                    recent_files = all_files[:15]
-                
-                file_type_counts = {}
-                for f in recent_files:
-                    if f['download_status'] == 'success':
-                        ext = f['file_extension']
-                        file_type_counts[ext] = file_type_counts.get(ext, 0) + 1
-                file_types = file_type_counts
+                all_files = [dict(row) for row in await cursor.fetchall()]
             except sqlite3.OperationalError:
                 pass
-            
-        except Exception as e:
-            logger.error(f"Error fetching DB data in status: {e}")
-        finally:
-            if conn:
-                conn.close()
-        
-        return recent_pages, recent_files, file_types, total_pages_in_db
+    except Exception as e:
+        logger.error(f"Error fetching DB data in status: {e}")
     
-    try:
-        loop = asyncio.get_event_loop()
-        recent_pages, recent_files, file_types, total_pages_in_db = await loop.run_in_executor(
-            db_executor, fetch_db_data
+    # One batched lookup against the crawl's visited index; the scraper runs
+    # it on the frontier's own thread when the frontier is disk-backed.
+    if hasattr(scraper_instance, 'known_urls') and is_running:
+        known = await scraper_instance.known_urls(
+            [p['url'] for p in all_pages] + [f['page_url'] for f in all_files]
         )
-    except Exception as e:
-        logger.error(f"Error in executor: {e}")
-        recent_pages = []
-        recent_files = []
-        file_types = {}
-        total_pages_in_db = 0
+        recent_pages = [p for p in all_pages if p['url'] in known][:20]
+        recent_files = [f for f in all_files if f['page_url'] in known][:15]
+    else:
+        recent_pages = all_pages[:20]
+        recent_files = all_files[:15]
+    
+    file_types = {}
+    for f in recent_files:
+        if f['download_status'] == 'success':
+            ext = f['file_extension']
+            file_types[ext] = file_types.get(ext, 0) + 1
     
     if total_pages_in_db == 0 and not is_running:
         return {
@@ -821,6 +1008,7 @@ async def get_scraper_status():
         "authenticated": authenticated,
         "was_stopped": was_stopped,
         "file_types": file_types,
+        "visited_memory": scraper_instance.visited_memory_stats(),
         "session_id": session_id
     }
 
@@ -894,50 +1082,21 @@ async def resume_scraper():
 @app.get("/api/data/stats")
 async def get_stats():
     async with get_db_connection() as conn:
-        cursor = await conn.cursor()
-        
-        stats = {}
-        
-        await cursor.execute('SELECT COUNT(*) FROM pages')
-        stats['total_pages'] = (await cursor.fetchone())[0]
-        
-        await cursor.execute('SELECT COUNT(*) FROM links')
-        stats['total_links'] = (await cursor.fetchone())[0]
-        
-        await cursor.execute('SELECT COUNT(*) FROM links WHERE link_type = "internal"')
-        stats['internal_links'] = (await cursor.fetchone())[0]
-        
-        await cursor.execute('SELECT COUNT(*) FROM links WHERE link_type = "external"')
-        stats['external_links'] = (await cursor.fetchone())[0]
-        
-        await cursor.execute('SELECT COUNT(*) FROM media')
-        stats['total_media'] = (await cursor.fetchone())[0]
+        cursor = await conn.execute('SELECT * FROM crawl_counters WHERE id = 1')
+        counters = await cursor.fetchone()
         
-        await cursor.execute('SELECT COUNT(*) FROM headers')
-        stats['total_headers'] = (await cursor.fetchone())[0]
-        
-        try:
-            await cursor.execute('SELECT COUNT(*) FROM file_assets')
-            stats['total_file_assets'] = (await cursor.fetchone())[0]
-            
-            await cursor.execute('SELECT COUNT(*) FROM file_assets WHERE download_status = "success"')
-            stats['successful_downloads'] = (await cursor.fetchone())[0]
-            
-            await cursor.execute('SELECT COUNT(*) FROM file_assets WHERE download_status = "failed"')
-            stats['failed_downloads'] = (await cursor.fetchone())[0]
-            
-            await cursor.execute('SELECT SUM(file_size_bytes) FROM file_assets WHERE download_status = "success"')
-            result = await cursor.fetchone()
-            total_bytes = result[0] if result[0] else 0
-            stats['total_download_size_mb'] = total_bytes / (1024 * 1024)
-            
-        except aiosqlite.OperationalError:
-            stats['total_file_assets'] = 0
-            stats['successful_downloads'] = 0
-            stats['failed_downloads'] = 0
-            stats['total_download_size_mb'] = 0
-        
-        return stats
+        return {
+            'total_pages': counters['total_pages'],
+            'total_links': counters['total_links'],
+            'internal_links': counters['internal_links'],
+            'external_links': counters['external_links'],
+            'total_media': counters['total_media'],
+            'total_headers': counters['total_headers'],
+            'total_file_assets': counters['total_file_assets'],
+            'successful_downloads': counters['successful_downloads'],
+            'failed_downloads': counters['failed_downloads'],
+            'total_download_size_mb': counters['downloaded_bytes'] / (1024 * 1024),
+        }
 
 @handle_api_errors
 @app.get("/api/data/pages")
@@ -972,35 +1131,13 @@ async def get_scraped_urls():
         cursor = await conn.cursor()
     
         await cursor.execute('''
-            SELECT url, timestamp FROM pages ORDER BY timestamp DESC
+            SELECT domain AS start_url, total_pages AS page_count,
+                   start_time AS first_scraped, end_time AS last_scraped
+            FROM crawl_sessions
+            ORDER BY end_time DESC
         ''')
         
-        pages = await cursor.fetchall()
-        domains = {}
-        
-        for page in pages:
-            try:
-                parsed = urlparse(page['url'])
-                domain = f"{parsed.scheme}://{parsed.netloc}"
-                
-                if domain not in domains:
-                    domains[domain] = {
-                        'start_url': domain,
-                        'page_count': 0,
-                        'first_scraped': page['timestamp'],
-                        'last_scraped': page['timestamp']
-                    }
-                
-                domains[domain]['page_count'] += 1
-                if page['timestamp'] < domains[domain]['first_scraped']:
-                    domains[domain]['first_scraped'] = page['timestamp']
-                if page['timestamp'] > domains[domain]['last_scraped']:
-                    domains[domain]['last_scraped'] = page['timestamp']
-            except:
-                continue
-        
-        urls = list(domains.values())
-        urls.sort(key=lambda x: x['last_scraped'], reverse=True)
+        urls = [dict(row) for row in await cursor.fetchall()]
         
         return {"urls": urls}
 
@@ -1010,67 +1147,15 @@ async def get_scraping_sessions():
     async with get_db_connection() as conn:
         cursor = await conn.cursor()
     
-        await cursor.execute('SELECT url, timestamp, depth FROM pages ORDER BY timestamp DESC')
-        pages = await cursor.fetchall()
-        
-        domains = {}
-        for page in pages:
-            try:
-                parsed = urlparse(page['url'])
-                domain = f"{parsed.scheme}://{parsed.netloc}"
-                
-                if domain not in domains:
-                    domains[domain] = {
-                        'domain': domain,
-                        'total_pages': 0,
-                        'start_time': page['timestamp'],
-                        'end_time': page['timestamp'],
-                        'depths': [],
-                        'page_ids': []
-                    }
-                
-                domains[domain]['total_pages'] += 1
-                domains[domain]['depths'].append(page['depth'])
-                if page['timestamp'] < domains[domain]['start_time']:
-                    domains[domain]['start_time'] = page['timestamp']
-                if page['timestamp'] > domains[domain]['end_time']:
-                    domains[domain]['end_time'] = page['timestamp']
-            except:
-                continue
-        
-        sessions = []
-        for domain, data in domains.items():
-            await cursor.execute('SELECT id FROM pages WHERE url LIKE ?', (f'{domain}%',))
-            page_ids = [row['id'] for row in await cursor.fetchall()]
-            
-            if page_ids:
-                placeholders = ','.join('?' * len(page_ids))
-                await cursor.execute(f'SELECT COUNT(*) as count FROM links WHERE page_id IN ({placeholders})', page_ids)
-                result = await cursor.fetchone()
-                total_links = result['count']
-                
-                await cursor.execute(f'SELECT COUNT(*) as count, SUM(file_size_bytes) as total_size FROM file_assets WHERE page_id IN ({placeholders})', page_ids)
-                file_data = await cursor.fetchone()
-                total_files = file_data['count']
-                total_size = file_data['total_size'] or 0
-            else:
-                total_links = 0
-                total_files = 0
-                total_size = 0
-            
-            sessions.append({
-                'domain': domain,
-                'total_pages': data['total_pages'],
-                'start_time': data['start_time'],
-                'end_time': data['end_time'],
-                'avg_depth': sum(data['depths']) / len(data['depths']) if data['depths'] else 0,
-                'max_depth': max(data['depths']) if data['depths'] else 0,
-                'total_links': total_links,
-                'total_files': total_files,
-                'total_size': total_size
-            })
+        await cursor.execute('''
+            SELECT domain, total_pages, start_time, end_time,
+                   CAST(depth_sum AS REAL) / total_pages AS avg_depth, max_depth,
+                   total_links, total_files, total_size
+            FROM crawl_sessions
+            ORDER BY end_time DESC
+        ''')
         
-        sessions.sort(key=lambda x: x['end_time'], reverse=True)
+        sessions = [dict(row) for row in await cursor.fetchall()]
         
         return {"sessions": sessions}
 
@@ -1082,24 +1167,27 @@ async def get_session_details(domain: str):
     
         await cursor.execute('''
             SELECT 
-                COUNT(*) as total_pages,
-                MIN(timestamp) as start_time,
-                MAX(timestamp) as end_time,
-                AVG(depth) as avg_depth,
-                MAX(depth) as max_depth
-            FROM pages
-            WHERE url LIKE ?
-        ''', (f'{domain}%',))
-        
-        overview = dict(await cursor.fetchone())
+                total_pages,
+                start_time,
+                end_time,
+                CAST(depth_sum AS REAL) / total_pages AS avg_depth,
+                max_depth
+            FROM crawl_sessions
+            WHERE domain = ?
+        ''', (domain,))
+        
+        row = await cursor.fetchone()
+        overview = dict(row) if row else {
+            "total_pages": 0, "start_time": None, "end_time": None, "avg_depth": None, "max_depth": None
+        }
         
         await cursor.execute('''
             SELECT depth, COUNT(*) as count
             FROM pages
-            WHERE url LIKE ?
+            WHERE domain = ?
             GROUP BY depth
             ORDER BY depth
-        ''', (f'{domain}%',))
+        ''', (domain,))
         
         depth_distribution = [dict(row) for row in await cursor.fetchall()]
         
@@ -1111,19 +1199,19 @@ async def get_session_details(domain: str):
                 fa.download_status
             FROM file_assets fa
             JOIN pages p ON fa.page_id = p.id
-            WHERE p.url LIKE ?
+            WHERE p.domain = ?
             GROUP BY fa.file_extension, fa.download_status
-        ''', (f'{domain}%',))
+        ''', (domain,))
         
         file_stats = [dict(row) for row in await cursor.fetchall()]
         
         await cursor.execute('''
             SELECT id, url, title, depth, timestamp
             FROM pages
-            WHERE url LIKE ?
+            WHERE domain = ?
             ORDER BY timestamp DESC
             LIMIT 10
-        ''', (f'{domain}%',))
+        ''', (domain,))
         
         recent_pages = [dict(row) for row in await cursor.fetchall()]
         
@@ -1138,10 +1226,10 @@ async def get_session_details(domain: str):
 @handle_api_errors
 @app.delete("/api/history/session/{domain:path}")
 async def delete_session(domain: str):
-    async with get_db_connection() as conn:
+    async with get_db_writer() as conn:
         cursor = await conn.cursor()
     
-        await cursor.execute('SELECT id FROM pages WHERE url LIKE ?', (f'{domain}%',))
+        await cursor.execute('SELECT id FROM pages WHERE domain = ?', (domain,))
         page_ids = [row[0] for row in await cursor.fetchall()]
         
         if page_ids:
@@ -1152,6 +1240,8 @@ async def delete_session(domain: str):
             await cursor.execute(f'DELETE FROM media WHERE page_id IN ({placeholders})', page_ids)
             await cursor.execute(f'DELETE FROM file_assets WHERE page_id IN ({placeholders})', page_ids)
             await cursor.execute(f'DELETE FROM pages WHERE id IN ({placeholders})', page_ids)
+            await cursor.execute(PRUNE_PAGE_TEXTS_SQL)
+            await cursor.execute(BUMP_WRITE_GENERATION_SQL)
             
             await conn.commit()
         
@@ -1164,56 +1254,33 @@ async def get_history_statistics():
     async with get_db_connection() as conn:
         cursor = await conn.cursor()
     
-        await cursor.execute('SELECT url FROM pages')
-        pages = await cursor.fetchall()
-        unique_domains = set()
-        for page in pages:
-            try:
-                parsed = urlparse(page['url'])
-                domain = f"{parsed.scheme}://{parsed.netloc}"
-                unique_domains.add(domain)
-            except:
-                continue
-        total_sessions = len(unique_domains)
-        
-        await cursor.execute('SELECT COUNT(*) as total_pages FROM pages')
-        result = await cursor.fetchone()
-        total_pages = result['total_pages']
-        
-        await cursor.execute('SELECT COUNT(*) as total_files FROM file_assets WHERE download_status = "success"')
-        result = await cursor.fetchone()
-        total_files = result['total_files']
-        
-        await cursor.execute('SELECT SUM(file_size_bytes) as total_size FROM file_assets WHERE download_status = "success"')
-        result = await cursor.fetchone()
-        total_size = result['total_size'] or 0
-        
         await cursor.execute('''
-            SELECT date(timestamp, 'unixepoch') as date, COUNT(*) as count
-            FROM pages
-            GROUP BY date
-            ORDER BY count DESC
-            LIMIT 1
+            SELECT COUNT(*) as total_sessions,
+                   coalesce(SUM(total_pages), 0) as total_pages,
+                   coalesce(SUM(downloaded_files), 0) as total_files,
+                   coalesce(SUM(downloaded_size), 0) as total_size,
+                   coalesce(AVG(end_time - start_time), 0) as avg_duration
+            FROM crawl_sessions
         ''')
-        most_active = await cursor.fetchone()
+        totals = await cursor.fetchone()
         
         await cursor.execute('''
-            SELECT url, MIN(timestamp) as min_time, MAX(timestamp) as max_time
-            FROM pages
-            GROUP BY SUBSTR(url, 1, INSTR(SUBSTR(url, 9), '/') + 8)
+            SELECT date(bucket, 'unixepoch') as date, pages as count
+            FROM crawl_rollups
+            WHERE granularity = 'day' AND pages > 0
+            ORDER BY pages DESC
+            LIMIT 1
         ''')
-        sessions = await cursor.fetchall()
-        durations = [s['max_time'] - s['min_time'] for s in sessions if s['max_time'] and s['min_time']]
-        avg_duration = sum(durations) / len(durations) if durations else 0
+        most_active = await cursor.fetchone()
         
         
         return {
-            "total_sessions": total_sessions,
-            "total_pages": total_pages,
-            "total_files": total_files,
-            "total_size_mb": total_size / (1024 * 1024),
+            "total_sessions": totals['total_sessions'],
+            "total_pages": totals['total_pages'],
+            "total_files": totals['total_files'],
+            "total_size_mb": totals['total_size'] / (1024 * 1024),
             "most_active_day": dict(most_active) if most_active else None,
-            "avg_session_duration_seconds": avg_duration
+            "avg_session_duration_seconds": totals['avg_duration']
     }
 
 @handle_api_errors
@@ -1221,19 +1288,13 @@ async def get_history_statistics():
 async def get_pages_by_url(start_url: str):
     async with get_db_connection() as conn:
         cursor = await conn.cursor()
-    
-        try:
-            parsed = urlparse(start_url)
-            domain_pattern = f"{parsed.scheme}://{parsed.netloc}%"
-        except:
-            domain_pattern = f"{start_url}%"
         
         await cursor.execute('''
             SELECT id, url, title, depth, datetime(timestamp, 'unixepoch') as scraped_at
             FROM pages
-            WHERE url LIKE ?
+            WHERE domain = ?
             ORDER BY timestamp DESC
-        ''', (domain_pattern,))
+        ''', (page_domain(start_url),))
         
         pages = [dict(row) for row in await cursor.fetchall()]
         
@@ -1272,6 +1333,18 @@ async def get_page_details(page_id: int):
         
         page_dict = dict(page)
         
+        await cursor.execute(
+            'SELECT page_text(codec, data) FROM page_texts WHERE hash = ?', (page_dict['text_hash'],)
+        )
+        text_row = await cursor.fetchone()
+        page_dict['full_text'] = text_row[0] if text_row else None
+        
+        await cursor.execute(
+            'SELECT fingerprint FROM fingerprints WHERE id = ?', (page_dict['fingerprint_id'],)
+        )
+        fingerprint_row = await cursor.fetchone()
+        page_dict['fingerprint'] = fingerprint_row[0] if fingerprint_row else None
+        
         await cursor.execute('SELECT * FROM headers WHERE page_id = ?', (page_id,))
         page_dict['headers'] = [dict(row) for row in await cursor.fetchall()]
         
@@ -1399,9 +1472,11 @@ async def get_performance_analytics():
         cursor = await conn.cursor()
     
         await cursor.execute("""
-            SELECT proxy_used, COUNT(*) as page_count
-            FROM pages
-            GROUP BY proxy_used
+            SELECT nullif(value, '') as proxy_used, SUM(pages) as page_count
+            FROM crawl_dimension_rollups
+            WHERE granularity = 'day' AND dimension = 'proxy'
+            GROUP BY value
+            HAVING page_count > 0
             ORDER BY page_count DESC
         """)
         proxy_data = await cursor.fetchall()
@@ -1416,10 +1491,12 @@ async def get_performance_analytics():
             })
         
         await cursor.execute("""
-            SELECT depth, COUNT(*) as page_count
-            FROM pages
-            GROUP BY depth
-            ORDER BY depth
+            SELECT nullif(value, '') as depth, SUM(pages) as page_count
+            FROM crawl_dimension_rollups
+            WHERE granularity = 'day' AND dimension = 'depth'
+            GROUP BY value
+            HAVING page_count > 0
+            ORDER BY value
         """)
         depth_data = await cursor.fetchall()
         total_depth_pages = sum(row['page_count'] for row in depth_data)
@@ -1432,12 +1509,12 @@ async def get_performance_analytics():
                 'percentage': (row['page_count'] / total_depth_pages * 100) if total_depth_pages > 0 else 0
             })
         
+        # Separate subqueries so each of MIN and MAX is one index lookup
         await cursor.execute("""
             SELECT 
-                MIN(timestamp) as start_time,
-                MAX(timestamp) as end_time,
-                COUNT(*) as total_pages
-            FROM pages
+                (SELECT MIN(timestamp) FROM pages) as start_time,
+                (SELECT MAX(timestamp) FROM pages) as end_time,
+                (SELECT total_pages FROM crawl_counters WHERE id = 1) as total_pages
         """)
         timeline_row = await cursor.fetchone()
         
@@ -1458,17 +1535,21 @@ async def get_performance_analytics():
                 timeline['pages_per_minute'] = (timeline_row['total_pages'] / duration) * 60
         
         if timeline_row['start_time']:
+            # Minutes are counted from the clock minute of the first page; only
+            # the most recent window is returned, so the read stays bounded
+            # however long the history is
+            first_minute = int(timeline_row['start_time'] // 60) * 60
+            last_minute = int(timeline_row['end_time'] // 60) * 60
+            window_start = max(first_minute, last_minute - (config.DATABASE['minute_breakdown_minutes'] - 1) * 60)
             await cursor.execute("""
-                SELECT 
-                    CAST((timestamp - ?) / 60 AS INTEGER) as minute_bucket,
-                    COUNT(*) as page_count
-                FROM pages
-                GROUP BY minute_bucket
-                ORDER BY minute_bucket
-            """, (timeline_row['start_time'],))
+                SELECT bucket, pages
+                FROM crawl_rollups
+                WHERE granularity = 'minute' AND bucket >= ? AND pages > 0
+                ORDER BY bucket
+            """, (window_start,))
             
             timeline['pages_per_minute_breakdown'] = [
-                {'minute': row['minute_bucket'], 'count': row['page_count']}
+                {'minute': (row['bucket'] - first_minute) // 60, 'count': row['pages']}
                 for row in await cursor.fetchall()
             ]
         else:
@@ -1481,16 +1562,81 @@ async def get_performance_analytics():
             "timeline": timeline
         }
 
+@handle_api_errors
+@app.get("/api/analytics/rollups")
+async def get_rollups(granularity: str = 'hour', start_time: Optional[float] = None,
+                      end_time: Optional[float] = None, limit: int = 500):
+    if granularity not in ROLLUP_GRANULARITIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown granularity '{granularity}', expected one of {', '.join(ROLLUP_GRANULARITIES)}"
+        )
+    
+    async with get_db_connection() as conn:
+        cursor = await conn.cursor()
+    
+        conditions = ['granularity = ?']
+        params = [granularity]
+        if start_time is not None:
+            conditions.append('bucket >= ?')
+            params.append(start_time)
+        if end_time is not None:
+            conditions.append('bucket <= ?')
+            params.append(end_time)
+        
+        await cursor.execute(f'''
+            SELECT bucket, pages, files, downloaded_bytes, failed_downloads
+            FROM crawl_rollups
+            WHERE {' AND '.join(conditions)}
+            ORDER BY bucket DESC
+            LIMIT ?
+        ''', (*params, limit))
+        buckets = [dict(row) for row in await cursor.fetchall()]
+        
+        if buckets:
+            await cursor.execute('''
+                SELECT bucket, nullif(value, '') as proxy, pages as page_count
+                FROM crawl_dimension_rollups
+                WHERE granularity = ? AND dimension = 'proxy' AND bucket BETWEEN ? AND ? AND pages > 0
+                ORDER BY page_count DESC
+            ''', (granularity, buckets[-1]['bucket'], buckets[0]['bucket']))
+            proxies = {}
+            for row in await cursor.fetchall():
+                proxies.setdefault(row['bucket'], []).append({'proxy': row['proxy'], 'page_count': row['page_count']})
+            for bucket in buckets:
+                bucket['proxy_stats'] = proxies.get(bucket['bucket'], [])
+        
+        buckets.reverse()
+        return {"granularity": granularity, "bucket_seconds": ROLLUP_GRANULARITIES[granularity], "buckets": buckets}
+
 @handle_api_errors
 @app.get("/api/analytics/fingerprints")
 async def get_fingerprint_analytics():
     async with get_db_connection() as conn:
         cursor = await conn.cursor()
     
-        await cursor.execute("SELECT fingerprint FROM pages WHERE fingerprint IS NOT NULL")
-        rows = await cursor.fetchall()
+        # Pages are counted per fingerprint_id from the index first, so each
+        # breakdown groups the small fingerprints table rather than pages
+        usage = """
+            WITH usage AS (
+                SELECT fingerprint_id, COUNT(*) as pages
+                FROM pages
+                WHERE fingerprint_id IS NOT NULL
+                GROUP BY fingerprint_id
+            )
+        """
+        await cursor.execute(f"""
+            {usage}
+            SELECT coalesce(SUM(pages), 0) as total_pages,
+                   (SELECT COUNT(*) FROM (
+                       SELECT DISTINCT f.timezone_id, f.viewport, f.locale
+                       FROM usage u JOIN fingerprints f ON f.id = u.fingerprint_id
+                   )) as unique_combinations
+            FROM usage
+        """)
+        totals = await cursor.fetchone()
         
-        if not rows:
+        if not totals['total_pages']:
             return {
                 "timezones": [],
                 "viewports": [],
@@ -1500,34 +1646,30 @@ async def get_fingerprint_analytics():
                 "total_pages": 0
             }
         
-        fingerprints = [json.loads(row['fingerprint']) for row in rows]
-        
-        timezones = [fp['timezone_id'] for fp in fingerprints]
-        viewports = [f"{fp['viewport']['width']}x{fp['viewport']['height']}" for fp in fingerprints]
-        user_agents = [
-            fp['user_agent'].split('Chrome/')[1].split()[0] if 'Chrome/' in fp['user_agent'] else 'Unknown'
-            for fp in fingerprints
-        ]
-        locales = [fp['locale'] for fp in fingerprints]
-        
-        unique_combinations = len(set(
-            (fp['timezone_id'], 
-            f"{fp['viewport']['width']}x{fp['viewport']['height']}", 
-            fp['locale'])
-            for fp in fingerprints
-        ))
+        breakdowns = {}
+        for key, column in [('timezones', 'timezone_id'), ('viewports', 'viewport'),
+                            ('user_agents', 'chrome_version'), ('locales', 'locale')]:
+            await cursor.execute(f"""
+                {usage}
+                SELECT f.{column} as name, SUM(u.pages) as count
+                FROM usage u
+                JOIN fingerprints f ON f.id = u.fingerprint_id
+                GROUP BY f.{column}
+                ORDER BY count DESC, name
+            """)
+            breakdowns[key] = [dict(row) for row in await cursor.fetchall()]
         
-        diversity_score = (unique_combinations / len(fingerprints) * 100) if fingerprints else 0
+        for user_agent in breakdowns['user_agents']:
+            user_agent['name'] = f"Chrome {user_agent['name']}"
+        
+        diversity_score = totals['unique_combinations'] / totals['total_pages'] * 100
         
         
         return {
-            "timezones": [{'name': tz, 'count': count} for tz, count in Counter(timezones).most_common()],
-            "viewports": [{'name': vp, 'count': count} for vp, count in Counter(viewports).most_common()],
-            "user_agents": [{'name': f"Chrome {ua}", 'count': count} for ua, count in Counter(user_agents).most_common()],
-            "locales": [{'name': locale, 'count': count} for locale, count in Counter(locales).most_common()],
+            **breakdowns,
             "diversity_score": round(diversity_score, 1),
-            "total_pages": len(fingerprints),
-            "unique_combinations": unique_combinations
+            "total_pages": totals['total_pages'],
+            "unique_combinations": totals['unique_combinations']
         }
 
 @handle_api_errors
@@ -1536,49 +1678,31 @@ async def get_geolocation_analytics():
     async with get_db_connection() as conn:
         cursor = await conn.cursor()
     
-        await cursor.execute("SELECT fingerprint FROM pages WHERE fingerprint IS NOT NULL")
+        await cursor.execute("""
+            SELECT f.city, SUM(u.pages) as count
+            FROM (
+                SELECT fingerprint_id, COUNT(*) as pages
+                FROM pages
+                WHERE fingerprint_id IS NOT NULL
+                GROUP BY fingerprint_id
+            ) u
+            JOIN fingerprints f ON f.id = u.fingerprint_id
+            WHERE f.city IS NOT NULL
+            GROUP BY f.city
+            ORDER BY count DESC, f.city
+        """)
         rows = await cursor.fetchall()
-        
-        if not rows:
-            return {"locations": [], "total_pages": 0}
-        
-        fingerprints = [json.loads(row['fingerprint']) for row in rows]
-        
-        city_map = {
-            (40.7128, -74.0060): "New York",
-            (34.0522, -118.2437): "Los Angeles",
-            (51.5074, -0.1278): "London",
-            (48.8566, 2.3522): "Paris",
-            (35.6762, 139.6503): "Tokyo",
-            (52.5200, 13.4050): "Berlin",
-            (37.7749, -122.4194): "San Francisco",
-            (41.8781, -87.6298): "Chicago",
-            (43.6532, -79.3832): "Toronto",
-            (-33.8688, 151.2093): "Sydney",
-        }
-        
-        locations = []
-        for fp in fingerprints:
-            lat = fp['geolocation']['latitude']
-            lon = fp['geolocation']['longitude']
-            
-            for coords, city in city_map.items():
-                if abs(coords[0] - lat) < 0.1 and abs(coords[1] - lon) < 0.1:
-                    locations.append(city)
-                    break
-        
-        location_counts = Counter(locations)
-        total = len(locations)
+        total = sum(row['count'] for row in rows)
         
         
         return {
             "locations": [
                 {
-                    'city': city,
-                    'count': count,
-                    'percentage': (count / total * 100) if total > 0 else 0
+                    'city': row['city'],
+                    'count': row['count'],
+                    'percentage': (row['count'] / total * 100) if total > 0 else 0
                 }
-                for city, count in location_counts.most_common()
+                for row in rows
             ],
             "total_pages": total
         }
@@ -1586,17 +1710,23 @@ async def get_geolocation_analytics():
 @handle_api_errors
 @app.post("/api/data/search/content")
 async def search_content(request: SearchRequest):
+    fts_query = build_fts_query(request.keyword)
+    if fts_query is None:
+        return {"keyword": request.keyword, "results": [], "total": 0}
+    
     async with get_db_connection() as conn:
         cursor = await conn.cursor()
     
         await cursor.execute('''
-            SELECT url, title, 
-                substr(full_text, 1, 200) as preview
-            FROM pages
-            WHERE full_text LIKE ?
-            ORDER BY timestamp DESC
+            SELECT p.id, p.url, p.title,
+                snippet(pages_fts, 1, '<mark>', '</mark>', '…', 24) as preview,
+                bm25(pages_fts, 10.0, 1.0) as rank
+            FROM pages_fts
+            JOIN pages p ON p.id = pages_fts.rowid
+            WHERE pages_fts MATCH ?
+            ORDER BY rank
             LIMIT ?
-        ''', (f'%{request.keyword}%', request.limit))
+        ''', (fts_query, request.limit))
         
         results = [dict(row) for row in await cursor.fetchall()]
         
@@ -1608,20 +1738,20 @@ async def search_content(request: SearchRequest):
 
 @handle_api_errors
 @app.post("/api/data/search/files")
-async def search_files(request: SearchRequest):
+async def search_files(request: FileSearchRequest):
+    sql, params = build_file_search_query(
+        keyword=request.keyword,
+        extension=request.extension,
+        status=request.status,
+        min_size=request.min_size,
+        max_size=request.max_size,
+        domain=request.domain,
+        limit=request.limit
+    )
+    
     async with get_db_connection() as conn:
         cursor = await conn.cursor()
-    
-        await cursor.execute('''
-            SELECT fa.file_name, fa.file_extension, fa.file_size_bytes,
-                fa.download_status, fa.local_path, p.url as page_url,
-                datetime(fa.download_timestamp, 'unixepoch') as downloaded_at
-            FROM file_assets fa
-            JOIN pages p ON fa.page_id = p.id
-            WHERE fa.file_name LIKE ?
-            ORDER BY fa.download_timestamp DESC
-            LIMIT ?
-        ''', (f'%{request.keyword}%', request.limit))
+        await cursor.execute(sql, params)
         
         results = [dict(row) for row in await cursor.fetchall()]
         
@@ -1633,40 +1763,91 @@ async def search_files(request: SearchRequest):
 
 @handle_api_errors
 @app.get("/api/data/export")
-async def export_data():
-    async with get_db_connection() as conn:
-        cursor = await conn.cursor()
+async def export_data(format: str = "json", batch_size: int = 500):
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'ndjson'")
+    
+    batch_size = max(1, min(batch_size, 5000))
     
-        await cursor.execute('SELECT * FROM pages')
-        pages = []
+    if format == "ndjson":
+        async def ndjson_stream():
+            async for page in iter_export_pages(batch_size):
+                yield json.dumps(page) + "\n"
         
-        for page_row in await cursor.fetchall():
-            page = dict(page_row)
-            page_id = page['id']
-            
-            await cursor.execute('SELECT * FROM headers WHERE page_id = ?', (page_id,))
-            page['headers'] = [dict(row) for row in await cursor.fetchall()]
-            
-            await cursor.execute('SELECT * FROM links WHERE page_id = ?', (page_id,))
-            page['links'] = [dict(row) for row in await cursor.fetchall()]
-            
-            await cursor.execute('SELECT * FROM media WHERE page_id = ?', (page_id,))
-            page['media'] = [dict(row) for row in await cursor.fetchall()]
-            
-            try:
-                await cursor.execute('SELECT * FROM file_assets WHERE page_id = ?', (page_id,))
-                page['file_assets'] = [dict(row) for row in await cursor.fetchall()]
-            except aiosqlite.OperationalError:
-                page['file_assets'] = []
-            
-            pages.append(page)
+        return StreamingResponse(
+            ndjson_stream(),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": "attachment; filename=scraped_data.ndjson"}
+        )
+    
+    async def json_stream():
+        async with get_db_connection() as conn:
+            cursor = await conn.execute('SELECT COUNT(*) FROM pages')
+            total_pages = (await cursor.fetchone())[0]
         
+        yield (
+            f'{{"total_pages": {total_pages}, '
+            f'"exported_at": {json.dumps(datetime.now().isoformat())}, "data": ['
+        )
+        separator = ""
+        async for page in iter_export_pages(batch_size):
+            yield separator + json.dumps(page)
+            separator = ", "
+        yield "]}"
+    
+    return StreamingResponse(json_stream(), media_type="application/json")
+
+EXPORT_CHILD_TABLES = ('headers', 'links', 'media', 'file_assets')
+
+async def iter_export_pages(batch_size: int):
+    # Walks pages in id order one batch at a time, and loads each child table
+    # for the whole batch with a single IN (...) query, so memory stays at one
+    # batch and the query count is 5 per batch instead of 5 per page. Each
+    # batch borrows a pool connection only while it is read, so a slow or
+    # abandoned download never keeps a slot between batches
+    last_id = 0
+    while True:
+        pages = await fetch_export_batch(last_id, batch_size)
+        if not pages:
+            return
+        for page in pages:
+            yield page
+        last_id = pages[-1]['id']
+
+async def fetch_export_batch(last_id: int, batch_size: int):
+    async with get_db_connection() as conn:
+        cursor = await conn.execute('''
+            SELECT p.*, page_text(t.codec, t.data) AS page_full_text, f.fingerprint AS page_fingerprint
+            FROM pages p
+            LEFT JOIN page_texts t ON t.hash = p.text_hash
+            LEFT JOIN fingerprints f ON f.id = p.fingerprint_id
+            WHERE p.id > ?
+            ORDER BY p.id
+            LIMIT ?
+        ''', (last_id, batch_size))
+        pages = [dict(row) for row in await cursor.fetchall()]
+        if not pages:
+            return pages
         
-        return {
-            "total_pages": len(pages),
-            "exported_at": datetime.now().isoformat(),
-            "data": pages
-        }
+        page_ids = [page['id'] for page in pages]
+        placeholders = ','.join('?' * len(page_ids))
+        children = {}
+        for table in EXPORT_CHILD_TABLES:
+            grouped = {page_id: [] for page_id in page_ids}
+            cursor = await conn.execute(
+                f'SELECT * FROM {table} WHERE page_id IN ({placeholders}) ORDER BY page_id, id',
+                page_ids
+            )
+            for row in await cursor.fetchall():
+                grouped[row['page_id']].append(dict(row))
+            children[table] = grouped
+    
+    for page in pages:
+        page['full_text'] = page.pop('page_full_text')
+        page['fingerprint'] = page.pop('page_fingerprint')
+        for table in EXPORT_CHILD_TABLES:
+            page[table] = children[table][page['id']]
+    return pages
 
 @handle_api_errors
 @app.get("/api/data/files-by-extension")
@@ -1735,12 +1916,14 @@ async def get_scraping_timeline():
     
         await cursor.execute('''
             SELECT 
-                date(timestamp, 'unixepoch') as date,
-                COUNT(*) as pages_scraped,
-                COUNT(DISTINCT depth) as depths_reached
-            FROM pages
-            GROUP BY date(timestamp, 'unixepoch')
-            ORDER BY date DESC
+                date(r.bucket, 'unixepoch') as date,
+                r.pages as pages_scraped,
+                (SELECT COUNT(*) FROM crawl_dimension_rollups d
+                 WHERE d.granularity = 'day' AND d.bucket = r.bucket
+                   AND d.dimension = 'depth' AND d.pages > 0) as depths_reached
+            FROM crawl_rollups r
+            WHERE r.granularity = 'day' AND r.pages > 0
+            ORDER BY r.bucket DESC
             LIMIT 30
         ''')
         
@@ -1859,7 +2042,7 @@ async def get_link_analysis():
 @handle_api_errors
 @app.post("/api/data/bulk/delete-pages")
 async def bulk_delete_pages(page_ids: List[int]):
-    async with get_db_connection() as conn:
+    async with get_db_writer() as conn:
         cursor = await conn.cursor()
     
         placeholders = ','.join('?' * len(page_ids))
@@ -1869,23 +2052,26 @@ async def bulk_delete_pages(page_ids: List[int]):
         await cursor.execute(f'DELETE FROM media WHERE page_id IN ({placeholders})', page_ids)
         await cursor.execute(f'DELETE FROM file_assets WHERE page_id IN ({placeholders})', page_ids)
         await cursor.execute(f'DELETE FROM pages WHERE id IN ({placeholders})', page_ids)
+        deleted_count = cursor.rowcount
+        await cursor.execute(PRUNE_PAGE_TEXTS_SQL)
+        await cursor.execute(BUMP_WRITE_GENERATION_SQL)
         
         await conn.commit()
-        deleted_count = cursor.rowcount
         
         return {"success": True, "deleted_count": deleted_count}
 
 @handle_api_errors
 @app.post("/api/data/bulk/delete-files")
 async def bulk_delete_files(file_ids: List[int]):
-    async with get_db_connection() as conn:
+    async with get_db_writer() as conn:
         cursor = await conn.cursor()
     
         placeholders = ','.join('?' * len(file_ids))
         await cursor.execute(f'DELETE FROM file_assets WHERE id IN ({placeholders})', file_ids)
+        deleted_count = cursor.rowcount
+        await cursor.execute(BUMP_WRITE_GENERATION_SQL)
         
         await conn.commit()
-        deleted_count = cursor.rowcount
         
         return {"success": True, "deleted_count": deleted_count}
 
@@ -2816,7 +3002,7 @@ async def websocket_endpoint(websocket: WebSocket):
                     "type": "status_update",
                     "data": {
                         "pages_scraped": scraper_instance.pages_scraped,
-                        "queue_size": len(scraper_instance.queue),
+                        "queue_size": len(scraper_instance.frontier),
                         "visited": len(scraper_instance.visited),
                         "session_id": getattr(scraper_instance, 'session_id', current_session_id),
                         "is_paused": getattr(scraper_instance, 'is_paused', False),
@@ -3063,7 +3249,7 @@ async def get_content_diff(change_log_id: int):
 @handle_api_errors
 @app.delete("/api/diff/snapshots/{snapshot_id}")
 async def delete_snapshot(snapshot_id: int):
-    async with get_db_connection() as conn:
+    async with get_db_writer() as conn:
         cursor = await conn.cursor()
     
         await cursor.execute('''
@@ -3072,9 +3258,10 @@ async def delete_snapshot(snapshot_id: int):
         ''', (snapshot_id, snapshot_id))
         
         await cursor.execute('DELETE FROM page_snapshots WHERE id = ?', (snapshot_id,))
+        deleted = cursor.rowcount > 0
+        await cursor.execute(BUMP_WRITE_GENERATION_SQL)
         
         await conn.commit()
-        deleted = cursor.rowcount > 0
         
         if not deleted:
             raise HTTPException(status_code=404, detail="Snapshot not found")
@@ -3108,6 +3295,21 @@ async def get_change_timeline(url: str):
             "timeline": timeline
         }
 
+def parse_field_value(field_value: Optional[str], field_type: Optional[str]):
+    if field_type in ('list', 'dict'):
+        try:
+            return json.loads(field_value)
+        except (TypeError, ValueError):
+            pass
+    return field_value
+
+def parse_page_cursor(cursor: str):
+    try:
+        timestamp, page_id = cursor.rsplit(':', 1)
+        return float(timestamp), int(page_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @handle_api_errors
 @app.get("/api/extracted-data/{page_id}")
 async def get_extracted_data(page_id: int):
@@ -3126,22 +3328,10 @@ async def get_extracted_data(page_id: int):
             WHERE page_id = ?
         ''', (page_id,))
         
-        fields = await cursor.fetchall()
-        
-        extracted_data = {}
-        for field in fields:
-            field_name = field[0]
-            field_value = field[1]
-            field_type = field[2]
-            
-            if field_type in ['list', 'dict']:
-                import json
-                try:
-                    field_value = json.loads(field_value)
-                except:
-                    pass
-            
-            extracted_data[field_name] = field_value
+        extracted_data = {
+            field_name: parse_field_value(field_value, field_type)
+            for field_name, field_value, field_type in await cursor.fetchall()
+        }
         
         return {
             "page_id": page_id,
@@ -3152,143 +3342,238 @@ async def get_extracted_data(page_id: int):
     
 @handle_api_errors
 @app.get("/api/extracted-data")
-async def get_all_extracted_data(limit: int = 100, offset: int = 0):
+async def get_all_extracted_data(limit: int = 100, offset: int = 0, cursor: Optional[str] = None):
+    # Pages are ordered newest first by (timestamp, id). Passing the previous
+    # response's next_cursor seeks straight to the next page through
+    # idx_pages_timestamp, so deep pages cost the same as the first; offset
+    # still works but has to skip every earlier row. All fields for the page
+    # of results come back in one query.
+    limit = max(1, min(limit, 1000))
+    conditions = ['EXISTS (SELECT 1 FROM custom_extracted_data c WHERE c.page_id = p.id)']
+    params = []
+    
+    if cursor:
+        conditions.append('(p.timestamp, p.id) < (?, ?)')
+        params.extend(parse_page_cursor(cursor))
+        offset = 0
+    
     async with get_db_connection() as conn:
-        cursor = await conn.cursor()
-        
-        await cursor.execute('''
-            SELECT DISTINCT p.id, p.url, p.title, p.timestamp
+        rows = await conn.execute(f'''
+            SELECT p.id, p.url, p.title, p.timestamp
             FROM pages p
-            INNER JOIN custom_extracted_data c ON p.id = c.page_id
-            ORDER BY p.timestamp DESC
+            WHERE {' AND '.join(conditions)}
+            ORDER BY p.timestamp DESC, p.id DESC
             LIMIT ? OFFSET ?
-        ''', (limit, offset))
-        
-        pages = await cursor.fetchall()
+        ''', (*params, limit, offset))
+        pages = await rows.fetchall()
+        
+        results = {
+            page['id']: {
+                "page_id": page['id'],
+                "url": page['url'],
+                "title": page['title'],
+                "timestamp": page['timestamp'],
+                "extracted_data": {}
+            }
+            for page in pages
+        }
         
-        results = []
-        for page in pages:
-            page_id = page[0]
-            
-            await cursor.execute('''
-                SELECT field_name, field_value, field_type
+        if results:
+            rows = await conn.execute(f'''
+                SELECT page_id, field_name, field_value, field_type
                 FROM custom_extracted_data
-                WHERE page_id = ?
-            ''', (page_id,))
-            
-            fields = await cursor.fetchall()
-            
-            extracted_data = {}
-            for field in fields:
-                field_name = field[0]
-                field_value = field[1]
-                field_type = field[2]
-                
-                if field_type in ['list', 'dict']:
-                    import json
-                    try:
-                        field_value = json.loads(field_value)
-                    except:
-                        pass
-                
-                extracted_data[field_name] = field_value
-            
-            results.append({
-                "page_id": page_id,
-                "url": page[1],
-                "title": page[2],
-                "timestamp": page[3],
-                "extracted_data": extracted_data
-            })
+                WHERE page_id IN ({','.join('?' * len(results))})
+                ORDER BY page_id, id
+            ''', list(results))
+            for row in await rows.fetchall():
+                results[row['page_id']]['extracted_data'][row['field_name']] = parse_field_value(
+                    row['field_value'], row['field_type']
+                )
+        
+        next_cursor = None
+        if len(pages) == limit:
+            next_cursor = f"{pages[-1]['timestamp']!r}:{pages[-1]['id']}"
         
         return {
             "total": len(results),
             "limit": limit,
             "offset": offset,
-            "results": results
+            "next_cursor": next_cursor,
+            "results": list(results.values())
         }
 
-@handle_api_errors
-@app.get("/api/export/csv")
-async def export_csv():
-    async with get_db_connection() as conn:
-        cursor = await conn.cursor()
-        
-        await cursor.execute('''
-            SELECT p.url, p.title, c.field_name, c.field_value
-            FROM pages p
-            INNER JOIN custom_extracted_data c ON p.id = c.page_id
-            ORDER BY p.id, c.field_name
-        ''')
+EXPORT_CHUNK_BYTES = 64 * 1024
+EXPORT_FETCH_PAGES = 200
+
+def extracted_data_filters(domain: Optional[str], start_date: Optional[str],
+                           end_date: Optional[str], fields: Optional[str]):
+    conditions = []
+    params = []
+    
+    if domain:
+        conditions.append('p.domain IN (?, ?)')
+        params.extend([f'http://{domain}', f'https://{domain}'])
+    
+    try:
+        if start_date:
+            start = datetime.fromisoformat(start_date).replace(tzinfo=timezone.utc)
+            conditions.append('p.timestamp >= ?')
+            params.append(start.timestamp())
         
-        rows = await cursor.fetchall()
+        if end_date:
+            end = datetime.fromisoformat(end_date).replace(tzinfo=timezone.utc) + timedelta(days=1)
+            conditions.append('p.timestamp < ?')
+            params.append(end.timestamp())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    
+    field_names = [name.strip() for name in (fields or '').split(',') if name.strip()]
+    if field_names:
+        conditions.append(f"c.field_name IN ({','.join('?' * len(field_names))})")
+        params.extend(field_names)
+    
+    where = ' AND '.join(conditions) if conditions else '1 = 1'
+    return where, params
+
+async def iter_extracted_rows(where: str, params: list):
+    # Rows come in page order, EXPORT_FETCH_PAGES pages at a time, so rows for
+    # a page arrive together and nothing larger than a batch is held in memory.
+    # A batch borrows a pool connection only while it is read
+    last_page_id = 0
+    while True:
+        async with get_db_connection() as conn:
+            cursor = await conn.execute(f'''
+                SELECT DISTINCT c.page_id
+                FROM custom_extracted_data c
+                JOIN pages p ON p.id = c.page_id
+                WHERE {where} AND c.page_id > ?
+                ORDER BY c.page_id
+                LIMIT ?
+            ''', [*params, last_page_id, EXPORT_FETCH_PAGES])
+            page_ids = [row[0] for row in await cursor.fetchall()]
+            if not page_ids:
+                return
+            
+            cursor = await conn.execute(f'''
+                SELECT p.id, p.url, p.title, c.field_name, c.field_value, c.field_type
+                FROM custom_extracted_data c
+                JOIN pages p ON p.id = c.page_id
+                WHERE {where} AND c.page_id BETWEEN ? AND ?
+                ORDER BY c.page_id, c.field_name
+            ''', [*params, page_ids[0], page_ids[-1]])
+            rows = await cursor.fetchall()
         
+        for row in rows:
+            yield row
+        last_page_id = page_ids[-1]
+
+async def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export_response(chunks, media_type: str, filename: str, gzip: bool):
+    headers = {"Content-Disposition": f"attachment; filename={filename}"}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+        chunks = gzip_chunks(chunks)
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
+
+@handle_api_errors
+@app.get("/api/export/csv")
+async def export_csv(domain: Optional[str] = None, start_date: Optional[str] = None,
+                     end_date: Optional[str] = None, fields: Optional[str] = None,
+                     gzip: bool = False):
+    where, params = extracted_data_filters(domain, start_date, end_date, fields)
+    
+    async def csv_stream():
         output = io.StringIO()
         writer = csv.writer(output)
         
         writer.writerow(['URL', 'Title', 'Field Name', 'Field Value'])
         
-        for row in rows:
-            writer.writerow(row)
+        async for row in iter_extracted_rows(where, params):
+            writer.writerow((row['url'], row['title'], row['field_name'], row['field_value']))
+            if output.tell() >= EXPORT_CHUNK_BYTES:
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate(0)
         
-        output.seek(0)
-        return StreamingResponse(
-            iter([output.getvalue()]),
-            media_type="text/csv",
-            headers={"Content-Disposition": "attachment; filename=extracted_data.csv"}
-        )
+        yield output.getvalue()
+    
+    return export_response(csv_stream(), "text/csv", "extracted_data.csv", gzip)
 
 @handle_api_errors
 @app.get("/api/export/json")
-async def export_json():
-    async with get_db_connection() as conn:
-        cursor = await conn.cursor()
-        
-        await cursor.execute('''
-            SELECT DISTINCT p.id, p.url, p.title
-            FROM pages p
-            INNER JOIN custom_extracted_data c ON p.id = c.page_id
-        ''')
-        
-        pages = await cursor.fetchall()
-        
-        results = []
-        for page in pages:
-            page_id = page[0]
+async def export_json(domain: Optional[str] = None, start_date: Optional[str] = None,
+                      end_date: Optional[str] = None, fields: Optional[str] = None,
+                      gzip: bool = False):
+    where, params = extracted_data_filters(domain, start_date, end_date, fields)
+    
+    async def json_stream():
+        chunk = ["["]
+        size = 1
+        separator = ""
+        page = None
+        page_id = None
+        
+        async for row in iter_extracted_rows(where, params):
+            if page is not None and row['id'] != page_id:
+                text = separator + json.dumps(page)
+                separator = ",\n"
+                chunk.append(text)
+                size += len(text)
+                if size >= EXPORT_CHUNK_BYTES:
+                    yield "".join(chunk)
+                    chunk = []
+                    size = 0
+                page = None
             
-            await cursor.execute('''
-                SELECT field_name, field_value, field_type
-                FROM custom_extracted_data
-                WHERE page_id = ?
-            ''', (page_id,))
+            if page is None:
+                page_id = row['id']
+                page = {"url": row['url'], "title": row['title'], "data": {}}
             
-            fields = await cursor.fetchall()
-            
-            extracted_data = {}
-            for field in fields:
-                field_name = field[0]
-                field_value = field[1]
-                field_type = field[2]
-                
-                if field_type in ['list', 'dict']:
-                    try:
-                        field_value = json.loads(field_value)
-                    except:
-                        pass
-                
-                extracted_data[field_name] = field_value
-            
-            results.append({
-                "url": page[1],
-                "title": page[2],
-                "data": extracted_data
-            })
+            page['data'][row['field_name']] = parse_field_value(row['field_value'], row['field_type'])
         
-        return StreamingResponse(
-            iter([json.dumps(results, indent=2)]),
-            media_type="application/json",
-            headers={"Content-Disposition": "attachment; filename=extracted_data.json"}
-        )
+        if page is not None:
+            chunk.append(separator + json.dumps(page))
+        chunk.append("]")
+        yield "".join(chunk)
+    
+    return export_response(json_stream(), "application/json", "extracted_data.json", gzip)
+
+@handle_api_errors
+@app.get("/api/export/columnar/{table}")
+async def export_columnar(table: str, format: str = "parquet", row_group_size: Optional[int] = None):
+    if not columnar_export.PYARROW_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Columnar export needs pyarrow installed")
+    if format not in columnar_export.FORMATS:
+        raise HTTPException(status_code=400, detail="format must be 'parquet' or 'arrow'")
+    if table not in columnar_export.TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown table, expected one of {', '.join(columnar_export.TABLES)}")
+    if row_group_size is not None and row_group_size < 1:
+        raise HTTPException(status_code=400, detail="row_group_size must be positive")
+    
+    # The file is written a row group at a time off the event loop, then
+    # streamed from disk and removed once the response has been sent
+    suffix = columnar_export.FORMATS[format]
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    try:
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(db_executor, functools.partial(
+            columnar_export.export_table, config.get_db_path(), table, path, format, row_group_size
+        ))
+    except Exception:
+        os.remove(path)
+        raise
+    
+    media_type = "application/vnd.apache.parquet" if format == "parquet" else "application/vnd.apache.arrow.file"
+    return FileResponse(path, media_type=media_type, filename=f"{table}{suffix}",
+                        background=BackgroundTask(os.remove, path))
 
 @app.websocket("/ws/diff")
 async def websocket_diff_updates(websocket: WebSocket):
@@ -0,0 +1,278 @@
+import os
+import json
+import logging
+import argparse
+import sqlite3
+from typing import Dict, List, Optional, Any, Iterator
+
+import config
+from scraper import connect_database
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    import pyarrow.ipc as ipc
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+ce_logger = logging.getLogger("ColumnarExport")
+
+FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+# One dataset per table. Each query is read in id order, one row group at a
+# time, so memory is bounded by row_group_size whatever the database size.
+# Column types are fixed here rather than inferred per batch, so every row
+# group of a file has the same schema.
+TABLE_SPECS = {
+    'pages': {
+        'query': '''
+            SELECT id, url, title, description, depth, timestamp, folder_path,
+                   proxy_used, authenticated, text_hash
+            FROM pages
+        ''',
+        'types': {
+            'id': 'int64', 'url': 'string', 'title': 'string', 'description': 'string',
+            'depth': 'int32', 'timestamp': 'timestamp', 'folder_path': 'string',
+            'proxy_used': 'string', 'authenticated': 'bool', 'text_hash': 'string',
+        },
+    },
+    'links': {
+        'query': 'SELECT id, page_id, link_type, url FROM links',
+        'types': {'id': 'int64', 'page_id': 'int64', 'link_type': 'string', 'url': 'string'},
+    },
+    'media': {
+        'query': 'SELECT id, page_id, src, alt FROM media',
+        'types': {'id': 'int64', 'page_id': 'int64', 'src': 'string', 'alt': 'string'},
+    },
+    'file_assets': {
+        'query': '''
+            SELECT id, page_id, file_url, file_name, file_extension, file_size_bytes,
+                   local_path, download_status, download_timestamp, mime_type
+            FROM file_assets
+        ''',
+        'types': {
+            'id': 'int64', 'page_id': 'int64', 'file_url': 'string', 'file_name': 'string',
+            'file_extension': 'string', 'file_size_bytes': 'int64', 'local_path': 'string',
+            'download_status': 'string', 'download_timestamp': 'timestamp', 'mime_type': 'string',
+        },
+    },
+}
+
+TABLES = list(TABLE_SPECS) + ['custom_extracted_data']
+
+# field_type is the Python type name recorded by the page writer
+FIELD_TYPES = {'int': 'int64', 'float': 'float64', 'bool': 'bool', 'str': 'string'}
+
+EXTRACTED_KEY_COLUMNS = ('page_id', 'url')
+
+
+def _arrow_type(name: str):
+    return {
+        'int64': pa.int64(),
+        'int32': pa.int32(),
+        'float64': pa.float64(),
+        'bool': pa.bool_(),
+        'string': pa.string(),
+        'timestamp': pa.timestamp('ms', tz='UTC'),
+    }[name]
+
+
+def _convert(value: Any, type_name: str) -> Any:
+    if value is None:
+        return None
+    if type_name == 'timestamp':
+        return int(float(value) * 1000)
+    if type_name == 'bool':
+        if isinstance(value, str):
+            return value == 'True'
+        return bool(value)
+    if type_name == 'int64' or type_name == 'int32':
+        return int(value)
+    if type_name == 'float64':
+        return float(value)
+    return str(value)
+
+
+class _DatasetWriter:
+    # Wraps the Parquet and Arrow IPC file writers behind one interface
+    def __init__(self, path: str, schema, file_format: str, compression: Optional[str]):
+        self.path = path
+        if file_format == 'parquet':
+            self.writer = pq.ParquetWriter(path, schema, compression=compression or 'none')
+        else:
+            options = ipc.IpcWriteOptions(compression=compression) if compression else None
+            self.writer = ipc.new_file(path, schema, options=options)
+        self.file_format = file_format
+        self.rows = 0
+
+    def write(self, batch):
+        if self.file_format == 'parquet':
+            self.writer.write_table(pa.Table.from_batches([batch]), row_group_size=batch.num_rows)
+        else:
+            self.writer.write_batch(batch)
+        self.rows += batch.num_rows
+
+    def close(self):
+        self.writer.close()
+
+
+def _batch(schema, types: Dict[str, str], rows: List[Dict[str, Any]]):
+    columns = {
+        name: [_convert(row.get(name), type_name) for row in rows]
+        for name, type_name in types.items()
+    }
+    return pa.RecordBatch.from_pydict(columns, schema=schema)
+
+
+def _iter_row_groups(conn, query: str, row_group_size: int) -> Iterator[List[Dict[str, Any]]]:
+    cursor = conn.execute(f'{query} ORDER BY id')
+    while True:
+        rows = cursor.fetchmany(row_group_size)
+        if not rows:
+            return
+        yield [dict(row) for row in rows]
+
+
+def _extracted_field_types(conn) -> Dict[str, str]:
+    # A field that was stored with several Python types is exported as string;
+    # lists and dicts stay JSON text
+    seen = {}
+    for field_name, field_type in conn.execute(
+        'SELECT DISTINCT field_name, field_type FROM custom_extracted_data ORDER BY field_name'
+    ):
+        seen.setdefault(field_name, set()).add(field_type)
+
+    types = {}
+    for field_name, field_types in seen.items():
+        field_types.discard('NoneType')
+        if len(field_types) == 1:
+            types[field_name] = FIELD_TYPES.get(field_types.pop(), 'string')
+        elif field_types == {'int', 'float'}:
+            types[field_name] = 'float64'
+        else:
+            types[field_name] = 'string'
+    return types
+
+
+def _extracted_columns(field_names: List[str]) -> Dict[str, str]:
+    # A custom field named like one of the key columns is exported as
+    # custom_<name>, so it cannot overwrite page_id or url
+    columns = {}
+    taken = set(EXTRACTED_KEY_COLUMNS) | set(field_names)
+    for field_name in field_names:
+        column = field_name
+        while column in EXTRACTED_KEY_COLUMNS or (column != field_name and column in taken):
+            column = f'custom_{column}'
+        taken.add(column)
+        columns[field_name] = column
+    return columns
+
+
+def _iter_extracted_row_groups(conn, columns: Dict[str, str], row_group_size: int):
+    # Pivots the (page_id, field_name, field_value) rows into one row per
+    # page, flushing once row_group_size pages are complete. columns maps
+    # each field name to its output column
+    cursor = conn.execute('''
+        SELECT c.page_id, p.url, c.field_name, c.field_value, c.field_type
+        FROM custom_extracted_data c
+        JOIN pages p ON p.id = c.page_id
+        ORDER BY c.page_id, c.id
+    ''')
+    group = []
+    current = None
+    while True:
+        rows = cursor.fetchmany(row_group_size)
+        if not rows:
+            break
+        for row in rows:
+            if current is None or current['page_id'] != row['page_id']:
+                if current is not None:
+                    group.append(current)
+                    if len(group) >= row_group_size:
+                        yield group
+                        group = []
+                current = {'page_id': row['page_id'], 'url': row['url']}
+            value = row['field_value']
+            if row['field_type'] == 'NoneType':
+                value = None
+            current[columns[row['field_name']]] = value
+    if current is not None:
+        group.append(current)
+    if group:
+        yield group
+
+
+def export_table(db_path: str, table: str, output_path: str, file_format: str = 'parquet',
+                 row_group_size: Optional[int] = None, compression: Optional[str] = 'zstd') -> int:
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("Columnar export needs pyarrow (pip install pyarrow)")
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown format '{file_format}', expected one of {', '.join(FORMATS)}")
+    if table not in TABLES:
+        raise ValueError(f"Unknown table '{table}', expected one of {', '.join(TABLES)}")
+
+    row_group_size = row_group_size or config.EXPORT['row_group_size']
+    conn = connect_database(db_path)
+    conn.row_factory = sqlite3.Row
+
+    try:
+        if table == 'custom_extracted_data':
+            field_types = _extracted_field_types(conn)
+            columns = _extracted_columns(list(field_types))
+            types = {'page_id': 'int64', 'url': 'string',
+                     **{columns[name]: type_name for name, type_name in field_types.items()}}
+            row_groups = _iter_extracted_row_groups(conn, columns, row_group_size)
+        else:
+            types = TABLE_SPECS[table]['types']
+            row_groups = _iter_row_groups(conn, TABLE_SPECS[table]['query'], row_group_size)
+
+        schema = pa.schema([(name, _arrow_type(type_name)) for name, type_name in types.items()])
+        writer = _DatasetWriter(output_path, schema, file_format, compression)
+        try:
+            for rows in row_groups:
+                writer.write(_batch(schema, types, rows))
+        finally:
+            writer.close()
+
+        ce_logger.info(f"Exported {writer.rows} {table} row(s) to {output_path}")
+        return writer.rows
+    finally:
+        conn.close()
+
+
+def export_crawl(db_path: str, output_dir: str, file_format: str = 'parquet',
+                 tables: Optional[List[str]] = None, row_group_size: Optional[int] = None,
+                 compression: Optional[str] = 'zstd') -> Dict[str, Dict[str, Any]]:
+    os.makedirs(output_dir, exist_ok=True)
+    results = {}
+    for table in tables or TABLES:
+        path = os.path.join(output_dir, f"{table}{FORMATS.get(file_format, '')}")
+        rows = export_table(db_path, table, path, file_format, row_group_size, compression)
+        results[table] = {'path': path, 'rows': rows}
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Export crawl tables to Parquet or Arrow IPC files")
+    parser.add_argument('--db', default=config.get_db_path(), help="SQLite database (default: config DATABASE db_path)")
+    parser.add_argument('--out', default=config.EXPORT['output_dir'], help="Output directory")
+    parser.add_argument('--format', choices=list(FORMATS), default='parquet')
+    parser.add_argument('--tables', default=','.join(TABLES), help="Comma-separated tables to export")
+    parser.add_argument('--row-group-size', type=int, default=config.EXPORT['row_group_size'])
+    parser.add_argument('--compression', default='zstd', help="Codec, or 'none'")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s : %(levelname)s : %(message)s")
+    results = export_crawl(
+        args.db, args.out, args.format,
+        tables=[table.strip() for table in args.tables.split(',') if table.strip()],
+        row_group_size=args.row_group_size,
+        compression=None if args.compression == 'none' else args.compression
+    )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -15,6 +15,16 @@ SCRAPER = {
     'base_dir': 'scraped_data',
     'smart_scroll_iterations': 5,
     'max_page_retries': 3,
+    'frontier': 'priority',           # 'priority', 'fifo' or 'sqlite' (disk-backed, resumable)
+    'frontier_scoring': 'depth',      # 'depth' (shallowest first) or 'inlinks' (most linked first)
+    'frontier_batch_size': 100,
+    'resume_crawl': True,
+    'visited_backend': 'exact',       # 'exact', 'fingerprint' (64-bit hashes) or 'bloom'
+    'visited_initial_capacity': 100000,
+    'visited_bloom_error_rate': 0.001,
+    'context_reuse_pages': 20,        # Pages served by one browser context before rotation (1 = new context per page)
+    'context_max_age_seconds': 300,
+    'worker_processes': 1,            # >1 shards the crawl across processes, each with its own browser
 }
 
 PROXY = {
@@ -126,10 +136,30 @@ FINGERPRINTS = {
 DATABASE = {
     'db_name': 'scraped_data.db',
     'db_path': None,
+    'group_commit_pages': 50,         # most queued pages committed in one transaction
+    'group_commit_seconds': 2.0,      # commit a partial group once its oldest page is this old
+    'writer_queue_size': 200,         # pages waiting for the writer before workers block
+    'journal_mode': 'WAL',            # readers no longer block the crawler's writes
+    'synchronous': 'NORMAL',          # safe with WAL; skips the fsync on every commit
+    'mmap_size': 268435456,           # bytes of the database file memory-mapped per connection
+    'cache_size': -65536,             # page cache per connection (negative = KiB)
+    'busy_timeout_ms': 5000,
+    'api_pool_size': 4,               # read connections the API keeps open
+    'api_cached_statements': 256,     # prepared statements cached per API connection
+    'api_cache_entries': 128,         # analytics responses kept by the API response cache
+    'api_cache_ttl_seconds': 30,      # longest a cached response is reused, even with no new writes
+    'minute_breakdown_minutes': 720,  # minute rollups read for the performance chart, back from the last page
+    'text_codec': 'zstd',             # page text compression; falls back to zlib without zstandard
+    'text_compression_level': 3,
 }
 
 DATABASE['db_path'] = join(SCRAPER['base_dir'], DATABASE['db_name'])
 
+EXPORT = {
+    'row_group_size': 10000,          # rows per Parquet row group / Arrow record batch
+    'output_dir': join(SCRAPER['base_dir'], 'exports'),
+}
+
 CAPTCHA = {
     'enabled': True,
     'manual_solving': True,
@@ -161,6 +191,18 @@ EXTRACTION = {
     'validate_data': True,
 }
 
+POLITENESS = {
+    'enabled': True,
+    'requests_per_second': 2.0,       # per host
+    'burst': 2,
+    'max_in_flight_per_host': 4,
+    'min_in_flight_per_host': 1,
+    'latency_threshold_factor': 2.0,  # latency above N x the host's average counts as overload
+    'recovery_successes': 10,         # healthy responses needed before concurrency grows again
+    'backoff_statuses': [429, 503],
+    'max_backoff_seconds': 60,
+}
+
 
 def get_db_path():
     return DATABASE['db_path']
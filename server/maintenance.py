@@ -0,0 +1,49 @@
+import json
+import logging
+import argparse
+from typing import List, Optional
+
+import config
+from scraper import connect_database, initialize_database, backfill_rollups, BUMP_WRITE_GENERATION_SQL
+
+
+mt_logger = logging.getLogger("Maintenance")
+
+
+def rebuild_rollups(db_path: str) -> dict:
+    # initialize_database brings an older database up to the current schema
+    # first; the migration that adds the rollup tables fills them in itself
+    initialize_database(db_path)
+    conn = connect_database(db_path, isolation_level=None)
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        backfill_rollups(conn)
+        conn.execute(BUMP_WRITE_GENERATION_SQL)
+        conn.execute('COMMIT')
+        counts = dict(conn.execute(
+            'SELECT granularity, COUNT(*) FROM crawl_rollups GROUP BY granularity'
+        ).fetchall())
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+
+    mt_logger.info(f"Rebuilt rollups for {db_path}: {counts}")
+    return counts
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Database maintenance commands")
+    parser.add_argument('--db', default=config.get_db_path(), help="SQLite database (default: config DATABASE db_path)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('backfill-rollups', help="Rebuild the minute, hour and day rollup tables from the pages and file_assets tables")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s : %(levelname)s : %(message)s")
+    if args.command == 'backfill-rollups':
+        print(json.dumps(rebuild_rollups(args.db), indent=2))
+
+
+if __name__ == '__main__':
+    main()
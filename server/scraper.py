@@ -6,14 +6,24 @@ import re
 import sqlite3
 import asyncio
 import aiohttp
+import multiprocessing
+import threading
+import concurrent.futures
 import mimetypes
 import logging
 import difflib
+import zlib
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Callable, Iterable, Tuple
 import hashlib
+import heapq
+import math
+import sys
+from abc import ABC, abstractmethod
+from array import array
 from urllib.parse import urlparse, urljoin, urlunparse
 from collections import deque
+from email.utils import parsedate_to_datetime
 from playwright.async_api import async_playwright, Page
 import config
 import winsound
@@ -30,10 +40,1040 @@ except ImportError:
     PLYER_AVAILABLE = False
     print("Warning: plyer not installed. Desktop notifications disabled.")
 
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
 
 dt_logger = logging.getLogger("DiffTracker")
 dc_logger = logging.getLogger("DataCleaner")
 ee_logger = logging.getLogger("ExtractionEngine")
+fr_logger = logging.getLogger("CrawlFrontier")
+dw_logger = logging.getLogger("DatabaseWriter")
+
+# Collects everything extract_and_save_data needs in one CDP roundtrip.
+# Elements inside open shadow roots are included, matching what Playwright
+# CSS locators return. Attribute values are returned raw and resolved in
+# Python so URL handling stays identical to the per-element code it replaced.
+# When a list of file extensions is passed, download candidates are matched
+# in the page as well and returned under "files".
+PAGE_EXTRACTION_SCRIPT = """
+(fileExtensions) => {
+    const roots = [document];
+    for (let i = 0; i < roots.length; i++) {
+        for (const el of roots[i].querySelectorAll('*')) {
+            if (el.shadowRoot) roots.push(el.shadowRoot);
+        }
+    }
+    const queryAll = (selector) => {
+        const found = [];
+        for (const root of roots) found.push(...root.querySelectorAll(selector));
+        return found;
+    };
+
+    const anchors = queryAll('a');
+    const description = queryAll('meta[name="description"]')[0];
+
+    const files = [];
+    if (fileExtensions) {
+        const extensions = new Set(fileExtensions);
+        const isDownloadable = (raw) => {
+            let path;
+            try {
+                path = new URL(raw, location.href).pathname.toLowerCase();
+            } catch (e) {
+                return false;
+            }
+            const name = path.slice(path.lastIndexOf('/') + 1);
+            const dot = name.lastIndexOf('.');
+            return dot > 0 && extensions.has(name.slice(dot));
+        };
+
+        for (const el of anchors) {
+            const href = el.getAttribute('href');
+            if (href && isDownloadable(href)) files.push({href, text: el.innerText});
+        }
+        const fileSelector = '[data-download], [data-file], [href$=".pdf"], ' +
+                             '[href$=".docx"], [href$=".zip"], [href$=".csv"]';
+        for (const el of queryAll(fileSelector)) {
+            const href = el.getAttribute('href') || el.getAttribute('data-download') ||
+                         el.getAttribute('data-file');
+            if (href && isDownloadable(href)) files.push({href, text: ''});
+        }
+    }
+
+    return {
+        title: document.title,
+        description: description ? description.getAttribute('content') : null,
+        has_description: Boolean(description),
+        headers: {
+            h1: queryAll('h1').map(el => el.innerText),
+            h2: queryAll('h2').map(el => el.innerText),
+            h3: queryAll('h3').map(el => el.innerText),
+        },
+        links: anchors.map(el => el.getAttribute('href')).filter(Boolean),
+        images: queryAll('img').map(el => ({
+            src: el.getAttribute('src') || el.getAttribute('data-src'),
+            alt: el.getAttribute('alt') || '',
+        })),
+        json_ld: queryAll('script[type="application/ld+json"]').map(el => el.textContent),
+        full_text: document.body ? document.body.innerText : '',
+        files,
+    };
+}
+"""
+
+
+# Page body text lives in page_texts, keyed by the SHA-256 of the text and
+# compressed with zstd when available (zlib otherwise). pages only keeps the
+# hash, so recrawls of unchanged pages share one blob and the pages rows stay
+# small. The codec is stored per blob, so databases written with either codec
+# stay readable as long as that codec is installed.
+def text_hash(text: str) -> Optional[str]:
+    if not text:
+        return None
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def compress_text(text: str) -> Tuple[str, bytes]:
+    raw = text.encode('utf-8')
+    if config.DATABASE['text_codec'] == 'zstd' and ZSTD_AVAILABLE:
+        return 'zstd', zstandard.ZstdCompressor(level=config.DATABASE['text_compression_level']).compress(raw)
+    return 'zlib', zlib.compress(raw, 6)
+
+
+def decompress_text(codec: str, data: bytes) -> Optional[str]:
+    if data is None:
+        return None
+    if codec == 'zstd':
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("page text is zstd-compressed but zstandard is not installed")
+        raw = zstandard.ZstdDecompressor().decompress(data)
+    elif codec == 'zlib':
+        raw = zlib.decompress(data)
+    else:
+        raw = data
+    return raw.decode('utf-8')
+
+
+def store_page_text(cursor, text: str) -> Optional[str]:
+    digest = text_hash(text)
+    if digest is None:
+        return None
+
+    cursor.execute('SELECT 1 FROM page_texts WHERE hash = ?', (digest,))
+    if cursor.fetchone() is None:
+        codec, data = compress_text(text)
+        cursor.execute(
+            'INSERT INTO page_texts (hash, codec, size, data) VALUES (?, ?, ?, ?)',
+            (digest, codec, len(text), data)
+        )
+    return digest
+
+
+def load_page_text(cursor, digest: Optional[str]) -> Optional[str]:
+    if not digest:
+        return None
+    cursor.execute('SELECT codec, data FROM page_texts WHERE hash = ?', (digest,))
+    row = cursor.fetchone()
+    return decompress_text(row[0], row[1]) if row else None
+
+
+def _has_column(conn, table: str, column: str) -> bool:
+    return column in [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+
+
+def _add_column(conn, table: str, column: str, definition: str):
+    if not _has_column(conn, table, column):
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+
+def _migrate_page_text_store(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS page_texts (
+            hash TEXT PRIMARY KEY,
+            codec TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            data BLOB NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    _add_column(conn, 'pages', 'text_hash', 'TEXT')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_pages_text_hash ON pages(text_hash)')
+
+    # Moved in batches of 500 pages, each committed on its own (see
+    # _run_migration), then the emptied column is dropped
+    if not _has_column(conn, 'pages', 'full_text'):
+        return
+    cursor = conn.cursor()
+    while True:
+        rows = cursor.execute('''
+            SELECT id, full_text FROM pages
+            WHERE full_text IS NOT NULL
+            LIMIT 500
+        ''').fetchall()
+        if not rows:
+            break
+        for page_id, full_text in rows:
+            cursor.execute(
+                'UPDATE pages SET text_hash = ?, full_text = NULL WHERE id = ?',
+                (store_page_text(cursor, full_text), page_id)
+            )
+        yield
+    conn.execute('ALTER TABLE pages DROP COLUMN full_text')
+
+
+# A blob stays while a page or a diff snapshot still refers to it, so older
+# snapshots keep their text after the page is deleted
+PRUNE_PAGE_TEXTS_SQL = '''
+    DELETE FROM page_texts
+    WHERE NOT EXISTS (SELECT 1 FROM pages WHERE pages.text_hash = page_texts.hash)
+      AND NOT EXISTS (SELECT 1 FROM page_snapshots WHERE page_snapshots.full_text_hash = page_texts.hash)
+'''
+
+# Owned by DiffTracker, but created by the schema migrations too so that
+# PRUNE_PAGE_TEXTS_SQL can always check it
+PAGE_SNAPSHOTS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS page_snapshots (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        url TEXT NOT NULL,
+        snapshot_timestamp REAL NOT NULL,
+        page_id INTEGER,
+        content_hash TEXT,
+        title TEXT,
+        description TEXT,
+        full_text_hash TEXT,
+        header_count INTEGER,
+        link_count INTEGER,
+        media_count INTEGER,
+        file_count INTEGER,
+        FOREIGN KEY (page_id) REFERENCES pages(id)
+    )
+'''
+
+
+def register_text_functions(conn):
+    conn.create_function('page_text', 2, decompress_text, deterministic=True)
+
+
+# pages_fts indexes page titles and bodies for /api/data/search/content. It
+# is an external-content FTS5 table over a view that decompresses page_texts,
+# so the index adds no second copy of the text and snippet() still works. The
+# writer adds rows as pages are inserted; deletes go through a trigger. Both
+# the view and the trigger call page_text(), so connections that read
+# snippets or delete pages must come from connect_database() (or register the
+# function themselves).
+def _migrate_page_search_index(conn):
+    conn.execute('''
+        CREATE VIEW IF NOT EXISTS page_search_source AS
+        SELECT p.id, p.title,
+               (SELECT page_text(t.codec, t.data) FROM page_texts t WHERE t.hash = p.text_hash) AS body
+        FROM pages p
+    ''')
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+            title, body,
+            content='page_search_source', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS pages_fts_delete AFTER DELETE ON pages BEGIN
+            INSERT INTO pages_fts (pages_fts, rowid, title, body)
+            VALUES ('delete', old.id, old.title,
+                    (SELECT page_text(codec, data) FROM page_texts WHERE hash = old.text_hash));
+        END
+    ''')
+    conn.execute("INSERT INTO pages_fts (pages_fts) VALUES ('rebuild')")
+
+
+def build_fts_query(keyword: str) -> Optional[str]:
+    # Turns free text into a safe FTS5 query: "quoted phrases" stay phrases,
+    # a trailing * makes a prefix query, and every term is quoted so
+    # punctuation in user input cannot be parsed as FTS5 syntax. Terms are
+    # ANDed together.
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"?|(\S+)', keyword or ""):
+        tokens = re.findall(r'\w+', phrase or word)
+        if not tokens:
+            continue
+        prefix = '*' if word.endswith('*') else ''
+        terms.append('"' + ' '.join(tokens) + '"' + prefix)
+    return ' '.join(terms) or None
+
+
+# file_assets_fts serves substring search on file names through the FTS5
+# trigram tokenizer. The filterable fields (extension, status, size, page
+# domain, timestamp) are copied in as UNINDEXED columns, so a filtered search
+# is answered from the index rows and only the final page of results is
+# joined back to file_assets and pages. Triggers keep it in sync.
+# file_assets_fts is a trigram index over file names only, with file_assets
+# as its external content, so it stores no second copy of the names. It
+# answers the keyword part of /api/data/search/files as a set of file ids;
+# every other filter runs against file_assets and its indexes.
+def _migrate_file_search_index(conn):
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS file_assets_fts USING fts5(
+            file_name,
+            content='file_assets',
+            content_rowid='id',
+            tokenize='trigram'
+        )
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS file_assets_fts_insert AFTER INSERT ON file_assets BEGIN
+            INSERT INTO file_assets_fts (rowid, file_name) VALUES (new.id, new.file_name);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS file_assets_fts_delete AFTER DELETE ON file_assets BEGIN
+            INSERT INTO file_assets_fts (file_assets_fts, rowid, file_name)
+            VALUES ('delete', old.id, old.file_name);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS file_assets_fts_update AFTER UPDATE OF file_name ON file_assets BEGIN
+            INSERT INTO file_assets_fts (file_assets_fts, rowid, file_name)
+            VALUES ('delete', old.id, old.file_name);
+            INSERT INTO file_assets_fts (rowid, file_name) VALUES (new.id, new.file_name);
+        END
+    ''')
+    conn.execute("INSERT INTO file_assets_fts (file_assets_fts) VALUES ('rebuild')")
+
+
+def build_trigram_query(keyword: str) -> Optional[str]:
+    # The trigram tokenizer needs at least three characters to use the index;
+    # shorter keywords are matched with LIKE instead
+    keyword = (keyword or "").strip()
+    if len(keyword) < 3:
+        return None
+    return '"' + keyword.replace('"', '""') + '"'
+
+
+def build_file_search_query(keyword: Optional[str] = None, extension: Optional[str] = None,
+                            status: Optional[str] = None, min_size: Optional[int] = None,
+                            max_size: Optional[int] = None, domain: Optional[str] = None,
+                            limit: int = 50) -> Tuple[str, List[Any]]:
+    # Newest files first. Extension and status filters walk the
+    # (filter, download_timestamp) indexes in order, so LIMIT stops the scan
+    # early; a domain is resolved through crawl_sessions and pages(domain)
+    # to page ids, and a keyword through the trigram index to file ids.
+    conditions = []
+    params = []
+
+    trigram_query = build_trigram_query(keyword)
+    if trigram_query:
+        conditions.append('fa.id IN (SELECT rowid FROM file_assets_fts WHERE file_assets_fts MATCH ?)')
+        params.append(trigram_query)
+    elif keyword:
+        conditions.append('fa.file_name LIKE ?')
+        params.append(f'%{keyword}%')
+
+    if extension:
+        extension = extension.lower()
+        conditions.append('lower(fa.file_extension) = ?')
+        params.append(extension if extension.startswith('.') else f'.{extension}')
+
+    if status:
+        conditions.append('fa.download_status = ?')
+        params.append(status)
+
+    if min_size is not None:
+        conditions.append('fa.file_size_bytes >= ?')
+        params.append(min_size)
+
+    if max_size is not None:
+        conditions.append('fa.file_size_bytes <= ?')
+        params.append(max_size)
+
+    if domain:
+        # pages.domain is scheme://host; match the host or any subdomain
+        host = re.sub(r'([\\%_])', r'\\\1', domain.lower())
+        conditions.append('''fa.page_id IN (
+            SELECT id FROM pages WHERE domain IN (
+                SELECT domain FROM crawl_sessions
+                WHERE domain LIKE ? ESCAPE '\\' OR domain LIKE ? ESCAPE '\\'
+            )
+        )''')
+        params.extend([f'%://{host}', f'%.{host}'])
+
+    where = ' AND '.join(conditions) if conditions else '1 = 1'
+    sql = f'''
+        SELECT fa.file_name, fa.file_extension, fa.file_size_bytes,
+            fa.download_status, fa.local_path, p.url as page_url,
+            datetime(fa.download_timestamp, 'unixepoch') as downloaded_at
+        FROM file_assets fa
+        JOIN pages p ON fa.page_id = p.id
+        WHERE {where}
+        ORDER BY fa.download_timestamp DESC
+        LIMIT ?
+    '''
+    return sql, params + [limit]
+
+
+def page_domain(url: str) -> str:
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+# crawl_sessions keeps one summary row per domain (scheme://host, the same key
+# pages.domain holds) for /api/history/*. Triggers update it as pages, links
+# and file assets are inserted or deleted, so the history endpoints read one
+# row per domain instead of scanning pages. Deleting a page recomputes the
+# domain's time range and max depth through the pages(domain, ...) indexes.
+# Pages inserted without a domain are not summarized.
+def _migrate_crawl_sessions(conn):
+    _add_column(conn, 'pages', 'domain', 'TEXT')
+    cursor = conn.cursor()
+    while True:
+        rows = cursor.execute('SELECT id, url FROM pages WHERE domain IS NULL LIMIT 500').fetchall()
+        if not rows:
+            break
+        cursor.executemany(
+            'UPDATE pages SET domain = ? WHERE id = ?',
+            [(page_domain(url), page_id) for page_id, url in rows]
+        )
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_pages_domain ON pages(domain, timestamp)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_pages_domain_depth ON pages(domain, depth)')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS crawl_sessions (
+            domain TEXT PRIMARY KEY,
+            total_pages INTEGER NOT NULL DEFAULT 0,
+            start_time REAL,
+            end_time REAL,
+            depth_sum INTEGER NOT NULL DEFAULT 0,
+            max_depth INTEGER NOT NULL DEFAULT 0,
+            total_links INTEGER NOT NULL DEFAULT 0,
+            total_files INTEGER NOT NULL DEFAULT 0,
+            total_size INTEGER NOT NULL DEFAULT 0,
+            downloaded_files INTEGER NOT NULL DEFAULT 0,
+            downloaded_size INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_crawl_sessions_end ON crawl_sessions(end_time)')
+
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS crawl_sessions_page_insert
+        AFTER INSERT ON pages WHEN new.domain IS NOT NULL BEGIN
+            INSERT INTO crawl_sessions (domain, total_pages, start_time, end_time, depth_sum, max_depth)
+            VALUES (new.domain, 1, new.timestamp, new.timestamp, coalesce(new.depth, 0), coalesce(new.depth, 0))
+            ON CONFLICT (domain) DO UPDATE SET
+                total_pages = total_pages + 1,
+                start_time = coalesce(min(start_time, excluded.start_time), start_time, excluded.start_time),
+                end_time = coalesce(max(end_time, excluded.end_time), end_time, excluded.end_time),
+                depth_sum = depth_sum + excluded.depth_sum,
+                max_depth = max(max_depth, excluded.max_depth);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS crawl_sessions_page_delete
+        AFTER DELETE ON pages WHEN old.domain IS NOT NULL BEGIN
+            UPDATE crawl_sessions SET
+                total_pages = total_pages - 1,
+                depth_sum = depth_sum - coalesce(old.depth, 0),
+                start_time = (SELECT MIN(timestamp) FROM pages WHERE domain = old.domain),
+                end_time = (SELECT MAX(timestamp) FROM pages WHERE domain = old.domain),
+                max_depth = coalesce((SELECT MAX(depth) FROM pages WHERE domain = old.domain), 0)
+            WHERE domain = old.domain;
+            DELETE FROM crawl_sessions WHERE domain = old.domain AND total_pages <= 0;
+        END
+    ''')
+    for event, row, sign in (('INSERT', 'new', '+'), ('DELETE', 'old', '-')):
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS crawl_sessions_link_{event.lower()}
+            AFTER {event} ON links BEGIN
+                UPDATE crawl_sessions SET total_links = total_links {sign} 1
+                WHERE domain = (SELECT domain FROM pages WHERE id = {row}.page_id);
+            END
+        ''')
+    _create_crawl_sessions_file_triggers(conn)
+
+    conn.execute('DELETE FROM crawl_sessions')
+    conn.execute('''
+        INSERT INTO crawl_sessions (domain, total_pages, start_time, end_time, depth_sum, max_depth)
+        SELECT domain, COUNT(*), MIN(timestamp), MAX(timestamp), coalesce(SUM(depth), 0), coalesce(MAX(depth), 0)
+        FROM pages
+        WHERE domain IS NOT NULL
+        GROUP BY domain
+    ''')
+    conn.execute('''
+        UPDATE crawl_sessions SET total_links = (
+            SELECT COUNT(*) FROM links l JOIN pages p ON p.id = l.page_id
+            WHERE p.domain = crawl_sessions.domain
+        )
+    ''')
+    conn.execute('''
+        UPDATE crawl_sessions SET
+            (total_files, total_size, downloaded_files, downloaded_size) = (
+                SELECT COUNT(*),
+                       coalesce(SUM(fa.file_size_bytes), 0),
+                       coalesce(SUM(fa.download_status = 'success'), 0),
+                       coalesce(SUM(CASE WHEN fa.download_status = 'success' THEN fa.file_size_bytes END), 0)
+                FROM file_assets fa JOIN pages p ON p.id = fa.page_id
+                WHERE p.domain = crawl_sessions.domain
+            )
+    ''')
+
+
+
+# A file's row moves the session's totals out of the old page and into the new
+# one. download_status may be NULL, so its test is coalesced to 0 like the
+# backfill's SUM.
+def _create_crawl_sessions_file_triggers(conn):
+    for event, steps in (('INSERT', [('new', '+')]), ('DELETE', [('old', '-')]),
+                         ('UPDATE OF page_id, file_size_bytes, download_status', [('old', '-'), ('new', '+')])):
+        updates = ''.join(f'''
+                UPDATE crawl_sessions SET
+                    total_files = total_files {sign} 1,
+                    total_size = total_size {sign} coalesce({row}.file_size_bytes, 0),
+                    downloaded_files = downloaded_files {sign} coalesce(({row}.download_status = 'success'), 0),
+                    downloaded_size = downloaded_size {sign}
+                        (CASE WHEN {row}.download_status = 'success' THEN coalesce({row}.file_size_bytes, 0) ELSE 0 END)
+                WHERE domain = (SELECT domain FROM pages WHERE id = {row}.page_id);''' for row, sign in steps)
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS crawl_sessions_file_{event.split()[0].lower()}
+            AFTER {event} ON file_assets BEGIN{updates}
+            END
+        ''')
+
+
+# write_generation holds one counter that every writer of crawl data (the
+# page writer, DiffTracker, the API's delete endpoints) bumps in the same
+# transaction as its changes. The API compares it to decide whether a cached
+# analytics response is still current.
+def _migrate_write_generation(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS write_generation (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            generation INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('INSERT OR IGNORE INTO write_generation (id, generation) VALUES (1, 0)')
+
+
+BUMP_WRITE_GENERATION_SQL = 'UPDATE write_generation SET generation = generation + 1 WHERE id = 1'
+
+
+# crawl_counters is a single row of running totals behind /api/data/stats.
+# Each counter is the sum of an expression over one table's rows; insert and
+# delete triggers (and an update trigger for file status and size) add or
+# subtract a row's value in the same transaction, so reading the stats never
+# touches the tables themselves.
+CRAWL_COUNTERS = {
+    'pages': [('total_pages', '1')],
+    'links': [
+        ('total_links', '1'),
+        ('internal_links', "{row}.link_type = 'internal'"),
+        ('external_links', "{row}.link_type = 'external'"),
+    ],
+    'media': [('total_media', '1')],
+    'headers': [('total_headers', '1')],
+    'file_assets': [
+        ('total_file_assets', '1'),
+        ('successful_downloads', "{row}.download_status = 'success'"),
+        ('failed_downloads', "{row}.download_status = 'failed'"),
+        ('downloaded_bytes',
+         "CASE WHEN {row}.download_status = 'success' THEN coalesce({row}.file_size_bytes, 0) ELSE 0 END"),
+    ],
+}
+
+
+def _counter_update(table: str, row: str, sign: str) -> str:
+    assignments = ', '.join(
+        f"{column} = {column} {sign} coalesce({expression.format(row=row)}, 0)"
+        for column, expression in CRAWL_COUNTERS[table]
+    )
+    return f'UPDATE crawl_counters SET {assignments} WHERE id = 1;'
+
+
+def _migrate_crawl_counters(conn):
+    columns = [column for counters in CRAWL_COUNTERS.values() for column, _ in counters]
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS crawl_counters (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            {', '.join(f'{column} INTEGER NOT NULL DEFAULT 0' for column in columns)}
+        )
+    ''')
+    conn.execute('INSERT OR IGNORE INTO crawl_counters (id) VALUES (1)')
+
+    for table, counters in CRAWL_COUNTERS.items():
+        totals = ', '.join(f'coalesce(SUM({expression.format(row=table)}), 0)' for _, expression in counters)
+        conn.execute(f'''
+            UPDATE crawl_counters SET ({', '.join(column for column, _ in counters)}) = (
+                SELECT {totals} FROM {table}
+            ) WHERE id = 1
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS crawl_counters_{table}_insert AFTER INSERT ON {table} BEGIN
+                {_counter_update(table, 'new', '+')}
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS crawl_counters_{table}_delete AFTER DELETE ON {table} BEGIN
+                {_counter_update(table, 'old', '-')}
+            END
+        ''')
+
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS crawl_counters_file_assets_update
+        AFTER UPDATE OF download_status, file_size_bytes ON file_assets BEGIN
+            {_counter_update('file_assets', 'old', '-')}
+            {_counter_update('file_assets', 'new', '+')}
+        END
+    ''')
+
+
+# Time-bucketed rollups for the timeline and performance charts. crawl_rollups
+# holds page and file download totals per minute, hour and day bucket (bucket
+# is the bucket's start in unix seconds) and crawl_dimension_rollups splits the
+# page counts by proxy and by depth, so the charts read a few hundred rows
+# instead of grouping the whole history. Pages are bucketed by timestamp and
+# files by download_timestamp. Triggers keep both tables current;
+# backfill_rollups rebuilds them from the base tables.
+ROLLUP_GRANULARITIES = {'minute': 60, 'hour': 3600, 'day': 86400}
+
+ROLLUP_DIMENSIONS = {'proxy': 'proxy_used', 'depth': 'depth'}
+
+ROLLUP_FILE_COUNTERS = [
+    ('files', '1'),
+    ('downloaded_bytes',
+     "CASE WHEN {row}.download_status = 'success' THEN coalesce({row}.file_size_bytes, 0) ELSE 0 END"),
+    ('failed_downloads', "coalesce({row}.download_status = 'failed', 0)"),
+]
+
+
+def rollup_bucket(column: str, seconds: int) -> str:
+    return f'CAST({column} / {seconds} AS INTEGER) * {seconds}'
+
+
+def _page_rollup_upserts(row: str, sign: str) -> str:
+    statements = []
+    for granularity, seconds in ROLLUP_GRANULARITIES.items():
+        bucket = rollup_bucket(f'{row}.timestamp', seconds)
+        statements.append(f'''
+            INSERT INTO crawl_rollups (granularity, bucket, pages)
+            VALUES ('{granularity}', {bucket}, {sign}1)
+            ON CONFLICT (granularity, bucket) DO UPDATE SET pages = pages {sign} 1;''')
+        for dimension, column in ROLLUP_DIMENSIONS.items():
+            statements.append(f'''
+            INSERT INTO crawl_dimension_rollups (granularity, bucket, dimension, value, pages)
+            VALUES ('{granularity}', {bucket}, '{dimension}', coalesce({row}.{column}, ''), {sign}1)
+            ON CONFLICT (granularity, bucket, dimension, value) DO UPDATE SET pages = pages {sign} 1;''')
+    return ''.join(statements)
+
+
+def _file_rollup_upserts(row: str, sign: str) -> str:
+    columns = ', '.join(column for column, _ in ROLLUP_FILE_COUNTERS)
+    values = ', '.join(f'{sign}({expression.format(row=row)})' for _, expression in ROLLUP_FILE_COUNTERS)
+    updates = ', '.join(f'{column} = {column} + excluded.{column}' for column, _ in ROLLUP_FILE_COUNTERS)
+    return ''.join(f'''
+            INSERT INTO crawl_rollups (granularity, bucket, {columns})
+            VALUES ('{granularity}', {rollup_bucket(f'{row}.download_timestamp', seconds)}, {values})
+            ON CONFLICT (granularity, bucket) DO UPDATE SET {updates};'''
+        for granularity, seconds in ROLLUP_GRANULARITIES.items())
+
+
+def backfill_rollups(conn):
+    conn.execute('DELETE FROM crawl_rollups')
+    conn.execute('DELETE FROM crawl_dimension_rollups')
+    file_columns = ', '.join(column for column, _ in ROLLUP_FILE_COUNTERS)
+    file_totals = ', '.join(
+        f"SUM({expression.format(row='file_assets')})" for _, expression in ROLLUP_FILE_COUNTERS
+    )
+    file_updates = ', '.join(f'{column} = excluded.{column}' for column, _ in ROLLUP_FILE_COUNTERS)
+
+    for granularity, seconds in ROLLUP_GRANULARITIES.items():
+        conn.execute(f'''
+            INSERT INTO crawl_rollups (granularity, bucket, pages)
+            SELECT '{granularity}', {rollup_bucket('timestamp', seconds)} AS bucket, COUNT(*)
+            FROM pages WHERE timestamp IS NOT NULL
+            GROUP BY bucket
+        ''')
+        conn.execute(f'''
+            INSERT INTO crawl_rollups (granularity, bucket, {file_columns})
+            SELECT '{granularity}', {rollup_bucket('download_timestamp', seconds)} AS bucket, {file_totals}
+            FROM file_assets WHERE download_timestamp IS NOT NULL
+            GROUP BY bucket
+            ON CONFLICT (granularity, bucket) DO UPDATE SET {file_updates}
+        ''')
+        for dimension, column in ROLLUP_DIMENSIONS.items():
+            conn.execute(f'''
+                INSERT INTO crawl_dimension_rollups (granularity, bucket, dimension, value, pages)
+                SELECT '{granularity}', {rollup_bucket('timestamp', seconds)} AS bucket, '{dimension}',
+                       coalesce({column}, '') AS value, COUNT(*)
+                FROM pages WHERE timestamp IS NOT NULL
+                GROUP BY bucket, value
+            ''')
+
+
+def _migrate_rollups(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS crawl_rollups (
+            granularity TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            pages INTEGER NOT NULL DEFAULT 0,
+            files INTEGER NOT NULL DEFAULT 0,
+            downloaded_bytes INTEGER NOT NULL DEFAULT 0,
+            failed_downloads INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (granularity, bucket)
+        ) WITHOUT ROWID
+    ''')
+    # value has no declared type so depths stay integers and proxies stay text
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS crawl_dimension_rollups (
+            granularity TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            dimension TEXT NOT NULL,
+            value NOT NULL,
+            pages INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (granularity, bucket, dimension, value)
+        ) WITHOUT ROWID
+    ''')
+    backfill_rollups(conn)
+
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS crawl_rollups_pages_insert
+        AFTER INSERT ON pages WHEN new.timestamp IS NOT NULL BEGIN{_page_rollup_upserts('new', '+')}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS crawl_rollups_pages_delete
+        AFTER DELETE ON pages WHEN old.timestamp IS NOT NULL BEGIN{_page_rollup_upserts('old', '-')}
+        END
+    ''')
+    # An updated file is taken out of its old bucket and added to its new
+    # one, so the insert and delete halves are separate triggers
+    file_update = 'UPDATE OF download_status, file_size_bytes, download_timestamp'
+    for name, event, row, sign in [('insert', 'INSERT', 'new', '+'), ('delete', 'DELETE', 'old', '-'),
+                                   ('update_old', file_update, 'old', '-'),
+                                   ('update_new', file_update, 'new', '+')]:
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS crawl_rollups_file_assets_{name}
+            AFTER {event} ON file_assets WHEN {row}.download_timestamp IS NOT NULL BEGIN{_file_rollup_upserts(row, sign)}
+            END
+        ''')
+
+
+# Browser fingerprints are stored once each in the fingerprints table and
+# pages point at them through fingerprint_id. Pages fetched through the same
+# browser context share its fingerprint, so the table stays small. The
+# attributes the analytics group by are broken out into indexed columns, and
+# the canonical JSON (sorted keys) is kept as the dedup key and for page
+# details and exports.
+GEOLOCATION_CITIES = {
+    (40.7128, -74.0060): "New York",
+    (34.0522, -118.2437): "Los Angeles",
+    (51.5074, -0.1278): "London",
+    (48.8566, 2.3522): "Paris",
+    (35.6762, 139.6503): "Tokyo",
+    (52.5200, 13.4050): "Berlin",
+    (37.7749, -122.4194): "San Francisco",
+    (41.8781, -87.6298): "Chicago",
+    (43.6532, -79.3832): "Toronto",
+    (-33.8688, 151.2093): "Sydney",
+}
+
+FINGERPRINT_COLUMNS = ['user_agent', 'chrome_version', 'viewport', 'timezone_id', 'locale',
+                       'latitude', 'longitude', 'city']
+
+
+def fingerprint_city(latitude: Optional[float], longitude: Optional[float]) -> Optional[str]:
+    if latitude is None or longitude is None:
+        return None
+    for (city_latitude, city_longitude), city in GEOLOCATION_CITIES.items():
+        if abs(city_latitude - latitude) < 0.1 and abs(city_longitude - longitude) < 0.1:
+            return city
+    return None
+
+
+def fingerprint_columns(fingerprint: Dict[str, Any]) -> Dict[str, Any]:
+    user_agent = fingerprint.get('user_agent') or ''
+    viewport = fingerprint.get('viewport') or {}
+    geolocation = fingerprint.get('geolocation') or {}
+    return {
+        'user_agent': user_agent or None,
+        'chrome_version': user_agent.split('Chrome/')[1].split()[0] if 'Chrome/' in user_agent else 'Unknown',
+        'viewport': f"{viewport['width']}x{viewport['height']}" if viewport else None,
+        'timezone_id': fingerprint.get('timezone_id'),
+        'locale': fingerprint.get('locale'),
+        'latitude': geolocation.get('latitude'),
+        'longitude': geolocation.get('longitude'),
+        'city': fingerprint_city(geolocation.get('latitude'), geolocation.get('longitude')),
+    }
+
+
+def store_fingerprint(cursor, fingerprint: Optional[Dict[str, Any]]) -> Optional[int]:
+    if not fingerprint:
+        return None
+
+    data = json.dumps(fingerprint, sort_keys=True)
+    cursor.execute('SELECT id FROM fingerprints WHERE fingerprint = ?', (data,))
+    row = cursor.fetchone()
+    if row is not None:
+        return row[0]
+
+    columns = fingerprint_columns(fingerprint)
+    cursor.execute(f'''
+        INSERT INTO fingerprints (fingerprint, {', '.join(FINGERPRINT_COLUMNS)})
+        VALUES (?, {', '.join('?' * len(FINGERPRINT_COLUMNS))})
+    ''', (data, *[columns[column] for column in FINGERPRINT_COLUMNS]))
+    return cursor.lastrowid
+
+
+def _migrate_fingerprints(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS fingerprints (
+            id INTEGER PRIMARY KEY,
+            fingerprint TEXT UNIQUE NOT NULL,
+            user_agent TEXT,
+            chrome_version TEXT,
+            viewport TEXT,
+            timezone_id TEXT,
+            locale TEXT,
+            latitude REAL,
+            longitude REAL,
+            city TEXT
+        )
+    ''')
+    _add_column(conn, 'pages', 'fingerprint_id', 'INTEGER REFERENCES fingerprints(id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_pages_fingerprint ON pages(fingerprint_id)')
+
+    # Same approach as the page text store: move the JSON out of pages in
+    # batches and leave the old column empty
+    cursor = conn.cursor()
+    while True:
+        rows = cursor.execute('''
+            SELECT id, fingerprint FROM pages
+            WHERE fingerprint IS NOT NULL
+            LIMIT 500
+        ''').fetchall()
+        if not rows:
+            break
+        for page_id, data in rows:
+            try:
+                fingerprint = json.loads(data)
+            except ValueError:
+                fingerprint = None
+            cursor.execute(
+                'UPDATE pages SET fingerprint_id = ?, fingerprint = NULL WHERE id = ?',
+                (store_fingerprint(cursor, fingerprint if isinstance(fingerprint, dict) else None), page_id)
+            )
+
+
+# Schema changes are applied in order and recorded in PRAGMA user_version, so
+# an existing database only runs the steps it has not seen yet. Every step is
+# idempotent because databases created before versioning already have the
+# base tables at user_version 0.
+SCHEMA_MIGRATIONS = [
+    ('base tables', [
+        '''
+            CREATE TABLE IF NOT EXISTS pages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT UNIQUE NOT NULL,
+                title TEXT,
+                description TEXT,
+                full_text TEXT,
+                depth INTEGER,
+                timestamp REAL,
+                folder_path TEXT,
+                proxy_used TEXT,
+                fingerprint TEXT,
+                authenticated BOOLEAN
+            )
+        ''',
+        '''
+            CREATE TABLE IF NOT EXISTS headers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                page_id INTEGER,
+                header_type TEXT,
+                header_text TEXT,
+                FOREIGN KEY (page_id) REFERENCES pages(id)
+            )
+        ''',
+        '''
+            CREATE TABLE IF NOT EXISTS links (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                page_id INTEGER,
+                link_type TEXT,
+                url TEXT,
+                FOREIGN KEY (page_id) REFERENCES pages(id)
+            )
+        ''',
+        '''
+            CREATE TABLE IF NOT EXISTS media (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                page_id INTEGER,
+                src TEXT,
+                alt TEXT,
+                FOREIGN KEY (page_id) REFERENCES pages(id)
+            )
+        ''',
+        '''
+            CREATE TABLE IF NOT EXISTS structured_data (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                page_id INTEGER,
+                json_data TEXT,
+                FOREIGN KEY (page_id) REFERENCES pages(id)
+            )
+        ''',
+        '''
+            CREATE TABLE IF NOT EXISTS html_structure (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                page_id INTEGER,
+                tag_name TEXT,
+                selector TEXT,
+                text_content TEXT,
+                attributes TEXT,
+                parent_selector TEXT,
+                FOREIGN KEY (page_id) REFERENCES pages(id)
+            )
+        ''',
+        '''
+            CREATE TABLE IF NOT EXISTS file_assets (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                page_id INTEGER,
+                file_url TEXT,
+                file_name TEXT,
+                file_extension TEXT,
+                file_size_bytes INTEGER,
+                local_path TEXT,
+                download_status TEXT,
+                download_timestamp REAL,
+                mime_type TEXT,
+                FOREIGN KEY (page_id) REFERENCES pages(id)
+            )
+        ''',
+        '''
+            CREATE TABLE IF NOT EXISTS custom_extracted_data (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                page_id INTEGER,
+                field_name TEXT,
+                field_value TEXT,
+                field_type TEXT,
+                FOREIGN KEY (page_id) REFERENCES pages(id)
+            )
+        ''',
+    ]),
+    ('page_id and hot query indexes', [
+        'CREATE INDEX IF NOT EXISTS idx_headers_page ON headers(page_id, header_type)',
+        'CREATE INDEX IF NOT EXISTS idx_links_page ON links(page_id, link_type)',
+        'CREATE INDEX IF NOT EXISTS idx_links_type ON links(link_type)',
+        'CREATE INDEX IF NOT EXISTS idx_links_url ON links(url)',
+        'CREATE INDEX IF NOT EXISTS idx_media_page ON media(page_id)',
+        'CREATE INDEX IF NOT EXISTS idx_structured_data_page ON structured_data(page_id)',
+        'CREATE INDEX IF NOT EXISTS idx_html_structure_page ON html_structure(page_id)',
+        'CREATE INDEX IF NOT EXISTS idx_custom_data_page ON custom_extracted_data(page_id, field_name)',
+        'CREATE INDEX IF NOT EXISTS idx_file_assets_page ON file_assets(page_id)',
+        'CREATE INDEX IF NOT EXISTS idx_file_assets_status ON file_assets(download_status, download_timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_file_assets_ext ON file_assets(file_extension, download_status, file_size_bytes)',
+        'CREATE INDEX IF NOT EXISTS idx_pages_timestamp ON pages(timestamp, url, depth)',
+        'CREATE INDEX IF NOT EXISTS idx_pages_depth ON pages(depth)',
+    ]),
+    ('content-addressed page text', [_migrate_page_text_store]),
+    ('full-text search index', [_migrate_page_search_index]),
+    ('file name trigram index', [_migrate_file_search_index]),
+    ('per-domain crawl sessions', [_migrate_crawl_sessions]),
+    ('write generation counter', [_migrate_write_generation]),
+    ('running crawl counters', [_migrate_crawl_counters]),
+    ('time-bucket rollups', [_migrate_rollups]),
+    ('fingerprint dimension table', [_migrate_fingerprints]),
+    ('snapshot text references', [
+        PAGE_SNAPSHOTS_TABLE_SQL,
+        'CREATE INDEX IF NOT EXISTS idx_snapshots_text_hash ON page_snapshots(full_text_hash)',
+    ]),
+    ('file search filter indexes', [
+        'DROP TRIGGER IF EXISTS file_assets_fts_insert',
+        'DROP TRIGGER IF EXISTS file_assets_fts_delete',
+        'DROP TRIGGER IF EXISTS file_assets_fts_update',
+        'DROP TABLE IF EXISTS file_assets_fts',
+        _migrate_file_search_index,
+        'CREATE INDEX IF NOT EXISTS idx_file_assets_time ON file_assets(download_timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_file_assets_ext_time ON file_assets(lower(file_extension), download_timestamp)',
+    ]),
+    ('crawl session file triggers', [
+        'DROP TRIGGER IF EXISTS crawl_sessions_file_insert',
+        'DROP TRIGGER IF EXISTS crawl_sessions_file_delete',
+        'DROP TRIGGER IF EXISTS crawl_sessions_file_update',
+        _create_crawl_sessions_file_triggers,
+    ]),
+]
+
+
+def connection_pragmas() -> List[str]:
+    return [
+        f"PRAGMA synchronous = {config.DATABASE['synchronous']}",
+        f"PRAGMA mmap_size = {int(config.DATABASE['mmap_size'])}",
+        f"PRAGMA cache_size = {int(config.DATABASE['cache_size'])}",
+        f"PRAGMA busy_timeout = {int(config.DATABASE['busy_timeout_ms'])}",
+    ]
+
+
+def connect_database(db_path: str, **kwargs) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, **kwargs)
+    for pragma in connection_pragmas():
+        conn.execute(pragma)
+    register_text_functions(conn)
+    return conn
+
+
+def _run_migration(conn, target: int, statements) -> bool:
+    # Runs inside BEGIN IMMEDIATE. A migration function may be a generator:
+    # each yield commits the work so far and takes the write lock again, so
+    # a long backfill is a series of short transactions. Such migrations
+    # must be resumable, and they stop if another process finished the same
+    # step while the lock was released.
+    for statement in statements:
+        if not callable(statement):
+            conn.execute(statement)
+            continue
+        for _ in statement(conn) or ():
+            conn.execute('COMMIT')
+            conn.execute('BEGIN IMMEDIATE')
+            if conn.execute('PRAGMA user_version').fetchone()[0] >= target:
+                return False
+    return True
+
+
+def initialize_database(db_path: str) -> int:
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    register_text_functions(conn)
+    try:
+        conn.execute(f"PRAGMA journal_mode = {config.DATABASE['journal_mode']}")
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+
+        for target, (description, statements) in enumerate(SCHEMA_MIGRATIONS[version:], start=version + 1):
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Another process may have migrated while we waited for the lock
+                if conn.execute('PRAGMA user_version').fetchone()[0] >= target:
+                    conn.execute('COMMIT')
+                    continue
+                if _run_migration(conn, target, statements):
+                    conn.execute(f'PRAGMA user_version = {target}')
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            logging.getLogger("Database").info(f"Applied schema migration {target}: {description}")
+
+        # Migrations that move data out of pages leave the freed pages in the
+        # file; give them back once they are a sizeable share of it
+        if version < len(SCHEMA_MIGRATIONS):
+            free = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            total = conn.execute('PRAGMA page_count').fetchone()[0]
+            if free and free * 4 >= total:
+                try:
+                    conn.execute('VACUUM')
+                    logging.getLogger("Database").info(f"Reclaimed {free} free pages after migrating")
+                except sqlite3.OperationalError as e:
+                    logging.getLogger("Database").warning(f"VACUUM after migrating skipped: {e}")
+
+        return max(version, len(SCHEMA_MIGRATIONS))
+    finally:
+        conn.close()
+
 
 class DiffTracker:
     def __init__(self, db_path: str):
@@ -41,26 +1081,10 @@ class DiffTracker:
         self._init_diff_tables()
     
     def _init_diff_tables(self):
-        conn = sqlite3.connect(self.db_path)
+        conn = connect_database(self.db_path)
         cursor = conn.cursor()
         
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS page_snapshots (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                url TEXT NOT NULL,
-                snapshot_timestamp REAL NOT NULL,
-                page_id INTEGER,
-                content_hash TEXT,
-                title TEXT,
-                description TEXT,
-                full_text_hash TEXT,
-                header_count INTEGER,
-                link_count INTEGER,
-                media_count INTEGER,
-                file_count INTEGER,
-                FOREIGN KEY (page_id) REFERENCES pages(id)
-            )
-        ''')
+        cursor.execute(PAGE_SNAPSHOTS_TABLE_SQL)
         
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS change_log (
@@ -156,7 +1180,7 @@ class DiffTracker:
         return html_diff
     
     def create_snapshot(self, page_id: int) -> int:
-        conn = sqlite3.connect(self.db_path)
+        conn = connect_database(self.db_path)
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -171,7 +1195,7 @@ class DiffTracker:
             content_hash = self._calculate_hash(
                 f"{page['title']}|{page['description']}"
             )
-            full_text_hash = self._calculate_hash(page['full_text'] or "")
+            full_text_hash = page['text_hash'] or ""
             
             cursor.execute('SELECT COUNT(*) as count FROM headers WHERE page_id = ?', (page_id,))
             header_count = cursor.fetchone()['count']
@@ -210,6 +1234,7 @@ class DiffTracker:
             ))
             
             snapshot_id = cursor.lastrowid
+            cursor.execute(BUMP_WRITE_GENERATION_SQL)
             conn.commit()
             
             dt_logger.info(f"Created snapshot {snapshot_id} for page {page_id} ({page['url']})")
@@ -223,7 +1248,7 @@ class DiffTracker:
             conn.close()
     
     def detect_changes(self, url: str, current_page_id: int) -> Optional[Dict]:
-        conn = sqlite3.connect(self.db_path)
+        conn = connect_database(self.db_path)
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -337,14 +1362,11 @@ class DiffTracker:
                 'similarity': similarity
             })
         
-        if previous_snapshot['full_text_hash'] != self._calculate_hash(current_page['full_text'] or ""):
-            cursor.execute('SELECT full_text FROM pages WHERE id = ?', (previous_snapshot['page_id'],))
-            prev_page = cursor.fetchone()
+        if previous_snapshot['full_text_hash'] != (current_page['text_hash'] or ""):
+            previous_text = load_page_text(cursor, previous_snapshot['full_text_hash']) or ""
+            current_text = load_page_text(cursor, current_page['text_hash']) or ""
             
-            similarity = self._calculate_similarity(
-                prev_page['full_text'] or "",
-                current_page['full_text'] or ""
-            )
+            similarity = self._calculate_similarity(previous_text, current_text)
             
             if similarity < 0.95:
                 changes.append({
@@ -352,15 +1374,15 @@ class DiffTracker:
                     'category': 'full_text',
                     'summary': f'Page content changed ({similarity*100:.1f}% similar)',
                     'severity': 'high' if similarity < 0.7 else 'medium',
-                    'old_value': prev_page['full_text'][:500] if prev_page['full_text'] else "",
-                    'new_value': current_page['full_text'][:500] if current_page['full_text'] else "",
+                    'old_value': previous_text[:500],
+                    'new_value': current_text[:500],
                     'similarity': similarity
                 })
         
-        if previous_snapshot['header_count'] != current_page['header_count']:
-            cursor.execute('SELECT COUNT(*) as count FROM headers WHERE page_id = ?', (current_page_id,))
-            current_header_count = cursor.fetchone()['count']
-            
+        cursor.execute('SELECT COUNT(*) as count FROM headers WHERE page_id = ?', (current_page_id,))
+        current_header_count = cursor.fetchone()['count']
+        
+        if previous_snapshot['header_count'] != current_header_count:
             diff = current_header_count - previous_snapshot['header_count']
             changes.append({
                 'type': 'structure',
@@ -552,10 +1574,11 @@ class DiffTracker:
                         change['category']
                     ))
         
+        cursor.execute(BUMP_WRITE_GENERATION_SQL)
         conn.commit()
     
     def get_change_history(self, url: str, limit: int = 10) -> List[Dict]:
-        conn = sqlite3.connect(self.db_path)
+        conn = connect_database(self.db_path)
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -601,7 +1624,7 @@ class DiffTracker:
             conn.close()
     
     def get_all_monitored_urls(self) -> List[Dict]:
-        conn = sqlite3.connect(self.db_path)
+        conn = connect_database(self.db_path)
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -626,7 +1649,7 @@ class DiffTracker:
             conn.close()
     
     def compare_snapshots(self, snapshot_id_1: int, snapshot_id_2: int) -> Dict:
-        conn = sqlite3.connect(self.db_path)
+        conn = connect_database(self.db_path)
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
@@ -660,20 +1683,293 @@ class DiffTracker:
         finally:
             conn.close()
 
-class DataCleaner:
-    @staticmethod
-    def clean_text(value: str) -> str:
-        if not value:
-            return ""
-        value = re.sub(r'\s+', ' ', value)
-        value = value.strip()
-        return value
-    
-    @staticmethod
-    def clean_number(value: str) -> Optional[float]:
-        if not value:
-            return None
-        
+class PageWriter:
+    # Persists one scraped page per call over a long-lived connection. Each
+    # child table is written with a single executemany, and every page runs
+    # inside a SAVEPOINT so a duplicate URL only rolls back that page. With
+    # group_commit_pages > 1 several pages share one transaction; the commit
+    # happens once that many pages are pending, once the oldest pending page
+    # is group_commit_seconds old, or on flush().
+    def __init__(self, db_path: str, group_commit_pages: int = 1, group_commit_seconds: float = 2.0):
+        self.db_path = db_path
+        self.group_commit_pages = max(1, group_commit_pages)
+        self.group_commit_seconds = group_commit_seconds
+        self.conn = None
+        self._pending = []
+        self._pending_since = None
+
+    def _connect(self):
+        if self.conn is None:
+            self.conn = connect_database(self.db_path, isolation_level=None)
+        return self.conn
+
+    def write_page(self, record: Dict[str, Any]) -> List[Dict[str, Any]]:
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        if not self._pending:
+            cursor.execute('BEGIN')
+            self._pending_since = time.monotonic()
+
+        cursor.execute('SAVEPOINT page_write')
+        try:
+            page_id = self._insert_page(cursor, record)
+            cursor.execute('RELEASE SAVEPOINT page_write')
+            self._pending.append({'url': record['url'], 'page_id': page_id, 'existing': False})
+        except sqlite3.IntegrityError:
+            cursor.execute('ROLLBACK TO SAVEPOINT page_write')
+            cursor.execute('RELEASE SAVEPOINT page_write')
+            cursor.execute('SELECT id FROM pages WHERE url = ?', (record['url'],))
+            existing = cursor.fetchone()
+            self._pending.append({
+                'url': record['url'],
+                'page_id': existing[0] if existing else None,
+                'existing': True
+            })
+        except Exception:
+            cursor.execute('ROLLBACK TO SAVEPOINT page_write')
+            cursor.execute('RELEASE SAVEPOINT page_write')
+            if not self._pending:
+                cursor.execute('ROLLBACK')
+            raise
+
+        if (len(self._pending) >= self.group_commit_pages or
+                time.monotonic() - self._pending_since >= self.group_commit_seconds):
+            return self.flush()
+        return []
+
+    def _insert_page(self, cursor, record: Dict[str, Any]) -> int:
+        cursor.execute('''
+            INSERT INTO pages (url, domain, title, description, text_hash, depth, timestamp, 
+                               folder_path, proxy_used, fingerprint_id, authenticated)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (record['url'], page_domain(record['url']), record['title'], record['description'],
+              store_page_text(cursor, record['full_text']),
+              record['depth'], record['timestamp'], record['folder_path'], record['proxy_used'],
+              store_fingerprint(cursor, record['fingerprint']), record['authenticated']))
+        page_id = cursor.lastrowid
+
+        cursor.execute(
+            'INSERT INTO pages_fts (rowid, title, body) VALUES (?, ?, ?)',
+            (page_id, record['title'], record['full_text'] or None)
+        )
+
+        cursor.executemany('''
+            INSERT INTO headers (page_id, header_type, header_text)
+            VALUES (?, ?, ?)
+        ''', [
+            (page_id, header_type, text)
+            for header_type, texts in record['headers'].items()
+            for text in texts
+        ])
+
+        cursor.executemany('''
+            INSERT INTO links (page_id, link_type, url)
+            VALUES (?, ?, ?)
+        ''', [(page_id, 'internal', link) for link in set(record['internal_links'])] +
+            [(page_id, 'external', link) for link in set(record['external_links'])])
+
+        cursor.executemany('''
+            INSERT INTO media (page_id, src, alt)
+            VALUES (?, ?, ?)
+        ''', [(page_id, img['src'], img['alt']) for img in record['media']])
+
+        cursor.executemany('''
+            INSERT INTO structured_data (page_id, json_data)
+            VALUES (?, ?)
+        ''', [(page_id, json.dumps(data)) for data in record['structured_data']])
+
+        cursor.executemany('''
+            INSERT INTO html_structure (page_id, tag_name, selector, text_content, attributes, parent_selector)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [
+            (page_id, elem['tag'], elem['selector'], elem['text'],
+             json.dumps(elem['attributes']), elem['parent'])
+            for elem in record['html_structure']
+        ])
+
+        now = time.time()
+        cursor.executemany('''
+            INSERT INTO file_assets (page_id, file_url, file_name, file_extension, 
+                                    file_size_bytes, local_path, download_status, 
+                                    download_timestamp, mime_type)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [
+            (page_id, file_asset['url'], file_asset['filename'],
+             file_asset['extension'], file_asset['size_bytes'],
+             file_asset['local_path'], file_asset['status'],
+             now, file_asset['mime_type'])
+            for file_asset in record['file_assets']
+        ])
+
+        custom_rows = []
+        for field_name, field_value in record['custom_data'].items():
+            field_type = type(field_value).__name__
+            if isinstance(field_value, (list, dict)):
+                field_value = json.dumps(field_value)
+            custom_rows.append((page_id, field_name, str(field_value), field_type))
+
+        cursor.executemany('''
+            INSERT INTO custom_extracted_data (page_id, field_name, field_value, field_type)
+            VALUES (?, ?, ?, ?)
+        ''', custom_rows)
+
+        return page_id
+
+    def flush(self) -> List[Dict[str, Any]]:
+        if not self._pending:
+            return []
+
+        self.conn.execute(BUMP_WRITE_GENERATION_SQL)
+        self.conn.execute('COMMIT')
+        committed, self._pending = self._pending, []
+        self._pending_since = None
+        return committed
+
+    def discard_pending(self) -> List[Dict[str, Any]]:
+        # For when SQLite has already rolled the transaction back (a failed
+        # COMMIT usually leaves it open, to be retried by the next flush)
+        discarded, self._pending = self._pending, []
+        self._pending_since = None
+        return discarded
+
+    def close(self) -> List[Dict[str, Any]]:
+        committed = self.flush()
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+        return committed
+
+
+class DatabaseWriter:
+    # Moves page persistence off the crawl event loop. Workers enqueue page
+    # records and continue; one background task drains the bounded queue and
+    # hands each batch to a single dedicated thread, which owns the
+    # PageWriter connection and commits the batch in one transaction.
+    # after_commit runs in that thread too (blocking work such as diff
+    # tracking); its return value is passed to on_results on the event loop.
+    # on_settled gets, on the event loop, the URL of every record the writer
+    # is done with: committed, or dropped after an error. A failing record is
+    # logged and skipped without losing the rest of its batch.
+    # A full queue makes submit() wait, which bounds memory.
+    def __init__(self, page_writer: PageWriter, queue_size: int = 200,
+                 after_commit: Optional[Callable[[List[Dict[str, Any]]], Any]] = None,
+                 on_results: Optional[Callable[[Any], None]] = None,
+                 on_settled: Optional[Callable[[List[str]], None]] = None):
+        self.page_writer = page_writer
+        self.queue_size = max(1, queue_size)
+        self.after_commit = after_commit
+        self.on_results = on_results
+        self.on_settled = on_settled
+        self.queue = None
+        self.task = None
+        self.executor = None
+        self.stats = {'pages_written': 0, 'batches': 0, 'errors': 0}
+
+    def start(self):
+        if self.task is not None and not self.task.done():
+            return
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self.task = asyncio.create_task(self._run())
+
+    async def submit(self, record: Dict[str, Any]):
+        self.start()
+        await self.queue.put(record)
+
+    async def join(self):
+        if self.queue is not None:
+            await self.queue.join()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.page_writer.group_commit_pages and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            stop = batch[-1] is None
+            records = [record for record in batch if record is not None]
+
+            try:
+                if records:
+                    settled, result = await loop.run_in_executor(self.executor, self._write_batch, records)
+                    if self.on_settled and settled:
+                        self.on_settled(settled)
+                    if self.on_results and result:
+                        self.on_results(result)
+            except Exception as e:
+                self.stats['errors'] += 1
+                dw_logger.error(f"Failed to write {len(records)} page(s): {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+            if stop:
+                return
+
+    def _write_batch(self, records: List[Dict[str, Any]]) -> Tuple[List[str], Any]:
+        committed = []
+        failed = []
+        for record in records:
+            try:
+                committed.extend(self.page_writer.write_page(record))
+            except Exception as e:
+                self.stats['errors'] += 1
+                failed.append(record['url'])
+                dw_logger.error(f"Failed to write {record['url']}: {e}")
+
+        try:
+            committed.extend(self.page_writer.flush())
+        except Exception as e:
+            self.stats['errors'] += 1
+            if self.page_writer.conn.in_transaction:
+                dw_logger.error(f"Commit failed, retrying with the next batch: {e}")
+            else:
+                dropped = self.page_writer.discard_pending()
+                failed.extend(page['url'] for page in dropped)
+                dw_logger.error(f"Commit failed, dropped {len(dropped)} page(s): {e}")
+
+        self.stats['pages_written'] += len(committed)
+        self.stats['batches'] += 1
+
+        result = None
+        if self.after_commit and committed:
+            try:
+                result = self.after_commit(committed)
+            except Exception as e:
+                dw_logger.error(f"Post-commit hook failed: {e}")
+        return [page['url'] for page in committed] + failed, result
+
+    async def close(self):
+        if self.task is None:
+            self.page_writer.close()
+            return
+
+        if not self.task.done():
+            await self.queue.put(None)
+            await self.task
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self.page_writer.close)
+        self.executor.shutdown(wait=True)
+        self.task = None
+
+
+class DataCleaner:
+    @staticmethod
+    def clean_text(value: str) -> str:
+        if not value:
+            return ""
+        value = re.sub(r'\s+', ' ', value)
+        value = value.strip()
+        return value
+    
+    @staticmethod
+    def clean_number(value: str) -> Optional[float]:
+        if not value:
+            return None
+        
         try:
             cleaned = re.sub(r'[^\d.\-]', '', str(value))
             return float(cleaned) if cleaned else None
@@ -1031,6 +2327,860 @@ class ExtractionEngine:
         
         return True
 
+def _url_hash64(url: str) -> int:
+    return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class ExactVisitedSet(set):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._string_bytes = sum(sys.getsizeof(url) for url in self)
+
+    def add(self, url: str):
+        if url not in self:
+            super().add(url)
+            self._string_bytes += sys.getsizeof(url)
+
+    def memory_bytes(self) -> int:
+        return sys.getsizeof(self) + self._string_bytes
+
+
+class FingerprintSet:
+    # Open-addressing hash table of 64-bit URL fingerprints stored in a flat
+    # array('Q'), 8 bytes per slot. Slot value 0 marks an empty slot, so a
+    # fingerprint of 0 is stored as 1. Collisions between distinct URLs are
+    # possible but need ~4 billion URLs before they become likely.
+    def __init__(self, initial_capacity: int = 1024, max_load: float = 0.7):
+        capacity = 1024
+        while capacity * max_load < initial_capacity:
+            capacity *= 2
+        self.max_load = max_load
+        self._count = 0
+        self._slots = array('Q', bytes(8 * capacity))
+        self._mask = capacity - 1
+
+    def _find(self, fingerprint: int) -> int:
+        slots = self._slots
+        mask = self._mask
+        index = fingerprint & mask
+        while True:
+            value = slots[index]
+            if value == 0 or value == fingerprint:
+                return index
+            index = (index + 1) & mask
+
+    def _resize(self):
+        old_slots = self._slots
+        self._slots = array('Q', bytes(16 * len(old_slots)))
+        self._mask = len(self._slots) - 1
+        for value in old_slots:
+            if value:
+                self._slots[self._find(value)] = value
+
+    def __contains__(self, url: str) -> bool:
+        fingerprint = _url_hash64(url) or 1
+        return self._slots[self._find(fingerprint)] == fingerprint
+
+    def add(self, url: str):
+        fingerprint = _url_hash64(url) or 1
+        index = self._find(fingerprint)
+        if self._slots[index] == fingerprint:
+            return
+
+        self._slots[index] = fingerprint
+        self._count += 1
+        if self._count > len(self._slots) * self.max_load:
+            self._resize()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def memory_bytes(self) -> int:
+        return sys.getsizeof(self._slots)
+
+
+class _BloomSlice:
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def contains(self, h1: int, h2: int) -> bool:
+        bits = self.bits
+        num_bits = self.num_bits
+        for i in range(self.num_hashes):
+            pos = (h1 + i * h2) % num_bits
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def add(self, h1: int, h2: int):
+        bits = self.bits
+        num_bits = self.num_bits
+        for i in range(self.num_hashes):
+            pos = (h1 + i * h2) % num_bits
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+
+class ScalableBloomFilter:
+    # Chain of Bloom filters (Almeida et al.): each new slice doubles in size
+    # and tightens its error rate so the compound false-positive rate stays
+    # below error_rate. A false positive makes the crawler skip a URL it has
+    # never seen, so keep error_rate small.
+    def __init__(self, initial_capacity: int = 100000, error_rate: float = 0.001,
+                 growth: int = 2, tightening: float = 0.85):
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+        self._count = 0
+        self._slices = []
+        self._add_slice()
+
+    def _add_slice(self):
+        index = len(self._slices)
+        capacity = self.initial_capacity * (self.growth ** index)
+        slice_error = self.error_rate * (1 - self.tightening) * (self.tightening ** index)
+        self._slices.append(_BloomSlice(capacity, slice_error))
+
+    @staticmethod
+    def _hashes(url: str) -> Tuple[int, int]:
+        digest = hashlib.blake2b(url.encode('utf-8'), digest_size=16).digest()
+        return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+    def __contains__(self, url: str) -> bool:
+        h1, h2 = self._hashes(url)
+        return any(bloom.contains(h1, h2) for bloom in reversed(self._slices))
+
+    def add(self, url: str):
+        h1, h2 = self._hashes(url)
+        if any(bloom.contains(h1, h2) for bloom in reversed(self._slices)):
+            return
+
+        if self._slices[-1].count >= self._slices[-1].capacity:
+            self._add_slice()
+        self._slices[-1].add(h1, h2)
+        self._count += 1
+
+    def __len__(self) -> int:
+        return self._count
+
+    def memory_bytes(self) -> int:
+        return sum(sys.getsizeof(bloom.bits) for bloom in self._slices)
+
+
+class CrawlFrontier(ABC):
+    # Frontiers that do blocking I/O set an executor; the scraper runs their
+    # calls on it, one at a time and in submission order.
+    executor = None
+
+    def __init__(self, visited=None, score_fn: Optional[Callable] = None):
+        self.visited = visited if visited is not None else set()
+        self.score_fn = score_fn
+
+    @abstractmethod
+    def push(self, url: str, depth: int) -> bool:
+        ...
+
+    def push_many(self, urls: Iterable[str], depth: int) -> int:
+        return sum(1 for url in dict.fromkeys(urls) if self.push(url, depth))
+
+    @abstractmethod
+    def pop(self) -> Optional[Tuple[str, int]]:
+        ...
+
+    @abstractmethod
+    def peek(self) -> Optional[Tuple[str, int]]:
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    def complete(self, url: str):
+        pass
+
+    def known_urls(self, urls: Iterable[str]) -> set:
+        return {url for url in urls if url in self.visited}
+
+    def expects_more(self) -> bool:
+        return False
+
+    def close(self, finished: bool = False):
+        pass
+
+
+class FifoFrontier(CrawlFrontier):
+    def __init__(self, visited=None, score_fn: Optional[Callable] = None):
+        super().__init__(visited, score_fn)
+        self._queue = deque()
+
+    def push(self, url: str, depth: int) -> bool:
+        if url in self.visited:
+            return False
+
+        self.visited.add(url)
+        self._queue.append((url, depth))
+        return True
+
+    def pop(self) -> Optional[Tuple[str, int]]:
+        return self._queue.popleft() if self._queue else None
+
+    def peek(self) -> Optional[Tuple[str, int]]:
+        return self._queue[0] if self._queue else None
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+
+class PriorityFrontier(CrawlFrontier):
+    # Bucket queue: one FIFO deque per distinct score plus a heap of the live
+    # bucket keys. Pushes and pops are O(1) amortized while the number of
+    # distinct scores stays small (depth or in-degree scoring). Re-scored URLs
+    # are appended to their new bucket and the stale entry is skipped on pop.
+    def __init__(self, visited=None, score_fn: Optional[Callable] = None, scoring: str = 'depth'):
+        super().__init__(visited, score_fn)
+        self.scoring = scoring
+        self._buckets = {}
+        self._keys = []
+        self._pending = {}
+        self._inlinks = {}
+
+    def score(self, url: str, depth: int, inlinks: int) -> float:
+        if self.score_fn:
+            return self.score_fn(url, depth, inlinks)
+        if self.scoring == 'inlinks':
+            return inlinks
+        return -depth
+
+    def push(self, url: str, depth: int) -> bool:
+        if url in self._pending:
+            self._inlinks[url] += 1
+            if self.score_fn or self.scoring == 'inlinks':
+                self._enqueue(url, self._pending[url][0])
+            return False
+
+        if url in self.visited:
+            return False
+
+        self.visited.add(url)
+        self._inlinks[url] = 1 if depth > 0 else 0
+        self._enqueue(url, depth)
+        return True
+
+    def _enqueue(self, url: str, depth: int):
+        key = -self.score(url, depth, self._inlinks[url])
+
+        previous = self._pending.get(url)
+        if previous is not None and previous[1] == key:
+            return
+
+        self._pending[url] = (depth, key)
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = deque()
+            heapq.heappush(self._keys, key)
+        bucket.append(url)
+
+    def _head(self) -> Optional[Tuple[Any, str]]:
+        while self._keys:
+            key = self._keys[0]
+            bucket = self._buckets[key]
+
+            while bucket:
+                url = bucket[0]
+                entry = self._pending.get(url)
+                if entry is not None and entry[1] == key:
+                    return key, url
+                bucket.popleft()
+
+            heapq.heappop(self._keys)
+            del self._buckets[key]
+
+        return None
+
+    def pop(self) -> Optional[Tuple[str, int]]:
+        head = self._head()
+        if head is None:
+            return None
+
+        key, url = head
+        self._buckets[key].popleft()
+        depth, _ = self._pending.pop(url)
+        self._inlinks.pop(url, None)
+        return url, depth
+
+    def peek(self) -> Optional[Tuple[str, int]]:
+        head = self._head()
+        if head is None:
+            return None
+        return head[1], self._pending[head[1]][0]
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+class SQLiteVisitedIndex:
+    def __init__(self, frontier: 'SQLiteFrontier'):
+        self._frontier = frontier
+
+    def __contains__(self, url: str) -> bool:
+        return self._frontier.is_known(url)
+
+    def __len__(self) -> int:
+        return self._frontier.known_count
+
+    def add(self, url: str):
+        self._frontier.mark_visited(url)
+
+    def memory_bytes(self) -> int:
+        return 0
+
+
+class SQLiteFrontier(CrawlFrontier):
+    # Pending URLs and the visited index share one table: every URL the crawl
+    # has seen owns a row whose state moves pending -> active -> done. Writes
+    # are buffered and flushed in batches, and pops read ahead a batch of the
+    # highest-priority pending rows, so memory stays bounded by batch_size.
+    # The connection belongs to the frontier's executor thread: the scraper
+    # runs every call there so no lookup blocks the event loop.
+    LOOKUP_BATCH = 500
+
+    def __init__(self, db_path: str, crawl_key: str, score_fn: Optional[Callable] = None,
+                 scoring: str = 'depth', batch_size: int = 100, resume: bool = True):
+        self.db_path = db_path
+        self.crawl_key = crawl_key
+        self.scoring = scoring
+        self.batch_size = max(1, batch_size)
+        self.score_fn = score_fn
+
+        self._write_buffer = {}
+        self._inlink_buffer = {}
+        self._done_buffer = []
+        self._read_ahead = deque()
+
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="frontier")
+        self.conn = connect_database(self.db_path, check_same_thread=False)
+        self._init_frontier_tables()
+
+        self.resumed = False
+        self.completed_count = 0
+        self._open_crawl(resume)
+
+        self.visited = SQLiteVisitedIndex(self)
+
+    def _init_frontier_tables(self):
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS crawl_frontier (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                crawl_key TEXT NOT NULL,
+                url TEXT NOT NULL,
+                depth INTEGER NOT NULL,
+                priority REAL NOT NULL,
+                inlinks INTEGER DEFAULT 0,
+                state TEXT DEFAULT 'pending',
+                UNIQUE(crawl_key, url)
+            )
+        ''')
+        self.conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_crawl_frontier_pending
+            ON crawl_frontier(crawl_key, state, priority DESC, id)
+        ''')
+        self.conn.commit()
+
+    def _open_crawl(self, resume: bool):
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT COUNT(*) FROM crawl_frontier
+            WHERE crawl_key = ? AND state IN ('pending', 'active')
+        ''', (self.crawl_key,))
+        unfinished = cursor.fetchone()[0]
+
+        if resume and unfinished:
+            cursor.execute('''
+                UPDATE crawl_frontier SET state = 'pending'
+                WHERE crawl_key = ? AND state = 'active'
+            ''', (self.crawl_key,))
+            cursor.execute('''
+                SELECT COUNT(*), SUM(state = 'done') FROM crawl_frontier WHERE crawl_key = ?
+            ''', (self.crawl_key,))
+            self.known_count, done = cursor.fetchone()
+            self.completed_count = done or 0
+            self.resumed = True
+            fr_logger.info(f"Resuming crawl {self.crawl_key}: {unfinished} pending, {self.completed_count} done")
+        else:
+            cursor.execute('DELETE FROM crawl_frontier WHERE crawl_key = ?', (self.crawl_key,))
+            self.known_count = 0
+
+        self.conn.commit()
+        cursor.execute('''
+            SELECT COUNT(*) FROM crawl_frontier WHERE crawl_key = ? AND state = 'pending'
+        ''', (self.crawl_key,))
+        self._pending_count = cursor.fetchone()[0]
+
+    def score(self, url: str, depth: int, inlinks: int) -> float:
+        if self.score_fn:
+            return self.score_fn(url, depth, inlinks)
+        if self.scoring == 'inlinks':
+            return inlinks
+        return -depth
+
+    def known_urls(self, urls: Iterable[str]) -> set:
+        urls = list(dict.fromkeys(urls))
+        known = {url for url in urls if url in self._write_buffer}
+        lookup = [url for url in urls if url not in known]
+
+        for start in range(0, len(lookup), self.LOOKUP_BATCH):
+            batch = lookup[start:start + self.LOOKUP_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            known.update(row[0] for row in self.conn.execute(
+                f'SELECT url FROM crawl_frontier WHERE crawl_key = ? AND url IN ({placeholders})',
+                [self.crawl_key, *batch]
+            ))
+        return known
+
+    def is_known(self, url: str) -> bool:
+        return url in self.known_urls([url])
+
+    def push(self, url: str, depth: int) -> bool:
+        return self._push(url, depth, self.is_known(url))
+
+    def push_many(self, urls: Iterable[str], depth: int) -> int:
+        # One lookup answers the visited check for every link on the page
+        urls = list(dict.fromkeys(urls))
+        known = self.known_urls(urls)
+        return sum(1 for url in urls if self._push(url, depth, url in known))
+
+    def _push(self, url: str, depth: int, known: bool) -> bool:
+        if url in self._write_buffer:
+            entry = self._write_buffer[url]
+            entry[1] += 1
+            entry[2] = self.score(url, entry[0], entry[1])
+            return False
+
+        if known:
+            self._inlink_buffer[url] = self._inlink_buffer.get(url, 0) + 1
+            self._maybe_flush()
+            return False
+
+        inlinks = 1 if depth > 0 else 0
+        self._write_buffer[url] = [depth, inlinks, self.score(url, depth, inlinks)]
+        self.known_count += 1
+        self._pending_count += 1
+        self._maybe_flush()
+        return True
+
+    def mark_visited(self, url: str):
+        # Records the URL as already crawled without scheduling it
+        if url in self._write_buffer:
+            return
+        cursor = self.conn.execute('''
+            INSERT OR IGNORE INTO crawl_frontier (crawl_key, url, depth, priority, state)
+            VALUES (?, ?, 0, 0, 'done')
+        ''', (self.crawl_key, url))
+        self.known_count += cursor.rowcount
+        self.conn.commit()
+
+    def _maybe_flush(self):
+        if len(self._write_buffer) + len(self._inlink_buffer) + len(self._done_buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not (self._write_buffer or self._inlink_buffer or self._done_buffer):
+            return
+
+        cursor = self.conn.cursor()
+        if self._write_buffer:
+            cursor.executemany('''
+                INSERT OR IGNORE INTO crawl_frontier (crawl_key, url, depth, priority, inlinks)
+                VALUES (?, ?, ?, ?, ?)
+            ''', [
+                (self.crawl_key, url, depth, priority, inlinks)
+                for url, (depth, inlinks, priority) in self._write_buffer.items()
+            ])
+
+        if self._inlink_buffer:
+            rescore = self.scoring == 'inlinks' and not self.score_fn
+            cursor.executemany('''
+                UPDATE crawl_frontier
+                SET inlinks = inlinks + ?, priority = priority + ?
+                WHERE crawl_key = ? AND url = ? AND state = 'pending'
+            ''', [
+                (count, count if rescore else 0, self.crawl_key, url)
+                for url, count in self._inlink_buffer.items()
+            ])
+
+        if self._done_buffer:
+            cursor.executemany(
+                "UPDATE crawl_frontier SET state = 'done' WHERE crawl_key = ? AND url = ?",
+                [(self.crawl_key, url) for url in self._done_buffer]
+            )
+
+        self.conn.commit()
+        self._write_buffer.clear()
+        self._inlink_buffer.clear()
+        self._done_buffer.clear()
+
+    def _fill_read_ahead(self):
+        self.flush()
+        rows = self.conn.execute('''
+            SELECT url, depth FROM crawl_frontier
+            WHERE crawl_key = ? AND state = 'pending'
+            ORDER BY priority DESC, id
+            LIMIT ?
+        ''', (self.crawl_key, self.batch_size)).fetchall()
+
+        if rows:
+            self.conn.executemany(
+                "UPDATE crawl_frontier SET state = 'active' WHERE crawl_key = ? AND url = ?",
+                [(self.crawl_key, url) for url, _ in rows]
+            )
+            self.conn.commit()
+            self._read_ahead.extend(rows)
+
+    def pop(self) -> Optional[Tuple[str, int]]:
+        if not self._read_ahead:
+            self._fill_read_ahead()
+        if not self._read_ahead:
+            return None
+
+        self._pending_count -= 1
+        url, depth = self._read_ahead.popleft()
+        return url, depth
+
+    def peek(self) -> Optional[Tuple[str, int]]:
+        if not self._read_ahead:
+            self._fill_read_ahead()
+        return tuple(self._read_ahead[0]) if self._read_ahead else None
+
+    def complete(self, url: str):
+        self.completed_count += 1
+        self._done_buffer.append(url)
+        self._maybe_flush()
+
+    def __len__(self) -> int:
+        return self._pending_count
+
+    def close(self, finished: bool = False):
+        if self._read_ahead:
+            self.conn.executemany(
+                "UPDATE crawl_frontier SET state = 'pending' WHERE crawl_key = ? AND url = ?",
+                [(self.crawl_key, url) for url, _ in self._read_ahead]
+            )
+            self._read_ahead.clear()
+        self.flush()
+
+        # A crawl that ran to completion drops its leftover queue so the next
+        # run on the same start URL starts fresh instead of resuming. The done
+        # rows stay behind to answer visited lookups until then.
+        if finished:
+            self.conn.execute(
+                "DELETE FROM crawl_frontier WHERE crawl_key = ? AND state != 'done'",
+                (self.crawl_key,)
+            )
+            self._pending_count = 0
+        self.conn.commit()
+
+
+class ShardFrontier(CrawlFrontier):
+    # Frontier of a worker process in sharded mode. URLs arrive from the
+    # coordinator via feed(); discovered links and completions are reported
+    # back instead of being queued locally, since the coordinator owns
+    # deduplication and the page budget.
+    def __init__(self, shard_id: int, result_queue):
+        super().__init__()
+        self.shard_id = shard_id
+        self.result_queue = result_queue
+        self.accepting = True
+        self._queue = deque()
+
+    def feed(self, url: str, depth: int):
+        self._queue.append((url, depth))
+
+    def push(self, url: str, depth: int) -> bool:
+        return self.push_many([url], depth) > 0
+
+    def push_many(self, urls: Iterable[str], depth: int) -> int:
+        urls = list(dict.fromkeys(urls))
+        if urls:
+            self.result_queue.put(('links', self.shard_id, urls, depth))
+        return len(urls)
+
+    def pop(self) -> Optional[Tuple[str, int]]:
+        return self._queue.popleft() if self._queue else None
+
+    def peek(self) -> Optional[Tuple[str, int]]:
+        return self._queue[0] if self._queue else None
+
+    def complete(self, url: str):
+        self.result_queue.put(('done', self.shard_id, url))
+
+    def expects_more(self) -> bool:
+        return self.accepting
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+
+class ShardPageSink:
+    # Stands in for the DatabaseWriter of a worker process in sharded mode.
+    # Page records go to the coordinator, whose single writer commits them,
+    # and the coordinator answers with the URLs it has settled so the shard
+    # completes its frontier URLs only after their pages are written.
+    def __init__(self, shard_id: int, result_queue, on_settled: Optional[Callable[[List[str]], None]] = None):
+        self.shard_id = shard_id
+        self.result_queue = result_queue
+        self.on_settled = on_settled
+        self.stats = {'pages_sent': 0}
+
+    async def submit(self, record: Dict[str, Any]):
+        self.result_queue.put(('page', self.shard_id, record))
+        self.stats['pages_sent'] += 1
+
+    def settle(self, urls: List[str]):
+        if self.on_settled and urls:
+            self.on_settled(urls)
+
+    async def close(self):
+        pass
+
+
+class _HostState:
+    def __init__(self, rate: float, burst: float, limit: int):
+        self.rate = rate
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.limit = limit
+        self.in_flight = 0
+        self.latency = None
+        self.samples = 0
+        self.successes = 0
+        self.backoffs = 0
+        self.blocked_until = 0.0
+        self.changed = asyncio.Event()
+
+
+class HostScheduler:
+    # Token bucket per host for request rate plus an AIMD limit on requests
+    # in flight: 429/503 halves the limit and rate and blocks the host for
+    # Retry-After (or an exponential backoff), a latency spike drops the
+    # limit by one, and every recovery_successes healthy responses raise it
+    # by one again, up to the configured maximum.
+    def __init__(self, requests_per_second: float = 2.0, burst: float = 2, max_in_flight: int = 4,
+                 min_in_flight: int = 1, latency_threshold_factor: float = 2.0,
+                 recovery_successes: int = 10, backoff_statuses=(429, 503),
+                 max_backoff_seconds: float = 60, enabled: bool = True):
+        self.enabled = enabled
+        self.requests_per_second = requests_per_second
+        self.burst = max(1, burst)
+        self.max_in_flight = max(1, max_in_flight)
+        self.min_in_flight = max(1, min(min_in_flight, self.max_in_flight))
+        self.latency_threshold_factor = latency_threshold_factor
+        self.recovery_successes = recovery_successes
+        self.backoff_statuses = set(backoff_statuses)
+        self.max_backoff_seconds = max_backoff_seconds
+        self._hosts = {}
+
+    def _state(self, url: str) -> _HostState:
+        host = urlparse(url).netloc.lower()
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(self.requests_per_second, self.burst, self.max_in_flight)
+        return state
+
+    def _refill(self, state: _HostState, now: float):
+        state.tokens = min(self.burst, state.tokens + (now - state.updated) * state.rate)
+        state.updated = now
+
+    def _notify(self, state: _HostState):
+        state.changed.set()
+        state.changed = asyncio.Event()
+
+    async def acquire(self, url: str):
+        if not self.enabled:
+            return
+
+        state = self._state(url)
+        while True:
+            now = time.monotonic()
+            self._refill(state, now)
+
+            if state.blocked_until > now:
+                delay = state.blocked_until - now
+            elif state.in_flight >= state.limit:
+                delay = None
+            elif state.tokens < 1:
+                delay = (1 - state.tokens) / state.rate
+            else:
+                state.tokens -= 1
+                state.in_flight += 1
+                return
+
+            try:
+                await asyncio.wait_for(state.changed.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def is_backoff_status(self, status: Optional[int]) -> bool:
+        return self.enabled and status in self.backoff_statuses
+
+    def release(self, url: str, status: Optional[int] = None, latency: Optional[float] = None,
+                retry_after: Optional[float] = None):
+        if not self.enabled:
+            return
+
+        state = self._state(url)
+        state.in_flight = max(0, state.in_flight - 1)
+
+        if status in self.backoff_statuses:
+            self._back_off(state, retry_after)
+        elif status is not None and latency is not None:
+            spike = state.samples >= 3 and latency > state.latency * self.latency_threshold_factor
+            state.latency = latency if state.latency is None else 0.8 * state.latency + 0.2 * latency
+            state.samples += 1
+
+            if spike:
+                state.limit = max(self.min_in_flight, state.limit - 1)
+                state.successes = 0
+            else:
+                state.backoffs = 0
+                state.successes += 1
+                if state.successes >= self.recovery_successes:
+                    state.successes = 0
+                    state.limit = min(self.max_in_flight, state.limit + 1)
+                    state.rate = min(self.requests_per_second, state.rate * 2)
+
+        self._notify(state)
+
+    def _back_off(self, state: _HostState, retry_after: Optional[float]):
+        state.backoffs += 1
+        state.successes = 0
+        state.limit = max(self.min_in_flight, state.limit // 2)
+        state.rate = max(self.requests_per_second / 16, state.rate / 2)
+        state.tokens = 0
+
+        delay = retry_after if retry_after is not None else 2 ** state.backoffs
+        delay = min(self.max_backoff_seconds, max(0, delay))
+        state.blocked_until = max(state.blocked_until, time.monotonic() + delay)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            host: {
+                'in_flight': state.in_flight,
+                'limit': state.limit,
+                'requests_per_second': round(state.rate, 3),
+                'avg_latency': round(state.latency, 3) if state.latency is not None else None,
+            }
+            for host, state in self._hosts.items()
+        }
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return (retry_at - datetime.now(retry_at.tzinfo)).total_seconds()
+
+
+class PooledContext:
+    def __init__(self, context, fingerprint, key):
+        self.context = context
+        self.fingerprint = fingerprint
+        self.key = key
+        self.pages_served = 0
+        self.created_at = time.monotonic()
+
+
+class BrowserContextPool:
+    # Contexts are handed out exclusively to one page at a time and returned
+    # afterwards. Each context keeps the fingerprint it was created with and
+    # is rotated after max_pages pages or max_age seconds, or immediately if
+    # the page it served failed.
+    def __init__(self, create_context: Callable, max_pages: int = 20,
+                 max_age_seconds: float = 300, max_idle: int = 10):
+        self.create_context = create_context
+        self.max_pages = max(1, max_pages)
+        self.max_age_seconds = max_age_seconds
+        self.max_idle = max_idle
+        self._idle = {}
+        self._idle_count = 0
+        self.stats = {'created': 0, 'reused': 0, 'discarded': 0}
+
+    @staticmethod
+    def _key(proxy, storage_state):
+        return (proxy, id(storage_state) if storage_state else None)
+
+    def _expired(self, pooled: PooledContext) -> bool:
+        return (pooled.pages_served >= self.max_pages or
+                time.monotonic() - pooled.created_at >= self.max_age_seconds)
+
+    async def acquire(self, browser, proxy=None, storage_state=None) -> PooledContext:
+        key = self._key(proxy, storage_state)
+        idle = self._idle.get(key)
+
+        while idle:
+            pooled = idle.popleft()
+            self._idle_count -= 1
+            if not self._expired(pooled):
+                self.stats['reused'] += 1
+                return pooled
+            await self._close(pooled)
+
+        context, fingerprint = await self.create_context(browser, proxy, storage_state=storage_state)
+        self.stats['created'] += 1
+        return PooledContext(context, fingerprint, key)
+
+    async def release(self, pooled: PooledContext, discard: bool = False):
+        pooled.pages_served += 1
+
+        if discard:
+            self.stats['discarded'] += 1
+            await self._close(pooled)
+            return
+
+        if self._expired(pooled):
+            await self._close(pooled)
+            return
+
+        self._idle.setdefault(pooled.key, deque()).append(pooled)
+        self._idle_count += 1
+
+        if self._idle_count > self.max_idle:
+            await self._evict_oldest()
+
+    async def _evict_oldest(self):
+        oldest_key = min(
+            (key for key, idle in self._idle.items() if idle),
+            key=lambda key: self._idle[key][0].created_at
+        )
+        self._idle_count -= 1
+        await self._close(self._idle[oldest_key].popleft())
+
+    async def _close(self, pooled: PooledContext):
+        try:
+            await pooled.context.close()
+        except Exception:
+            pass
+
+    async def close(self):
+        idle, self._idle = self._idle, {}
+        self._idle_count = 0
+        for contexts in idle.values():
+            for pooled in contexts:
+                await self._close(pooled)
+
+
 class Scraper:
     def __init__(
         self, start_url, 
@@ -1053,10 +3203,25 @@ class Scraper:
         smart_scroll_iterations=None,
         max_page_retries=None,
         max_download_retries=None,
+        frontier=None,
+        frontier_scoring=None,
+        resume_crawl=None,
+        worker_processes=None,
     ):
         self.start_url = self._normalize_url(start_url)
+        self._workers_event = asyncio.Event()
         self.should_stop = False
         self.is_paused = False
+        self.active_workers = 0
+        # A frontier URL is completed only once its worker has finished and
+        # every page record it produced has been committed (or dropped) by the
+        # database writer, so a resumed crawl never skips an unsaved page.
+        # _completion_holds counts the outstanding holders per frontier URL;
+        # _awaiting_commit maps a submitted page URL back to its frontier URLs.
+        self._completion_holds = {}
+        self._awaiting_commit = {}
+        # Set in a shard process to tell the coordinator about captcha pauses
+        self.on_captcha_pause = None
         self.domain = urlparse(self.start_url).netloc
         
         self.max_page_retries = max_page_retries if max_page_retries is not None else config.SCRAPER['max_page_retries']
@@ -1067,6 +3232,12 @@ class Scraper:
         self.headless = headless if headless is not None else config.FEATURES['headless_browser']
         self.concurrent_limit = concurrent_limit if concurrent_limit is not None else config.SCRAPER['concurrent_limit']
         self.proxy_list = proxy_list if proxy_list is not None else config.PROXY['proxy_list']
+        self.frontier_mode = frontier if frontier is not None else config.SCRAPER['frontier']
+        self.frontier_scoring = frontier_scoring if frontier_scoring is not None else config.SCRAPER['frontier_scoring']
+        self.frontier_batch_size = config.SCRAPER['frontier_batch_size']
+        self.visited_backend = config.SCRAPER['visited_backend']
+        self.worker_processes = worker_processes if worker_processes is not None else config.SCRAPER['worker_processes']
+        self.resume_crawl = resume_crawl if resume_crawl is not None else config.SCRAPER['resume_crawl']
         
         self.download_file_assets = download_file_assets if download_file_assets is not None else config.FEATURES['download_file_assets']
         self.max_file_size_mb = max_file_size_mb if max_file_size_mb is not None else config.FILE_DOWNLOAD['max_file_size_mb']
@@ -1088,6 +3259,15 @@ class Scraper:
 
         self.smart_scroll_iterations = smart_scroll_iterations if smart_scroll_iterations is not None else config.SCRAPER['smart_scroll_iterations']
         
+        self.host_scheduler = self._create_host_scheduler()
+        
+        self.context_pool = BrowserContextPool(
+            self.create_context,
+            max_pages=config.SCRAPER['context_reuse_pages'],
+            max_age_seconds=config.SCRAPER['context_max_age_seconds'],
+            max_idle=self.concurrent_limit
+        )
+        
         if not os.path.exists(self.base_dir):
             os.makedirs(self.base_dir)
 
@@ -1101,10 +3281,13 @@ class Scraper:
         self.db_path = os.path.join(self.base_dir, "scraped_data.db")
         self._init_database()
         
-        self.queue = deque([(self.start_url, 0)])
-        self.visited = set([self.start_url])
+        self.frontier = self._create_frontier()
         self.pages_scraped = 0
-        self.lock = asyncio.Lock()
+        if getattr(self.frontier, 'resumed', False):
+            self.pages_scraped = self.frontier.completed_count
+        else:
+            self.frontier.push(self.start_url, 0)
+        self.visited = self.frontier.visited
         
         self.downloads_stats = {
             'total_attempted': 0,
@@ -1119,6 +3302,33 @@ class Scraper:
         self.extraction_engine = ExtractionEngine()
         self.extraction_rules = {}
 
+    @property
+    def is_paused(self):
+        return self._is_paused
+    
+    @is_paused.setter
+    def is_paused(self, value):
+        self._is_paused = value
+        self._notify_workers()
+    
+    @property
+    def should_stop(self):
+        return self._should_stop
+    
+    @should_stop.setter
+    def should_stop(self, value):
+        self._should_stop = value
+        self._notify_workers()
+    
+    def _notify_workers(self):
+        # Wake every worker waiting on the current event and hand out a fresh
+        # one for the next wait, so no wakeup is lost between check and wait.
+        self._workers_event.set()
+        self._workers_event = asyncio.Event()
+    
+    async def _wait_for_workers_event(self):
+        await self._workers_event.wait()
+
     def _setup_logging(self):
         self.logger = logging.getLogger('Scraper')
     
@@ -1151,10 +3361,74 @@ class Scraper:
         
         return fingerprint
     
+    def _create_host_scheduler(self, share=1):
+        politeness = config.POLITENESS
+        return HostScheduler(
+            requests_per_second=politeness['requests_per_second'] / share,
+            burst=politeness['burst'],
+            max_in_flight=max(1, politeness['max_in_flight_per_host'] // share),
+            min_in_flight=politeness['min_in_flight_per_host'],
+            latency_threshold_factor=politeness['latency_threshold_factor'],
+            recovery_successes=politeness['recovery_successes'],
+            backoff_statuses=politeness['backoff_statuses'],
+            max_backoff_seconds=politeness['max_backoff_seconds'],
+            enabled=politeness['enabled']
+        )
+    
+    def _create_visited_set(self):
+        capacity = config.SCRAPER['visited_initial_capacity']
+        
+        if self.visited_backend == 'fingerprint':
+            return FingerprintSet(initial_capacity=capacity)
+        
+        if self.visited_backend == 'bloom':
+            return ScalableBloomFilter(
+                initial_capacity=capacity,
+                error_rate=config.SCRAPER['visited_bloom_error_rate']
+            )
+        
+        if self.visited_backend != 'exact':
+            self.logger.warning(f"Unknown visited backend '{self.visited_backend}'. Using exact set.")
+        
+        return ExactVisitedSet()
+    
+    def visited_memory_stats(self):
+        backend = 'sqlite' if isinstance(self.visited, SQLiteVisitedIndex) else self.visited_backend
+        urls = len(self.visited)
+        memory_bytes = self.visited.memory_bytes() if hasattr(self.visited, 'memory_bytes') else 0
+        return {
+            'backend': backend,
+            'urls': urls,
+            'memory_bytes': memory_bytes,
+            'bytes_per_url': round(memory_bytes / urls, 2) if urls else 0
+        }
+    
+    def _create_frontier(self):
+        if self.frontier_mode == 'fifo':
+            return FifoFrontier(self._create_visited_set())
+        
+        if self.frontier_mode == 'sqlite':
+            return SQLiteFrontier(
+                self.db_path,
+                crawl_key=self.start_url,
+                scoring=self.frontier_scoring,
+                batch_size=self.frontier_batch_size,
+                resume=self.resume_crawl
+            )
+        
+        if self.frontier_mode != 'priority':
+            self.logger.warning(f"Unknown frontier '{self.frontier_mode}'. Falling back to priority frontier.")
+        
+        return PriorityFrontier(self._create_visited_set(), scoring=self.frontier_scoring)
+    
     def set_extraction_rules(self, rules: dict):
         self.extraction_rules = rules
         self.logger.info(f"Loaded {len(rules)} extraction rules")
 
+    def set_scoring_function(self, score_fn: Callable[[str, int, int], float]):
+        self.frontier.score_fn = score_fn
+        self.logger.info("Loaded custom frontier scoring function")
+
     async def _get_next_proxy(self):
         if not self.proxies:
             return None
@@ -1241,6 +3515,8 @@ class Scraper:
             return
         
         self.is_paused = True
+        if self.on_captcha_pause:
+            self.on_captcha_pause(True)
         self.logger.warning("ALL WORKERS PAUSED DUE TO CAPTCHA")
 
     async def resume_all_workers(self):
@@ -1248,6 +3524,8 @@ class Scraper:
             return
         
         self.is_paused = False
+        if self.on_captcha_pause:
+            self.on_captcha_pause(False)
         self.logger.info("ALL WORKERS RESUMED - CAPTCHA SOLVED")
 
 
@@ -1466,156 +3744,71 @@ class Scraper:
                                 error_text = await error_elem.inner_text()
                                 if error_text:
                                     self.logger.error(f"Login error detected: {error_text}")
-                                    has_error = True
-                                    break
-                        except:
-                            continue
-                    
-                    if not has_error:
-                        login_successful = True
-            
-            if login_successful:
-                self.logger.info(f"Login successful. Saving state to: {self.auth_state_file}")
-                
-                self.storage_state = await context.storage_state()
-                
-                with open(self.auth_state_file, 'w') as f:
-                    json.dump(self.storage_state, f, indent=2)
-                
-                if 'cookies' in self.storage_state:
-                    self.logger.debug(f"Saved {len(self.storage_state['cookies'])} cookies")
-                
-                await page.close()
-                await context.close()
-                return True
-            else:
-                self.logger.error("Authentication Failed. Check credentials, selectors, and success indicator.")
-                
-                try:
-                    screenshot_path = os.path.join(self.base_dir, "login_error.png")
-                    await page.screenshot(path=screenshot_path)
-                    self.logger.error(f"Saved error screenshot to: {screenshot_path}")
-                except:
-                    pass
-                
-                await page.close()
-                await context.close()
-                return False
-                
-        except Exception as e:
-            self.logger.error(f"Login exception: {e}")
-            
-            try:
-                screenshot_path = os.path.join(self.base_dir, "login_error.png")
-                await page.screenshot(path=screenshot_path)
-                self.logger.error(f"Saved error screenshot to: {screenshot_path}")
-            except:
-                pass
-            return False
-
-    def _init_database(self):
-        os.makedirs(os.path.dirname(self.db_path) if os.path.dirname(self.db_path) else '.', exist_ok=True)
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS pages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                url TEXT UNIQUE NOT NULL,
-                title TEXT,
-                description TEXT,
-                full_text TEXT,
-                depth INTEGER,
-                timestamp REAL,
-                folder_path TEXT,
-                proxy_used TEXT,
-                fingerprint TEXT,
-                authenticated BOOLEAN
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS headers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                page_id INTEGER,
-                header_type TEXT,
-                header_text TEXT,
-                FOREIGN KEY (page_id) REFERENCES pages(id)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS links (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                page_id INTEGER,
-                link_type TEXT,
-                url TEXT,
-                FOREIGN KEY (page_id) REFERENCES pages(id)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS media (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                page_id INTEGER,
-                src TEXT,
-                alt TEXT,
-                FOREIGN KEY (page_id) REFERENCES pages(id)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS structured_data (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                page_id INTEGER,
-                json_data TEXT,
-                FOREIGN KEY (page_id) REFERENCES pages(id)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS html_structure (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                page_id INTEGER,
-                tag_name TEXT,
-                selector TEXT,
-                text_content TEXT,
-                attributes TEXT,
-                parent_selector TEXT,
-                FOREIGN KEY (page_id) REFERENCES pages(id)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS file_assets (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                page_id INTEGER,
-                file_url TEXT,
-                file_name TEXT,
-                file_extension TEXT,
-                file_size_bytes INTEGER,
-                local_path TEXT,
-                download_status TEXT,
-                download_timestamp REAL,
-                mime_type TEXT,
-                FOREIGN KEY (page_id) REFERENCES pages(id)
-            )
-        ''')
+                                    has_error = True
+                                    break
+                        except:
+                            continue
+                    
+                    if not has_error:
+                        login_successful = True
+            
+            if login_successful:
+                self.logger.info(f"Login successful. Saving state to: {self.auth_state_file}")
+                
+                self.storage_state = await context.storage_state()
+                
+                with open(self.auth_state_file, 'w') as f:
+                    json.dump(self.storage_state, f, indent=2)
+                
+                if 'cookies' in self.storage_state:
+                    self.logger.debug(f"Saved {len(self.storage_state['cookies'])} cookies")
+                
+                await page.close()
+                await context.close()
+                return True
+            else:
+                self.logger.error("Authentication Failed. Check credentials, selectors, and success indicator.")
+                
+                try:
+                    screenshot_path = os.path.join(self.base_dir, "login_error.png")
+                    await page.screenshot(path=screenshot_path)
+                    self.logger.error(f"Saved error screenshot to: {screenshot_path}")
+                except:
+                    pass
+                
+                await page.close()
+                await context.close()
+                return False
+                
+        except Exception as e:
+            self.logger.error(f"Login exception: {e}")
+            
+            try:
+                screenshot_path = os.path.join(self.base_dir, "login_error.png")
+                await page.screenshot(path=screenshot_path)
+                self.logger.error(f"Saved error screenshot to: {screenshot_path}")
+            except:
+                pass
+            return False
 
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS custom_extracted_data (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                page_id INTEGER,
-                field_name TEXT,
-                field_value TEXT,
-                field_type TEXT,
-                FOREIGN KEY (page_id) REFERENCES pages(id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+    def _init_database(self):
+        os.makedirs(os.path.dirname(self.db_path) if os.path.dirname(self.db_path) else '.', exist_ok=True)
+        initialize_database(self.db_path)
+        
+        # Built here rather than in __init__ so re-pointing db_path and calling
+        # _init_database() again also moves page writes to the new file
+        self.page_writer = PageWriter(
+            self.db_path,
+            group_commit_pages=config.DATABASE['group_commit_pages'],
+            group_commit_seconds=config.DATABASE['group_commit_seconds']
+        )
+        self.db_writer = DatabaseWriter(
+            self.page_writer,
+            queue_size=config.DATABASE['writer_queue_size'],
+            after_commit=self._detect_changes,
+            on_results=self._broadcast_changes,
+            on_settled=self._complete_settled_pages
+        )
 
     def _normalize_url(self, url):
         parsed = urlparse(url)
@@ -1710,60 +3903,19 @@ class Scraper:
         
         return result
 
-    async def _extract_file_links(self, page, base_url):
-        file_links = []
+    def _extract_file_links(self, payload, base_url):
+        unique_files = {}
         
-        try:
-            links = await page.locator("a").all()
-            
-            for link in links:
-                try:
-                    href = await link.get_attribute("href")
-                    if not href:
-                        continue
-                    
-                    full_url = urljoin(base_url, href)
-                    
-                    if self._is_downloadable_file(full_url):
-                        link_text = ""
-                        try:
-                            link_text = await link.inner_text()
-                            link_text = re.sub(r'[^a-zA-Z0-9\s\-_]', '', link_text)[:50].strip()
-                        except:
-                            pass
-                        
-                        file_links.append({
-                            'url': full_url,
-                            'link_text': link_text
-                        })
-                
-                except Exception as e:
-                    continue
+        for candidate in payload.get('files', []):
+            full_url = urljoin(base_url, candidate['href'])
+            if full_url in unique_files or not self._is_downloadable_file(full_url):
+                continue
             
-            for selector in ['[data-download]', '[data-file]', '[href$=".pdf"]', 
-                           '[href$=".docx"]', '[href$=".zip"]', '[href$=".csv"]']:
-                try:
-                    elements = await page.locator(selector).all()
-                    for elem in elements:
-                        href = await elem.get_attribute("href") or await elem.get_attribute("data-download") or await elem.get_attribute("data-file")
-                        if href:
-                            full_url = urljoin(base_url, href)
-                            if self._is_downloadable_file(full_url):
-                                file_links.append({
-                                    'url': full_url,
-                                    'link_text': ''
-                                })
-                except:
-                    continue
-        
-        except Exception as e:
-            self.logger.warning(f"Error extracting file links: {e}")
-        
-        unique_files = {}
-        for file_info in file_links:
-            url = file_info['url']
-            if url not in unique_files:
-                unique_files[url] = file_info
+            link_text = re.sub(r'[^a-zA-Z0-9\s\-_]', '', candidate['text'] or '')[:50].strip()
+            unique_files[full_url] = {
+                'url': full_url,
+                'link_text': link_text
+            }
         
         return list(unique_files.values())
 
@@ -1884,35 +4036,24 @@ class Scraper:
             self.logger.error(f"Error extracting HTML structure: {e}")
             return []
 
-    async def extract_and_save_data(self, page, depth, proxy_used, fingerprint):
+    async def extract_and_save_data(self, page, depth, proxy_used, fingerprint, frontier_url=None):
         url = page.url
         
-        title = await page.title()
-        description = "No description"
-        try:
-            desc = page.locator('meta[name="description"]').first
-            if await desc.count() > 0:
-                description = await desc.get_attribute("content")
-        except:
-            pass
+        file_extensions = sorted(self.downloadable_extensions) if self.download_file_assets else None
+        payload = await page.evaluate(PAGE_EXTRACTION_SCRIPT, file_extensions)
+        
+        title = payload['title']
+        description = payload['description'] if payload['has_description'] else "No description"
 
         structured_data = []
-        scripts = await page.locator('script[type="application/ld+json"]').all()
-        for script in scripts:
+        for text in payload['json_ld']:
             try:
-                text = await script.inner_text()
                 structured_data.append(json.loads(text))
-            except:
+            except (TypeError, ValueError):
                 continue
 
-        headers = {}
-        for h in ['h1', 'h2', 'h3']:
-            headers[h] = await page.locator(h).all_inner_texts()
-
-        try:
-            full_text = await page.locator("body").inner_text()
-        except:
-            full_text = ""
+        headers = payload['headers']
+        full_text = payload['full_text'] or ""
         
         custom_data = {}
         if self.extraction_rules:
@@ -1920,60 +4061,33 @@ class Scraper:
             custom_data = await self.extraction_engine.extract_all(page, self.extraction_rules)
             self.logger.info(f"Extracted {len(custom_data)} custom fields")
         
-        if custom_data:
-            for field_name, field_value in custom_data.items():
-                field_type = type(field_value).__name__
-                
-                if isinstance(field_value, (list, dict)):
-                    import json
-                    field_value = json.dumps(field_value)
-                
-                cursor.execute('''
-                    INSERT INTO custom_extracted_data (page_id, field_name, field_value, field_type)
-                    VALUES (?, ?, ?, ?)
-                ''', (page_id, field_name, str(field_value), field_type))
 
         media = []
-        imgs = await page.locator("img").all()
-        for img in imgs:
-            try:
-                src = await img.get_attribute("src") or await img.get_attribute("data-src")
-                alt = await img.get_attribute("alt") or ""
-                
-                if src:
-                    if not src.startswith("http"):
-                        if src.startswith("//"):
-                            src = "https:" + src
-                        elif src.startswith("/"):
-                            src = urljoin(url, src)
-                        else:
-                            src = urljoin(url, src)
-                    
-                    if src.startswith("http"):
-                        media.append({"src": src, "alt": alt})
-            except:
+        for img in payload['images']:
+            src = img['src']
+            if not src:
                 continue
+            
+            if not src.startswith("http"):
+                if src.startswith("//"):
+                    src = "https:" + src
+                else:
+                    src = urljoin(url, src)
+            
+            if src.startswith("http"):
+                media.append({"src": src, "alt": img['alt']})
 
         internal_links = []
         external_links = []
-        links = await page.locator("a").all()
-        
-        for link in links:
-            try:
-                href = await link.get_attribute("href")
-                if not href:
-                    continue
-                
-                full_url = urljoin(url, href)
-                clean_url = self._normalize_url(full_url)
-                parsed_href = urlparse(clean_url)
-                
-                if parsed_href.netloc == self.domain:
-                    internal_links.append(full_url)
-                elif parsed_href.scheme.startswith('http'):
-                    external_links.append(full_url)
-            except:
-                continue
+        for href in payload['links']:
+            full_url = urljoin(url, href)
+            clean_url = self._normalize_url(full_url)
+            parsed_href = urlparse(clean_url)
+            
+            if parsed_href.netloc == self.domain:
+                internal_links.append(full_url)
+            elif parsed_href.scheme.startswith('http'):
+                external_links.append(full_url)
 
         folder_path = self._create_folder_path(url)
         
@@ -1982,7 +4096,7 @@ class Scraper:
         file_assets = []
         if self.download_file_assets:
             self.logger.info("Searching for downloadable files...")
-            file_links = await self._extract_file_links(page, url)
+            file_links = self._extract_file_links(payload, url)
             
             if file_links:
                 self.logger.info(f"Found {len(file_links)} file(s) to download")
@@ -2048,106 +4162,29 @@ class Scraper:
                                 'error': download_result['error']
                             })
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        page_id = None
-        try:
-            cursor.execute('''
-                INSERT INTO pages (url, title, description, full_text, depth, timestamp, 
-                                   folder_path, proxy_used, fingerprint, authenticated)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (url, title, description, full_text, depth, time.time(), 
-                  folder_path, proxy_used or "Direct", json.dumps(fingerprint),
-                  bool(self.storage_state)))
-            
-            page_id = cursor.lastrowid
-            
-            for header_type, texts in headers.items():
-                for text in texts:
-                    cursor.execute('''
-                        INSERT INTO headers (page_id, header_type, header_text)
-                        VALUES (?, ?, ?)
-                    ''', (page_id, header_type, text))
-            
-            for link in set(internal_links):
-                cursor.execute('''
-                    INSERT INTO links (page_id, link_type, url)
-                    VALUES (?, ?, ?)
-                ''', (page_id, 'internal', link))
-            
-            for link in set(external_links):
-                cursor.execute('''
-                    INSERT INTO links (page_id, link_type, url)
-                    VALUES (?, ?, ?)
-                ''', (page_id, 'external', link))
-            
-            for img in media:
-                cursor.execute('''
-                    INSERT INTO media (page_id, src, alt)
-                    VALUES (?, ?, ?)
-                ''', (page_id, img['src'], img['alt']))
-            
-            for data in structured_data:
-                cursor.execute('''
-                    INSERT INTO structured_data (page_id, json_data)
-                    VALUES (?, ?)
-                ''', (page_id, json.dumps(data)))
-            
-            for elem in html_structure:
-                cursor.execute('''
-                    INSERT INTO html_structure (page_id, tag_name, selector, text_content, attributes, parent_selector)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (page_id, elem['tag'], elem['selector'], elem['text'], 
-                     json.dumps(elem['attributes']), elem['parent']))
-            
-            for file_asset in file_assets:
-                cursor.execute('''
-                    INSERT INTO file_assets (page_id, file_url, file_name, file_extension, 
-                                            file_size_bytes, local_path, download_status, 
-                                            download_timestamp, mime_type)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (page_id, file_asset['url'], file_asset['filename'], 
-                     file_asset['extension'], file_asset['size_bytes'],
-                     file_asset['local_path'], file_asset['status'],
-                     time.time(), file_asset['mime_type']))
-            
-            conn.commit()
-            
-            if self.enable_diff_tracking and page_id:
-                try:
-                    change_result = self.diff_tracker.detect_changes(url, page_id)
-                    if change_result and change_result.get('changes_detected'):
-                        self.logger.info(f"Changes detected for {url}: {len(change_result['changes'])} change(s)")
-                        for change in change_result['changes']:
-                            self.logger.info(f"  - {change['summary']} (severity: {change['severity']})")
-                        
-                        try:
-                            for change in change_result.get('changes', []):
-                                asyncio.create_task(broadcast_change_notification(url, change))
-                        except Exception as broadcast_error:
-                            self.logger.error(f"Failed to broadcast change notification: {broadcast_error}")
-                except Exception as e:
-                    self.logger.error(f"Error in diff tracking: {e}")
-            
-        except sqlite3.IntegrityError:
-            cursor.execute('SELECT id FROM pages WHERE url = ?', (url,))
-            existing = cursor.fetchone()
-            if existing and self.enable_diff_tracking:
-                try:
-                    change_result = self.diff_tracker.detect_changes(url, existing[0])
-                    if change_result and change_result.get('changes_detected'):
-                        self.logger.info(f"Changes detected for existing URL {url}")
-                        
-                        try:
-                            for change in change_result.get('changes', []):
-                                asyncio.create_task(broadcast_change_notification(url, change))
-                        except Exception as broadcast_error:
-                            self.logger.error(f"Failed to broadcast change notification: {broadcast_error}")
-                except Exception as e:
-                    self.logger.error(f"Error in diff tracking: {e}")
-        finally:
-            conn.close()
+        if frontier_url is not None:
+            self._completion_holds[frontier_url] = self._completion_holds.get(frontier_url, 0) + 1
+            self._awaiting_commit.setdefault(url, []).append(frontier_url)
+        await self.db_writer.submit({
+            'url': url,
+            'title': title,
+            'description': description,
+            'full_text': full_text,
+            'depth': depth,
+            'timestamp': time.time(),
+            'folder_path': folder_path,
+            'proxy_used': proxy_used or "Direct",
+            'fingerprint': fingerprint,
+            'authenticated': bool(self.storage_state),
+            'headers': headers,
+            'internal_links': internal_links,
+            'external_links': external_links,
+            'media': media,
+            'structured_data': structured_data,
+            'html_structure': html_structure,
+            'file_assets': file_assets,
+            'custom_data': custom_data,
+        })
 
         try:
             await page.screenshot(
@@ -2166,22 +4203,99 @@ class Scraper:
 
         return internal_links, depth
 
-    async def discover_and_queue_links(self, internal_links, current_depth):
-        new_links_found = 0
+    def _detect_changes(self, committed_pages):
+        # Runs on the database writer thread, after the pages are committed
+        if not self.enable_diff_tracking:
+            return []
         
-        async with self.lock:
-            for link in internal_links:
-                clean_url = self._normalize_url(link)
+        detected = []
+        for result in committed_pages:
+            url, page_id = result['url'], result['page_id']
+            if not page_id:
+                continue
+            
+            try:
+                change_result = self.diff_tracker.detect_changes(url, page_id)
+                if not (change_result and change_result.get('changes_detected')):
+                    continue
                 
-                if (current_depth < self.max_depth and 
-                    clean_url not in self.visited):
-                    
-                    self.visited.add(clean_url)
-                    self.queue.append((clean_url, current_depth + 1))
-                    new_links_found += 1
+                if result['existing']:
+                    self.logger.info(f"Changes detected for existing URL {url}")
+                else:
+                    self.logger.info(f"Changes detected for {url}: {len(change_result['changes'])} change(s)")
+                    for change in change_result['changes']:
+                        self.logger.info(f"  - {change['summary']} (severity: {change['severity']})")
+                
+                detected.append((url, change_result.get('changes', [])))
+            except Exception as e:
+                self.logger.error(f"Error in diff tracking: {e}")
+        
+        return detected
+
+    def _release_completion(self, frontier_url):
+        holds = self._completion_holds.get(frontier_url, 0) - 1
+        if holds > 0:
+            self._completion_holds[frontier_url] = holds
+            return
+        self._completion_holds.pop(frontier_url, None)
+        if self.frontier.executor is None:
+            self.frontier.complete(frontier_url)
+        else:
+            self.frontier.executor.submit(self.frontier.complete, frontier_url).add_done_callback(
+                self._log_frontier_error
+            )
+        self._notify_workers()
+
+    def _log_frontier_error(self, future):
+        if future.exception() is not None:
+            self.logger.error(f"Frontier update failed: {future.exception()}")
+
+    async def _frontier_call(self, method, *args):
+        if self.frontier.executor is None:
+            return method(*args)
+        return await asyncio.get_running_loop().run_in_executor(self.frontier.executor, method, *args)
+
+    async def known_urls(self, urls):
+        return await self._frontier_call(self.frontier.known_urls, list(urls))
+
+    async def _close_frontier(self, finished):
+        await self._frontier_call(self.frontier.close, finished)
+        if self.frontier.executor is not None:
+            self.frontier.executor.shutdown(wait=True)
+
+    def _complete_settled_pages(self, page_urls):
+        for page_url in page_urls:
+            frontier_urls = self._awaiting_commit.get(page_url)
+            if not frontier_urls:
+                continue
+            frontier_url = frontier_urls.pop(0)
+            if not frontier_urls:
+                del self._awaiting_commit[page_url]
+            self._release_completion(frontier_url)
+
+    def _broadcast_changes(self, detected):
+        if broadcast_change_notification is None:
+            return
+        
+        for url, changes in detected:
+            try:
+                for change in changes:
+                    asyncio.create_task(broadcast_change_notification(url, change))
+            except Exception as broadcast_error:
+                self.logger.error(f"Failed to broadcast change notification: {broadcast_error}")
+
+    async def discover_and_queue_links(self, internal_links, current_depth):
+        if current_depth >= self.max_depth:
+            return 0
+        
+        new_links_found = await self._frontier_call(
+            self.frontier.push_many,
+            [self._normalize_url(link) for link in internal_links],
+            current_depth + 1
+        )
         
         if new_links_found > 0:
-            await asyncio.sleep(0.5)
+            self._notify_workers()
         
         return new_links_found
 
@@ -2231,26 +4345,47 @@ class Scraper:
 
     async def process_page(self, browser, url, depth):
         page = None
-        context = None
         proxy = await self._get_next_proxy()
         fingerprint = None
         
         retry_count = 0
         
         while retry_count < self.max_page_retries:
+            pooled = None
+            healthy = False
+            # The host slot is held until the page is fully processed, so
+            # the per-host limit also covers captcha handling, scrolling,
+            # extraction and downloads; the latency sample only times goto
+            slot_held = False
+            status = None
+            retry_after = None
+            latency = None
             try:
-                context, fingerprint = await self.create_context(
+                pooled = await self.context_pool.acquire(
                     browser, 
                     proxy, 
                     storage_state=self.storage_state
                 )
-                page = await context.new_page()
+                fingerprint = pooled.fingerprint
+                page = await pooled.context.new_page()
                 
                 proxy_display = f"via {proxy}" if proxy else "Direct"
                 auth_display = "[Auth]" if self.storage_state else "[Guest]"
                 self.logger.info(f"{auth_display} Visiting (Depth {depth}) {proxy_display}: {url}")
                 
-                await page.goto(url, wait_until="domcontentloaded", timeout=45000)
+                await self.host_scheduler.acquire(url)
+                slot_held = True
+                started = time.monotonic()
+                try:
+                    response = await page.goto(url, wait_until="domcontentloaded", timeout=45000)
+                    if response:
+                        status = response.status
+                        retry_after = _parse_retry_after(response.headers.get('retry-after'))
+                finally:
+                    latency = time.monotonic() - started
+                
+                if self.host_scheduler.is_backoff_status(status):
+                    raise Exception(f"HTTP {status} from {urlparse(url).netloc}, backing off")
 
                 captcha_detected = await self.detect_captcha(page)
                 if captcha_detected:
@@ -2261,13 +4396,13 @@ class Scraper:
                 
                 await self.smart_scroll(page)
                 
-                internal_links, depth = await self.extract_and_save_data(page, depth, proxy, fingerprint)
+                internal_links, depth = await self.extract_and_save_data(page, depth, proxy, fingerprint, url)
                 
                 new_links = await self.discover_and_queue_links(internal_links, depth)
                 
                 self.logger.info(f"Completed {url} - Found {new_links} new links")
                 
-                await asyncio.sleep(random.uniform(0.5, 1.5))
+                healthy = True
                 
                 break
                 
@@ -2287,10 +4422,16 @@ class Scraper:
                         await asyncio.sleep(2)
                     
             finally:
+                if slot_held:
+                    self.host_scheduler.release(url, status, latency, retry_after)
                 if page:
-                    await page.close()
-                if context:
-                    await context.close()
+                    try:
+                        await page.close()
+                    except Exception:
+                        healthy = False
+                    page = None
+                if pooled:
+                    await self.context_pool.release(pooled, discard=not healthy)
 
     async def worker(self, browser, worker_id):
         while True:
@@ -2298,95 +4439,411 @@ class Scraper:
                 self.logger.info(f"[Worker {worker_id}] Stopping...")
                 break
             
-            while self.is_paused:
+            if self.is_paused:
                 self.logger.debug(f"[Worker {worker_id}] Paused, waiting...")
-                await asyncio.sleep(1)
+                await self._wait_for_workers_event()
                 if self.should_stop:
                     self.logger.info(f"[Worker {worker_id}] Stopping while paused...")
                     return
+                continue
             
-            url = None
-            depth = 0
+            if self.pages_scraped >= self.max_pages:
+                break
             
-            async with self.lock:
-                if self.pages_scraped >= self.max_pages:
+            next_item = await self._frontier_call(self.frontier.pop)
+            if next_item is None:
+                # Only pages still being processed can discover more links, so an
+                # empty frontier with no active workers means the crawl is done.
+                if self.active_workers == 0 and not self.frontier.expects_more():
+                    self._notify_workers()
                     break
-                if not self.queue:
-                    pass
-                else:
-                    url, depth = self.queue.popleft()
-                    self.pages_scraped += 1
-                    current_count = self.pages_scraped
-
-            if url:
-                self.logger.info(f"[Worker {worker_id}] Processing [{current_count}/{self.max_pages}]")
+                await self._wait_for_workers_event()
+                continue
+            
+            url, depth = next_item
+            self.pages_scraped += 1
+            self.active_workers += 1
+            self._completion_holds[url] = self._completion_holds.get(url, 0) + 1
+            
+            try:
+                self.logger.info(f"[Worker {worker_id}] Processing [{self.pages_scraped}/{self.max_pages}]")
                 await self.process_page(browser, url, depth)
-            else:
-                await asyncio.sleep(0.5)
-                async with self.lock:
-                    if not self.queue and self.pages_scraped >= self.max_pages:
-                        break
+                self._release_completion(url)
+            finally:
+                self.active_workers -= 1
+                self._notify_workers()
+
+    async def _launch_browser(self, p, headless):
+        return await p.chromium.launch(
+            headless=headless,
+            args=[
+                "--disable-blink-features=AutomationControlled",
+                "--disable-dev-shm-usage",
+                "--no-sandbox"
+            ]
+        )
+
+    async def _authenticate(self, p, browser=None):
+        if not self.login_url:
+            return
+        
+        if self.manual_login_mode:
+            self.logger.info("MANUAL LOGIN MODE - Launching visible browser")
+            
+            manual_browser = await self._launch_browser(p, headless=False)
+            login_success = await self.perform_manual_login(manual_browser)
+            await manual_browser.close()
+            
+            if not login_success:
+                self.logger.warning("Manual login failed. Continuing without authentication...")
+            return
+        
+        login_browser = browser or await self._launch_browser(p, headless=self.headless)
+        login_success = await self.perform_login(login_browser)
+        if login_browser is not browser:
+            await login_browser.close()
+        
+        if not login_success:
+            self.logger.warning("Login failed. Continuing without authentication...")
 
     async def run(self):
+        if self.worker_processes > 1:
+            await self._run_sharded()
+            return
+        
         async with async_playwright() as p:
-            if self.login_url and self.manual_login_mode:
-                self.logger.info("MANUAL LOGIN MODE - Launching visible browser")
-                
-                manual_browser = await p.chromium.launch(
-                    headless=False,
-                    args=[
-                        "--disable-blink-features=AutomationControlled",
-                        "--disable-dev-shm-usage",
-                        "--no-sandbox"
-                    ]
-                )
-                
-                login_success = await self.perform_manual_login(manual_browser)
-                await manual_browser.close()
-                
-                if not login_success:
-                    self.logger.warning("Manual login failed. Continuing without authentication...")
-            
-            browser = await p.chromium.launch(
-                headless=self.headless,
-                args=[
-                    "--disable-blink-features=AutomationControlled",
-                    "--disable-dev-shm-usage",
-                    "--no-sandbox"
-                ]
-            )
+            if self.manual_login_mode:
+                await self._authenticate(p)
             
-            if self.login_url and not self.manual_login_mode:
-                login_success = await self.perform_login(browser)
-                if not login_success:
-                    self.logger.warning("Login failed. Continuing without authentication...")
+            browser = await self._launch_browser(p, headless=self.headless)
+            
+            if not self.manual_login_mode:
+                await self._authenticate(p, browser)
             
             self.logger.info(f"Starting Authenticated Async Crawl on: {self.start_url}")
             self.logger.info(f"Configuration: Pages={self.max_pages}, Depth={self.max_depth}, "
                              f"Workers={self.concurrent_limit}, Auth={bool(self.storage_state)}")
+            if getattr(self.frontier, 'resumed', False):
+                self.logger.info(f"Resumed crawl: {self.pages_scraped} pages already scraped, "
+                                 f"{len(self.frontier)} URLs pending")
             
             workers = [
                 self.worker(browser, i+1) 
                 for i in range(self.concurrent_limit)
             ]
             
-            await asyncio.gather(*workers)
+            finished = False
+            try:
+                await asyncio.gather(*workers)
+                finished = not self.should_stop
+            finally:
+                # The writer settles its last pages before the frontier
+                # records which URLs are done
+                await self.context_pool.close()
+                await self.db_writer.close()
+                await self._close_frontier(finished)
             
             await browser.close()
             
-            self.logger.info("Crawl Complete!")
-            self.logger.info(f"Total Pages Scraped: {self.pages_scraped}")
-            self.logger.info(f"Database Location: {self.db_path}")
-            self.logger.info(f"Failed Proxies: {len(self.failed_proxies)}")
-            if self.storage_state:
-                self.logger.info(f"Auth State Saved: {self.auth_state_file}")
-            
-            if self.download_file_assets and self.downloads_stats['total_attempted'] > 0:
-                total_mb = self.downloads_stats['total_bytes'] / (1024 * 1024)
-                stats_msg = (
-                    f"Download Stats - Attempted: {self.downloads_stats['total_attempted']}, "
-                    f"Success: {self.downloads_stats['successful']}, "
-                    f"Failed: {self.downloads_stats['failed']}, "
-                    f"Total: {total_mb:.2f} MB"
-                )
-                self.logger.info(stats_msg)
\ No newline at end of file
+            self._log_crawl_summary()
+
+    def _log_crawl_summary(self):
+        self.logger.info("Crawl Complete!")
+        self.logger.info(f"Total Pages Scraped: {self.pages_scraped}")
+        visited_stats = self.visited_memory_stats()
+        self.logger.info(f"Visited Index: {visited_stats['urls']} URLs ({visited_stats['backend']}), "
+                         f"{visited_stats['memory_bytes'] / (1024 * 1024):.2f} MB, "
+                         f"{visited_stats['bytes_per_url']} bytes/URL")
+        self.logger.info(f"Database Location: {self.db_path}")
+        self.logger.info(f"Failed Proxies: {len(self.failed_proxies)}")
+        pool_stats = self.context_pool.stats
+        self.logger.info(f"Browser Contexts: {pool_stats['created']} created, "
+                         f"{pool_stats['reused']} reuses, {pool_stats['discarded']} discarded")
+        if self.storage_state:
+            self.logger.info(f"Auth State Saved: {self.auth_state_file}")
+        
+        if self.download_file_assets and self.downloads_stats['total_attempted'] > 0:
+            total_mb = self.downloads_stats['total_bytes'] / (1024 * 1024)
+            stats_msg = (
+                f"Download Stats - Attempted: {self.downloads_stats['total_attempted']}, "
+                f"Success: {self.downloads_stats['successful']}, "
+                f"Failed: {self.downloads_stats['failed']}, "
+                f"Total: {total_mb:.2f} MB"
+            )
+            self.logger.info(stats_msg)
+
+    def _shard_kwargs(self):
+        return {
+            'start_url': self.start_url,
+            'max_pages': self.max_pages,
+            'max_depth': self.max_depth,
+            'base_dir': self.base_dir,
+            'headless': self.headless,
+            'concurrent_limit': self.concurrent_limit,
+            'proxy_list': self.proxy_list,
+            'download_file_assets': self.download_file_assets,
+            'max_file_size_mb': self.max_file_size_mb,
+            'smart_scroll_iterations': self.smart_scroll_iterations,
+            'max_page_retries': self.max_page_retries,
+            'max_download_retries': self.max_download_retries,
+            'frontier': 'fifo',
+            'worker_processes': 1,
+        }
+
+    def _start_shard(self, shard_id, num_shards, task_queue, result_queue):
+        process = multiprocessing.get_context('spawn').Process(
+            target=_run_crawl_shard,
+            args=(shard_id, num_shards, self._shard_kwargs(), self.storage_state, self.extraction_rules,
+                  dict(config.CAPTCHA), task_queue, result_queue),
+            name=f"crawl-shard-{shard_id}"
+        )
+        process.start()
+        return process
+
+    async def _run_sharded(self):
+        # Coordinator: this process owns the frontier, deduplication and the
+        # page budget, and deals URLs to worker processes that each run their
+        # own browser and event loop. Each process is kept at most
+        # 2 * concurrent_limit URLs ahead so priorities stay meaningful.
+        # Shards send their page records back here and this process's
+        # DatabaseWriter is the only writer of scraped_data.db; settled URLs
+        # are reported back so shards complete a URL only once it is saved.
+        if self.login_url:
+            async with async_playwright() as p:
+                await self._authenticate(p)
+        
+        num_shards = self.worker_processes
+        window = self.concurrent_limit * 2
+        mp = multiprocessing.get_context('spawn')
+        result_queue = mp.Queue()
+        task_queues = [mp.Queue() for _ in range(num_shards)]
+        
+        outstanding = [0] * num_shards
+        live = set(range(num_shards))
+        shard_pool_stats = {}
+        page_shards = {}
+        inbox = deque()
+        paused_sent = False
+        finishing = False
+        
+        def receive(message):
+            # Runs on the event loop; the messages are handled in order by
+            # the coordinator loop, which can await frontier and writer calls
+            inbox.append(message)
+            self._notify_workers()
+        
+        def settle(urls):
+            settled = {}
+            for url in urls:
+                shards = page_shards.get(url)
+                if not shards:
+                    continue
+                shard_id = shards.pop(0)
+                if not shards:
+                    del page_shards[url]
+                settled.setdefault(shard_id, []).append(url)
+            for shard_id, shard_urls in settled.items():
+                if shard_id in live:
+                    task_queues[shard_id].put(('settled', shard_urls))
+        
+        self.db_writer.on_settled = settle
+        
+        async def handle_message(message):
+            kind, shard_id = message[0], message[1]
+            
+            if kind == 'links':
+                await self._frontier_call(self.frontier.push_many, message[2], message[3])
+            elif kind == 'page':
+                page_shards.setdefault(message[2]['url'], []).append(shard_id)
+                await self.db_writer.submit(message[2])
+            elif kind == 'done':
+                outstanding[shard_id] -= 1
+                await self._frontier_call(self.frontier.complete, message[2])
+            elif kind == 'pause':
+                self.is_paused = message[2]
+            elif kind == 'stats':
+                for key, value in message[2].items():
+                    self.downloads_stats[key] = self.downloads_stats.get(key, 0) + value
+                shard_pool_stats[shard_id] = message[3]
+            elif kind == 'exit':
+                live.discard(shard_id)
+                outstanding[shard_id] = 0
+        
+        async def drain_inbox():
+            while inbox:
+                await handle_message(inbox.popleft())
+        
+        async def dispatch():
+            while live and self.pages_scraped < self.max_pages:
+                shard_id = min(live, key=lambda shard: outstanding[shard])
+                if outstanding[shard_id] >= window:
+                    return
+                next_item = await self._frontier_call(self.frontier.pop)
+                if next_item is None:
+                    return
+                url, depth = next_item
+                self.pages_scraped += 1
+                outstanding[shard_id] += 1
+                task_queues[shard_id].put(('crawl', url, depth))
+        
+        def broadcast(message):
+            for shard_id in live:
+                task_queues[shard_id].put(message)
+        
+        def watch(shard_id, process):
+            # The only source of 'exit': it is sent once the process is gone,
+            # after everything the shard put on the queue has been flushed
+            process.join()
+            result_queue.put(('exit', shard_id))
+        
+        loop = asyncio.get_running_loop()
+        processes = []
+        for shard_id in range(num_shards):
+            process = self._start_shard(shard_id, num_shards, task_queues[shard_id], result_queue)
+            processes.append(process)
+            threading.Thread(target=watch, args=(shard_id, process), daemon=True).start()
+        reader = _forward_queue(result_queue, loop, receive)
+        
+        self.logger.info(f"Starting Sharded Crawl on: {self.start_url}")
+        self.logger.info(f"Configuration: Pages={self.max_pages}, Depth={self.max_depth}, "
+                         f"Processes={num_shards}, Workers/Process={self.concurrent_limit}, "
+                         f"Auth={bool(self.storage_state)}")
+        
+        finished = False
+        try:
+            while live:
+                # Taken before any await so a wakeup during this pass is kept
+                wakeup = self._workers_event
+                await drain_inbox()
+                if not live:
+                    break
+                
+                if self.should_stop:
+                    broadcast(('stop',))
+                    break
+                
+                if self.is_paused != paused_sent:
+                    paused_sent = self.is_paused
+                    broadcast(('pause',) if paused_sent else ('resume',))
+                
+                if not self.is_paused and not finishing:
+                    await dispatch()
+                
+                in_flight = sum(outstanding[shard_id] for shard_id in live)
+                if not finishing and in_flight == 0 and (
+                    not self.frontier or self.pages_scraped >= self.max_pages
+                ):
+                    finishing = True
+                    broadcast(('finish',))
+                
+                await wakeup.wait()
+            
+            finished = finishing and not self.should_stop
+            if not finishing and not self.should_stop:
+                self.logger.error("All crawl processes exited before the crawl finished")
+        finally:
+            if live:
+                broadcast(('stop',))
+            try:
+                for process in processes:
+                    await loop.run_in_executor(None, process.join, 30)
+            finally:
+                for process in processes:
+                    if process.is_alive():
+                        process.terminate()
+                result_queue.put(None)
+                await loop.run_in_executor(None, reader.join, 5)
+                # Let forwarded messages reach the inbox, then save the
+                # records that arrived after the last loop iteration
+                await asyncio.sleep(0)
+                await drain_inbox()
+                await self.db_writer.close()
+                await self._close_frontier(finished)
+        
+        for stats in shard_pool_stats.values():
+            for key, value in stats.items():
+                self.context_pool.stats[key] += value
+        
+        self._log_crawl_summary()
+
+    async def run_shard(self, shard_id, task_queue, result_queue):
+        def handle_message(message):
+            kind = message[0]
+            if kind == 'crawl':
+                self.frontier.feed(message[1], message[2])
+                self._notify_workers()
+            elif kind == 'pause':
+                self.is_paused = True
+            elif kind == 'resume':
+                self.is_paused = False
+            elif kind == 'finish':
+                self.frontier.accepting = False
+                self._notify_workers()
+            elif kind == 'stop':
+                self.frontier.accepting = False
+                self.should_stop = True
+            elif kind == 'settled':
+                self.db_writer.settle(message[1])
+        
+        reader = _forward_queue(task_queue, asyncio.get_running_loop(), handle_message)
+        
+        try:
+            async with async_playwright() as p:
+                browser = await self._launch_browser(p, headless=self.headless)
+                
+                workers = [
+                    self.worker(browser, f"{shard_id}.{i+1}")
+                    for i in range(self.concurrent_limit)
+                ]
+                
+                try:
+                    await asyncio.gather(*workers)
+                finally:
+                    await self.context_pool.close()
+                    await self.db_writer.close()
+                    await browser.close()
+        finally:
+            result_queue.put(('stats', shard_id, self.downloads_stats, self.context_pool.stats))
+            task_queue.put(None)
+            reader.join(timeout=5)
+
+
+def _forward_queue(mp_queue, loop, handler):
+    # Blocking multiprocessing queues are drained on a daemon thread and each
+    # message is handed to the event loop, so neither side has to poll.
+    def forward():
+        while True:
+            message = mp_queue.get()
+            if message is None:
+                return
+            try:
+                loop.call_soon_threadsafe(handler, message)
+            except RuntimeError:
+                # The loop has closed; nobody is left to handle the message
+                return
+    
+    thread = threading.Thread(target=forward, daemon=True)
+    thread.start()
+    return thread
+
+
+def _run_crawl_shard(shard_id, shard_count, scraper_kwargs, storage_state, extraction_rules,
+                     captcha_config, task_queue, result_queue):
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f"%(asctime)s [shard {shard_id}] %(name)s %(levelname)s: %(message)s"
+    )
+    config.CAPTCHA.update(captcha_config)
+    
+    scraper = Scraper(**scraper_kwargs)
+    scraper.storage_state = storage_state
+    if extraction_rules:
+        scraper.set_extraction_rules(extraction_rules)
+    
+    scraper.frontier = ShardFrontier(shard_id, result_queue)
+    scraper.visited = scraper.frontier.visited
+    scraper.db_writer = ShardPageSink(shard_id, result_queue, on_settled=scraper._complete_settled_pages)
+    scraper.on_captcha_pause = lambda paused: result_queue.put(('pause', shard_id, paused))
+    scraper.host_scheduler = scraper._create_host_scheduler(share=shard_count)
+    
+    asyncio.run(scraper.run_shard(shard_id, task_queue, result_queue))
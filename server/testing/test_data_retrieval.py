@@ -3,6 +3,10 @@ Test Data Retrieval Endpoints
 """
 import pytest
 import httpx
+import asyncio
+import json
+
+import config
 
 
 @pytest.mark.unit
@@ -98,6 +102,50 @@ class TestDataRetrieval:
         assert response.status_code == 200
         data = response.json()
         assert "files" in data
+    
+    @pytest.mark.asyncio
+    async def test_get_stats_etag(self, client: httpx.AsyncClient):
+        """Test GET /api/data/stats answers 304 for a current ETag"""
+        response = await client.get("/api/data/stats")
+        
+        assert response.status_code == 200
+        etag = response.headers.get("etag")
+        if etag:
+            response = await client.get("/api/data/stats", headers={"If-None-Match": etag})
+            assert response.status_code in [200, 304]
+            if response.status_code == 304:
+                assert response.headers["etag"] == etag
+                assert response.content == b""
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_reads_share_pool(self, client: httpx.AsyncClient):
+        """Test more concurrent requests than pooled connections all succeed"""
+        responses = await asyncio.gather(*[client.get("/api/data/stats") for _ in range(20)])
+        
+        assert all(response.status_code == 200 for response in responses)
+    
+    @pytest.mark.asyncio
+    async def test_get_extracted_data_keyset_pages(self, client: httpx.AsyncClient):
+        """Test GET /api/extracted-data follows next_cursor without repeats"""
+        response = await client.get("/api/extracted-data", params={"limit": 2})
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert "next_cursor" in data
+        seen = [row["page_id"] for row in data["results"]]
+        
+        if data["next_cursor"]:
+            response = await client.get("/api/extracted-data", params={"limit": 2, "cursor": data["next_cursor"]})
+            assert response.status_code == 200
+            next_ids = [row["page_id"] for row in response.json()["results"]]
+            assert not set(seen) & set(next_ids)
+    
+    @pytest.mark.asyncio
+    async def test_get_extracted_data_invalid_cursor(self, client: httpx.AsyncClient):
+        """Test GET /api/extracted-data rejects a malformed cursor"""
+        response = await client.get("/api/extracted-data", params={"cursor": "page-two"})
+        
+        assert response.status_code == 400
 
 
 @pytest.mark.unit
@@ -232,3 +280,90 @@ class TestExportEndpoints:
         data = response.json()
         assert "total_pages" in data
         assert "data" in data
+    
+    @pytest.mark.asyncio
+    async def test_export_data_ndjson(self, client: httpx.AsyncClient):
+        """Test GET /api/data/export?format=ndjson streams one page per line"""
+        response = await client.get("/api/data/export", params={"format": "ndjson", "batch_size": 2})
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        for line in response.text.splitlines():
+            page = json.loads(line)
+            assert "url" in page
+            assert "headers" in page
+    
+    @pytest.mark.asyncio
+    async def test_requests_served_while_exports_stream(self, client: httpx.AsyncClient):
+        """Test exports left unread mid-download do not hold the API's read connections"""
+        streams = []
+        downloads = []
+        try:
+            for _ in range(config.DATABASE['api_pool_size']):
+                stream = client.stream("GET", "/api/data/export", params={"batch_size": 1})
+                response = await stream.__aenter__()
+                streams.append(stream)
+                assert response.status_code == 200
+                # Read the first chunk only; the iterator is kept so the download stays open
+                downloads.append(response.aiter_raw())
+                await downloads[-1].__anext__()
+            
+            response = await asyncio.wait_for(client.get("/api/data/stats"), timeout=10)
+            assert response.status_code == 200
+        finally:
+            for stream in streams:
+                await stream.__aexit__(None, None, None)
+    
+    @pytest.mark.asyncio
+    async def test_export_data_invalid_format(self, client: httpx.AsyncClient):
+        """Test GET /api/data/export rejects unknown formats"""
+        response = await client.get("/api/data/export", params={"format": "xml"})
+        
+        assert response.status_code == 400
+    
+    @pytest.mark.asyncio
+    async def test_export_extracted_csv_with_filters(self, client: httpx.AsyncClient):
+        """Test GET /api/export/csv with domain, date and field filters"""
+        params = {
+            "domain": "example.com",
+            "start_date": "2024-01-01",
+            "end_date": "2030-12-31",
+            "fields": "price,title"
+        }
+        response = await client.get("/api/export/csv", params=params)
+        
+        assert response.status_code == 200
+        lines = response.text.splitlines()
+        assert lines[0] == "URL,Title,Field Name,Field Value"
+    
+    @pytest.mark.asyncio
+    async def test_export_extracted_json_gzip(self, client: httpx.AsyncClient):
+        """Test GET /api/export/json with gzip transfer encoding"""
+        response = await client.get("/api/export/json", params={"gzip": "true"})
+        
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert isinstance(response.json(), list)
+    
+    @pytest.mark.asyncio
+    async def test_export_extracted_invalid_date(self, client: httpx.AsyncClient):
+        """Test extracted-data export rejects malformed dates"""
+        response = await client.get("/api/export/csv", params={"start_date": "yesterday"})
+        
+        assert response.status_code == 400
+    
+    @pytest.mark.asyncio
+    async def test_export_columnar_parquet(self, client: httpx.AsyncClient):
+        """Test GET /api/export/columnar/{table} returns a Parquet file"""
+        response = await client.get("/api/export/columnar/links", params={"format": "parquet"})
+        
+        assert response.status_code in [200, 503]
+        if response.status_code == 200:
+            assert response.content[:4] == b"PAR1"
+    
+    @pytest.mark.asyncio
+    async def test_export_columnar_unknown_table(self, client: httpx.AsyncClient):
+        """Test columnar export rejects tables it does not export"""
+        response = await client.get("/api/export/columnar/sessions")
+        
+        assert response.status_code in [404, 503]
@@ -0,0 +1,215 @@
+"""
+Database Performance Tests
+Measures API read latency while a crawl is writing
+"""
+import pytest
+import sys
+import time
+import sqlite3
+import threading
+import statistics
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scraper import (
+    PageWriter, SCHEMA_MIGRATIONS, initialize_database, connect_database, build_fts_query,
+    build_file_search_query, register_text_functions
+)
+
+
+SEED_PAGES = 2000
+READS = 300
+
+# The hot queries behind /api/data/page, /api/stats and /api/files
+HOT_QUERIES = [
+    ('SELECT * FROM headers WHERE page_id = ?', True),
+    ('SELECT * FROM links WHERE page_id = ?', True),
+    ('SELECT * FROM media WHERE page_id = ?', True),
+    ('SELECT * FROM file_assets WHERE page_id = ?', True),
+    ('SELECT COUNT(*) FROM links WHERE link_type = "internal"', False),
+    ('SELECT url, timestamp FROM pages ORDER BY timestamp DESC LIMIT 20', False),
+]
+
+
+def page_record(i):
+    return {
+        "url": f"https://example.com/page/{i}", "title": f"Page {i}", "description": "",
+        "full_text": f"Page {i} " + "lorem ipsum " * 50, "depth": i % 5, "timestamp": float(i),
+        "folder_path": "", "proxy_used": "Direct", "fingerprint": {}, "authenticated": False,
+        "headers": {"h1": [f"Heading {i}"], "h2": ["a", "b", "c"], "h3": []},
+        "internal_links": [f"https://example.com/page/{i + n}" for n in range(1, 21)],
+        "external_links": [f"https://other.org/{i}"],
+        "media": [{"src": f"https://example.com/img/{i}.png", "alt": ""}],
+        "structured_data": [],
+        "html_structure": [],
+        "file_assets": [{
+            "url": f"https://example.com/f/{i}.pdf", "filename": f"{i}.pdf", "extension": ".pdf",
+            "size_bytes": 1024, "local_path": None, "status": "success", "mime_type": "application/pdf"
+        }],
+        "custom_data": {},
+    }
+
+
+def build_database(db_path, tuned):
+    if tuned:
+        initialize_database(str(db_path))
+    else:
+        # The same tables without the tuning: no indexes, rollback journal
+        conn = sqlite3.connect(db_path)
+        register_text_functions(conn)
+        for description, statements in SCHEMA_MIGRATIONS:
+            if description == 'page_id and hot query indexes':
+                continue
+            for statement in statements:
+                if callable(statement):
+                    for _ in statement(conn) or ():
+                        pass
+                else:
+                    conn.execute(statement)
+        conn.commit()
+        conn.close()
+
+    writer = PageWriter(str(db_path), group_commit_pages=500)
+    for i in range(SEED_PAGES):
+        writer.write_page(page_record(i))
+    writer.close()
+
+
+def measure_reads_during_crawl(db_path, tuned):
+    stop = threading.Event()
+    written = []
+
+    def crawl():
+        writer = PageWriter(str(db_path))
+        i = SEED_PAGES
+        while not stop.is_set():
+            writer.write_page(page_record(i))
+            written.append(i)
+            i += 1
+            time.sleep(0.002)  # roughly the pace of a busy crawl
+        writer.close()
+
+    crawler = threading.Thread(target=crawl)
+    crawler.start()
+
+    conn = connect_database(str(db_path)) if tuned else sqlite3.connect(db_path, timeout=30)
+    latencies = []
+    try:
+        for n in range(READS):
+            query, by_page = HOT_QUERIES[n % len(HOT_QUERIES)]
+            params = ((n * 7) % SEED_PAGES + 1,) if by_page else ()
+            started = time.perf_counter()
+            conn.execute(query, params).fetchall()
+            latencies.append(time.perf_counter() - started)
+    finally:
+        stop.set()
+        crawler.join()
+        conn.close()
+
+    latencies.sort()
+    return {
+        "median_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+        "pages_written": len(written),
+    }
+
+
+@pytest.mark.performance
+@pytest.mark.database
+class TestDatabaseTuning:
+    """Test the SQLite tuning profile"""
+
+    def test_migrations_are_versioned(self, tmp_path):
+        """Test migrations record user_version and re-running is a no-op"""
+        db_path = str(tmp_path / "scraped.db")
+        assert initialize_database(db_path) == len(SCHEMA_MIGRATIONS)
+        assert initialize_database(db_path) == len(SCHEMA_MIGRATIONS)
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == len(SCHEMA_MIGRATIONS)
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        conn.close()
+
+    def test_existing_database_is_upgraded(self, tmp_path):
+        """Test a database created before versioning gets the indexes"""
+        db_path = tmp_path / "scraped.db"
+        build_database(db_path, tuned=False)
+        initialize_database(str(db_path))
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0] == SEED_PAGES
+        plan = conn.execute("EXPLAIN QUERY PLAN SELECT * FROM links WHERE page_id = 1").fetchall()
+        assert "idx_links_page" in str(plan)
+        conn.close()
+
+    def test_hot_queries_use_indexes(self, tmp_path):
+        """Test page_id lookups no longer scan the child tables"""
+        db_path = str(tmp_path / "scraped.db")
+        initialize_database(db_path)
+        conn = sqlite3.connect(db_path)
+        for query, by_page in HOT_QUERIES:
+            plan = str(conn.execute(f"EXPLAIN QUERY PLAN {query}", (1,) if by_page else ()).fetchall())
+            assert "USING" in plan and "INDEX" in plan, f"{query}: {plan}"
+        conn.close()
+
+    def test_file_search_filters_use_indexes(self, tmp_path):
+        """Test file search filters are answered by file_assets indexes"""
+        db_path = str(tmp_path / "scraped.db")
+        initialize_database(db_path)
+        conn = connect_database(db_path)
+        
+        def plan(**filters):
+            sql, params = build_file_search_query(**filters)
+            return str(conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall())
+        
+        assert "idx_file_assets_time" in plan()
+        assert "idx_file_assets_ext_time" in plan(extension="pdf", min_size=10)
+        assert "idx_file_assets_status" in plan(status="success")
+        assert "idx_file_assets_page" in plan(domain="example.com")
+        keyword_plan = plan(keyword="report", extension="pdf")
+        assert "VIRTUAL TABLE INDEX" in keyword_plan and "SCAN fa" not in keyword_plan
+        for filters in ({}, {"extension": "pdf"}, {"status": "failed"}, {"domain": "example.com"}):
+            assert "file_assets_fts" not in plan(**filters)
+        conn.close()
+    
+    @pytest.mark.slow
+    def test_read_latency_while_crawling(self, tmp_path):
+        """Benchmark API read latency while a crawl is writing"""
+        results = {}
+        for tuned in (False, True):
+            db_path = tmp_path / f"scraped_{'tuned' if tuned else 'baseline'}.db"
+            build_database(db_path, tuned)
+            results[tuned] = measure_reads_during_crawl(db_path, tuned)
+
+        print(f"\nBaseline: {results[False]}")
+        print(f"Tuned:    {results[True]}")
+
+        assert results[True]["median_ms"] < results[False]["median_ms"]
+
+    @pytest.mark.slow
+    def test_content_search_latency(self, tmp_path):
+        """Benchmark FTS5 search against the LIKE scan it replaced"""
+        db_path = tmp_path / "scraped.db"
+        build_database(db_path, tuned=True)
+        conn = connect_database(str(db_path))
+
+        def timed(query, params):
+            started = time.perf_counter()
+            rows = conn.execute(query, params).fetchall()
+            return (time.perf_counter() - started) * 1000, rows
+
+        like_ms, like_rows = timed('''
+            SELECT p.url FROM pages p JOIN page_texts t ON t.hash = p.text_hash
+            WHERE page_text(t.codec, t.data) LIKE ? LIMIT 20
+        ''', ('%Page 1999 %',))
+        fts_ms, fts_rows = timed('''
+            SELECT p.url, snippet(pages_fts, 1, '<mark>', '</mark>', '…', 24)
+            FROM pages_fts JOIN pages p ON p.id = pages_fts.rowid
+            WHERE pages_fts MATCH ? ORDER BY bm25(pages_fts, 10.0, 1.0) LIMIT 20
+        ''', (build_fts_query('"page 1999"'),))
+        conn.close()
+
+        print(f"\nLIKE scan: {like_ms:.2f} ms, FTS5: {fts_ms:.2f} ms")
+        assert [row[0] for row in like_rows] == ["https://example.com/page/1999"]
+        assert [row[0] for row in fts_rows] == ["https://example.com/page/1999"]
+        assert fts_ms < like_ms
@@ -9,7 +9,7 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from scraper import Scraper
+from scraper import Scraper, load_page_text
 from playwright.async_api import async_playwright
 import sqlite3
 
@@ -203,7 +203,11 @@ class TestScrapingWithOptions:
             # Check if fingerprint was stored
             conn = sqlite3.connect(scraper.db_path)
             cursor = conn.cursor()
-            cursor.execute("SELECT fingerprint FROM pages LIMIT 1")
+            cursor.execute("""
+                SELECT f.fingerprint FROM pages p
+                LEFT JOIN fingerprints f ON f.id = p.fingerprint_id
+                LIMIT 1
+            """)
             result = cursor.fetchone()
             conn.close()
             
@@ -295,8 +299,10 @@ class TestDataExtraction:
             # Check if full text was extracted
             conn = sqlite3.connect(scraper.db_path)
             cursor = conn.cursor()
-            cursor.execute("SELECT full_text FROM pages LIMIT 1")
+            cursor.execute("SELECT text_hash FROM pages LIMIT 1")
             result = cursor.fetchone()
+            if result:
+                result = (load_page_text(cursor, result[0]),)
             conn.close()
             
             if result:
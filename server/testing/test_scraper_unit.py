@@ -4,15 +4,59 @@ Tests internal scraper methods and logic
 """
 import pytest
 import sys
+import json
+import asyncio
+import queue
+import sqlite3
+import threading
 from pathlib import Path
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from scraper import Scraper, DataCleaner, ExtractionEngine, DiffTracker
+from scraper import (
+    Scraper, DataCleaner, ExtractionEngine, DiffTracker, CrawlFrontier, FifoFrontier, PriorityFrontier, SQLiteFrontier,
+    FingerprintSet, ScalableBloomFilter, BrowserContextPool, ShardFrontier,
+    HostScheduler, PooledContext, PageWriter, DatabaseWriter, PAGE_EXTRACTION_SCRIPT,
+    SCHEMA_MIGRATIONS, initialize_database, connect_database, load_page_text, build_fts_query,
+    build_trigram_query, build_file_search_query, page_domain
+)
+import scraper as scraper_module
+import columnar_export
+import maintenance
 import config
 
 
+def page_record(url, **overrides):
+    record = {
+        "url": url, "title": "T", "description": "D", "full_text": "text",
+        "depth": 0, "timestamp": 0.0, "folder_path": "/tmp/x", "proxy_used": "Direct",
+        "fingerprint": {}, "authenticated": False,
+        "headers": {"h1": ["A", "B"], "h2": [], "h3": []},
+        "internal_links": ["https://example.com/a", "https://example.com/a"],
+        "external_links": ["https://other.org"],
+        "media": [{"src": "https://example.com/i.png", "alt": ""}],
+        "structured_data": [{"@type": "Thing"}],
+        "html_structure": [],
+        "file_assets": [],
+        "custom_data": {"price": 9.5, "tags": ["x", "y"]},
+    }
+    record.update(overrides)
+    return record
+
+
+def crawl_db(tmp_path, records=(), **writer_options):
+    # A migrated scraper database under tmp_path, with records written
+    # through one PageWriter; returns its path
+    db_path = Scraper("https://example.com", base_dir=str(tmp_path)).db_path
+    if records:
+        writer = PageWriter(db_path, **writer_options)
+        for record in records:
+            writer.write_page(record)
+        writer.close()
+    return db_path
+
+
 @pytest.mark.unit
 @pytest.mark.scraper
 class TestScraperURLHandling:
@@ -263,6 +307,1211 @@ class TestDiffTracker:
         assert 0.9 < similarity < 1.0
 
 
+@pytest.mark.unit
+@pytest.mark.scraper
+class TestCrawlFrontier:
+    """Test crawl frontier ordering and deduplication"""
+    
+    def test_fifo_frontier_order(self):
+        """Test FIFO frontier pops in insertion order"""
+        frontier = FifoFrontier()
+        frontier.push("https://example.com/a", 2)
+        frontier.push("https://example.com/b", 1)
+        assert frontier.pop() == ("https://example.com/a", 2)
+        assert frontier.pop() == ("https://example.com/b", 1)
+        assert frontier.pop() is None
+    
+    def test_frontier_deduplicates_urls(self):
+        """Test a URL is only queued once"""
+        frontier = PriorityFrontier()
+        assert frontier.push("https://example.com/a", 1) is True
+        assert frontier.push("https://example.com/a", 1) is False
+        assert len(frontier) == 1
+        frontier.pop()
+        assert frontier.push("https://example.com/a", 1) is False
+        assert "https://example.com/a" in frontier.visited
+    
+    def test_incomplete_frontier_cannot_be_created(self):
+        """Test a frontier missing queue methods fails on construction"""
+        class PushOnlyFrontier(CrawlFrontier):
+            def push(self, url, depth):
+                return True
+        
+        with pytest.raises(TypeError):
+            PushOnlyFrontier()
+    
+    def test_priority_frontier_depth_scoring(self):
+        """Test shallow URLs are popped before deeper ones"""
+        frontier = PriorityFrontier(scoring='depth')
+        frontier.push("https://example.com/deep", 3)
+        frontier.push("https://example.com/shallow", 1)
+        frontier.push("https://example.com/middle", 2)
+        assert [frontier.pop()[0] for _ in range(3)] == [
+            "https://example.com/shallow",
+            "https://example.com/middle",
+            "https://example.com/deep",
+        ]
+    
+    def test_priority_frontier_inlink_scoring(self):
+        """Test URLs with more in-links are popped first"""
+        frontier = PriorityFrontier(scoring='inlinks')
+        frontier.push_many(["https://example.com/a", "https://example.com/b"], 1)
+        frontier.push_many(["https://example.com/b"], 1)
+        frontier.push_many(["https://example.com/b", "https://example.com/b"], 1)
+        assert frontier.peek() == ("https://example.com/b", 1)
+        assert frontier.pop()[0] == "https://example.com/b"
+        assert frontier.pop()[0] == "https://example.com/a"
+        assert len(frontier) == 0
+    
+    def test_scraper_custom_scoring_function(self):
+        """Test custom scoring hook controls frontier order"""
+        scraper = Scraper("https://example.com")
+        scraper.set_scoring_function(lambda url, depth, inlinks: 10 if 'product' in url else 0)
+        scraper.frontier.pop()
+        scraper.frontier.push_many(["https://example.com/blog", "https://example.com/product/1"], 1)
+        assert scraper.frontier.pop()[0] == "https://example.com/product/1"
+    
+    def test_sqlite_frontier_resumes_interrupted_crawl(self, tmp_path):
+        """Test SQLite frontier picks up pending and in-flight URLs"""
+        db_path = str(tmp_path / "frontier.db")
+        frontier = SQLiteFrontier(db_path, "https://example.com", batch_size=10)
+        frontier.push("https://example.com", 0)
+        url, _ = frontier.pop()
+        frontier.complete(url)
+        frontier.push_many(["https://example.com/a", "https://example.com/b"], 1)
+        assert frontier.pop()[0] == "https://example.com/a"
+        frontier.close()
+        
+        resumed = SQLiteFrontier(db_path, "https://example.com", batch_size=10)
+        assert resumed.resumed is True
+        assert resumed.completed_count == 1
+        assert len(resumed) == 2
+        assert "https://example.com" in resumed.visited
+        assert resumed.push("https://example.com/b", 1) is False
+    
+    def test_sqlite_frontier_starts_fresh_after_finished_crawl(self, tmp_path):
+        """Test a finished crawl is not resumed"""
+        db_path = str(tmp_path / "frontier.db")
+        frontier = SQLiteFrontier(db_path, "https://example.com")
+        frontier.push("https://example.com", 0)
+        frontier.close(finished=True)
+        
+        fresh = SQLiteFrontier(db_path, "https://example.com")
+        assert fresh.resumed is False
+        assert len(fresh) == 0
+        assert len(fresh.visited) == 0
+    
+    def test_sqlite_frontier_checks_page_links_in_one_query(self, tmp_path):
+        """Test discovered links are looked up in the visited index together"""
+        frontier = SQLiteFrontier(str(tmp_path / "frontier.db"), "https://example.com", batch_size=10)
+        frontier.push_many([f"https://example.com/{i}" for i in range(20)], 1)
+        
+        statements = []
+        frontier.conn.set_trace_callback(statements.append)
+        added = frontier.push_many([f"https://example.com/{i}" for i in range(10, 30)], 1)
+        frontier.conn.set_trace_callback(None)
+        
+        assert added == 10
+        assert len(frontier) == 30
+        assert sum(sql.lstrip().startswith('SELECT') for sql in statements) == 1
+    
+    def test_sqlite_visited_add_does_not_schedule(self, tmp_path):
+        """Test adding to the SQLite visited index marks the URL done"""
+        frontier = SQLiteFrontier(str(tmp_path / "frontier.db"), "https://example.com")
+        frontier.visited.add("https://example.com/seen")
+        assert "https://example.com/seen" in frontier.visited
+        assert len(frontier.visited) == 1
+        assert len(frontier) == 0
+        assert frontier.pop() is None
+        assert frontier.push("https://example.com/seen", 1) is False
+
+
+@pytest.mark.unit
+@pytest.mark.scraper
+class TestVisitedBackends:
+    """Test compact visited-set backends"""
+    
+    def test_fingerprint_set_membership_and_growth(self):
+        """Test fingerprint set keeps every URL across resizes"""
+        visited = FingerprintSet(initial_capacity=16)
+        urls = [f"https://example.com/page/{i}" for i in range(5000)]
+        for url in urls:
+            visited.add(url)
+        visited.add(urls[0])
+        assert len(visited) == 5000
+        assert all(url in visited for url in urls)
+        assert "https://example.com/other" not in visited
+        assert visited.memory_bytes() / len(visited) < 32
+    
+    def test_bloom_filter_false_positive_rate(self):
+        """Test scalable Bloom filter stays near its error rate while growing"""
+        visited = ScalableBloomFilter(initial_capacity=500, error_rate=0.01)
+        urls = [f"https://example.com/page/{i}" for i in range(5000)]
+        for url in urls:
+            visited.add(url)
+        assert all(url in visited for url in urls)
+        false_positives = sum(f"https://other.com/{i}" in visited for i in range(5000))
+        assert false_positives / 5000 < 0.02
+    
+    def test_scraper_uses_configured_backend(self, monkeypatch):
+        """Test visited backend is selected from config"""
+        monkeypatch.setitem(config.SCRAPER, 'visited_backend', 'fingerprint')
+        scraper = Scraper("https://example.com")
+        assert isinstance(scraper.visited, FingerprintSet)
+        assert "https://example.com" in scraper.visited
+        stats = scraper.visited_memory_stats()
+        assert stats['backend'] == 'fingerprint'
+        assert stats['urls'] == 1
+
+
+@pytest.mark.unit
+@pytest.mark.scraper
+class TestWorkerScheduling:
+    """Test event-driven worker wakeups and end-of-crawl detection"""
+    
+    @staticmethod
+    def _fake_crawler(scraper, fanout=3):
+        async def process_page(browser, url, depth):
+            await asyncio.sleep(0.01)
+            await scraper.discover_and_queue_links([f"{url}/c{i}" for i in range(fanout)], depth)
+        scraper.process_page = process_page
+    
+    async def test_workers_exit_when_frontier_exhausted(self):
+        """Test workers stop once frontier is empty and no page is in flight"""
+        scraper = Scraper("https://example.com", max_pages=1000, max_depth=2)
+        self._fake_crawler(scraper)
+        await asyncio.wait_for(
+            asyncio.gather(*[scraper.worker(None, i) for i in range(4)]),
+            timeout=5
+        )
+        assert scraper.pages_scraped == 13
+        assert scraper.active_workers == 0
+    
+    async def test_sqlite_frontier_runs_off_event_loop(self, tmp_path):
+        """Test a crawl on the SQLite frontier does its I/O on the frontier thread"""
+        scraper = Scraper("https://example.com", max_pages=1000, max_depth=2,
+                          base_dir=str(tmp_path), frontier='sqlite')
+        self._fake_crawler(scraper)
+        
+        threads = set()
+        pop = scraper.frontier.pop
+        def traced_pop():
+            threads.add(threading.current_thread().name)
+            return pop()
+        scraper.frontier.pop = traced_pop
+        
+        await asyncio.wait_for(
+            asyncio.gather(*[scraper.worker(None, i) for i in range(4)]),
+            timeout=5
+        )
+        assert scraper.pages_scraped == 13
+        assert all(name.startswith("frontier") for name in threads)
+        assert await scraper.known_urls(["https://example.com/c0/c1", "https://other.com"]) == {
+            "https://example.com/c0/c1"
+        }
+        scraper.frontier.executor.shutdown(wait=True)
+    
+    def test_frontier_completes_after_commit(self):
+        """Test a URL whose page is still being written is not marked done"""
+        scraper = Scraper("https://example.com")
+        completed = []
+        scraper.frontier.complete = completed.append
+        scraper._completion_holds["https://example.com/a"] = 2
+        scraper._awaiting_commit["https://example.com/a/"] = ["https://example.com/a"]
+        
+        scraper._release_completion("https://example.com/a")
+        assert completed == []
+        scraper._complete_settled_pages(["https://example.com/a/"])
+        assert completed == ["https://example.com/a"]
+        assert not scraper._completion_holds and not scraper._awaiting_commit
+    
+    async def test_pause_and_stop_take_effect_immediately(self):
+        """Test paused workers wake on stop without polling"""
+        scraper = Scraper("https://example.com", max_pages=1000, max_depth=10)
+        self._fake_crawler(scraper)
+        workers = asyncio.gather(*[scraper.worker(None, i) for i in range(4)])
+        await asyncio.sleep(0.05)
+        scraper.is_paused = True
+        await asyncio.sleep(0.05)
+        paused_count = scraper.pages_scraped
+        await asyncio.sleep(0.05)
+        assert scraper.pages_scraped == paused_count
+        scraper.should_stop = True
+        await asyncio.wait_for(workers, timeout=0.5)
+    
+    async def test_shard_worker_waits_for_coordinator(self):
+        """Test a shard worker reports links and only exits once told to finish"""
+        results = queue.Queue()
+        scraper = Scraper("https://example.com", max_pages=1000, max_depth=1)
+        scraper.frontier = ShardFrontier(0, results)
+        self._fake_crawler(scraper, fanout=2)
+        scraper.frontier.feed("https://example.com", 0)
+        worker = asyncio.ensure_future(scraper.worker(None, 1))
+        await asyncio.sleep(0.1)
+        assert not worker.done()
+        assert results.get_nowait() == ('links', 0, ["https://example.com/c0", "https://example.com/c1"], 1)
+        assert results.get_nowait() == ('done', 0, "https://example.com")
+        scraper.frontier.accepting = False
+        scraper._notify_workers()
+        await asyncio.wait_for(worker, timeout=0.5)
+
+
+@pytest.mark.unit
+@pytest.mark.scraper
+class TestShardCoordinator:
+    """Test the sharded-crawl coordinator against in-process fake shards"""
+    
+    @staticmethod
+    def _fake_shards(scraper, fanout=2, respond=True, on_crawl=None):
+        # Each fake shard is a thread speaking the coordinator protocol: it
+        # sends links and a page record per URL, and reports the URL done
+        # once the coordinator says the record is settled.
+        received = {}
+        
+        def start_shard(shard_id, num_shards, task_queue, result_queue):
+            received[shard_id] = []
+            
+            def run():
+                while True:
+                    message = task_queue.get()
+                    received[shard_id].append(message)
+                    kind = message[0]
+                    if kind in ('finish', 'stop'):
+                        return
+                    if kind == 'crawl' and on_crawl:
+                        on_crawl(shard_id, result_queue)
+                    if kind == 'crawl' and respond:
+                        url, depth = message[1], message[2]
+                        if depth < scraper.max_depth:
+                            result_queue.put(('links', shard_id, [f"{url}/c{i}" for i in range(fanout)], depth + 1))
+                        result_queue.put(('page', shard_id, page_record(url, depth=depth)))
+                    elif kind == 'settled':
+                        for url in message[1]:
+                            result_queue.put(('done', shard_id, url))
+            
+            thread = threading.Thread(target=run, daemon=True)
+            thread.start()
+            return thread
+        
+        scraper._start_shard = start_shard
+        return received
+    
+    async def test_pages_dispatched_written_once_and_completed(self, tmp_path):
+        """Test URLs are spread over shards and every page goes through one writer"""
+        scraper = Scraper("https://example.com", max_pages=100, max_depth=2, base_dir=str(tmp_path),
+                          frontier='sqlite', worker_processes=2, concurrent_limit=1)
+        received = self._fake_shards(scraper)
+        
+        await asyncio.wait_for(scraper._run_sharded(), timeout=10)
+        
+        assert scraper.pages_scraped == 7
+        crawled = {shard_id: [m[1] for m in messages if m[0] == 'crawl'] for shard_id, messages in received.items()}
+        assert all(crawled.values())
+        assert sorted(sum(crawled.values(), [])) == sorted(
+            ["https://example.com"] +
+            [f"https://example.com/c{i}" for i in range(2)] +
+            [f"https://example.com/c{i}/c{j}" for i in range(2) for j in range(2)]
+        )
+        assert all(messages[-1] == ('finish',) for messages in received.values())
+        assert scraper.db_writer.stats['pages_written'] == 7
+        conn = sqlite3.connect(scraper.db_path)
+        assert conn.execute('SELECT COUNT(*) FROM pages').fetchone()[0] == 7
+        assert conn.execute("SELECT COUNT(*) FROM crawl_frontier WHERE state = 'done'").fetchone()[0] == 7
+        conn.close()
+    
+    async def test_stop_and_captcha_pause_reach_every_shard(self, tmp_path):
+        """Test a captcha pause in one shard pauses the others and stop ends the crawl"""
+        scraper = Scraper("https://example.com", max_pages=100, max_depth=2, base_dir=str(tmp_path),
+                          worker_processes=2, concurrent_limit=1)
+        
+        def pause_on_crawl(shard_id, result_queue):
+            result_queue.put(('pause', shard_id, True))
+        
+        received = self._fake_shards(scraper, respond=False, on_crawl=pause_on_crawl)
+        coordinator = asyncio.ensure_future(scraper._run_sharded())
+        
+        for _ in range(100):
+            if scraper.is_paused and all(('pause',) in messages for messages in received.values()):
+                break
+            await asyncio.sleep(0.02)
+        assert scraper.is_paused
+        assert all(('pause',) in messages for messages in received.values())
+        
+        scraper.should_stop = True
+        await asyncio.wait_for(coordinator, timeout=5)
+        assert all(messages[-1] == ('stop',) for messages in received.values())
+        assert not any(('finish',) in messages for messages in received.values())
+
+
+@pytest.mark.unit
+@pytest.mark.scraper
+class TestBrowserContextPool:
+    """Test browser context reuse and rotation"""
+    
+    class FakeContext:
+        def __init__(self):
+            self.closed = False
+        
+        async def close(self):
+            self.closed = True
+    
+    def _pool(self, **kwargs):
+        async def create_context(browser, proxy=None, storage_state=None):
+            return self.FakeContext(), {"proxy": proxy}
+        return BrowserContextPool(create_context, **kwargs)
+    
+    async def test_context_reused_until_page_limit(self):
+        """Test a context is reused for N pages then rotated"""
+        pool = self._pool(max_pages=2)
+        first = await pool.acquire(None)
+        await pool.release(first)
+        second = await pool.acquire(None)
+        assert second is first
+        await pool.release(second)
+        assert first.context.closed
+        third = await pool.acquire(None)
+        assert third is not first
+        assert pool.stats == {'created': 2, 'reused': 1, 'discarded': 0}
+    
+    async def test_contexts_are_keyed_by_proxy(self):
+        """Test contexts are not shared across proxies"""
+        pool = self._pool()
+        direct = await pool.acquire(None)
+        await pool.release(direct)
+        proxied = await pool.acquire(None, "http://proxy:8080")
+        assert proxied is not direct
+        assert proxied.fingerprint == {"proxy": "http://proxy:8080"}
+    
+    async def test_failed_context_is_discarded(self):
+        """Test a context that served a failed page is closed"""
+        pool = self._pool()
+        pooled = await pool.acquire(None)
+        await pool.release(pooled, discard=True)
+        assert pooled.context.closed
+        assert (await pool.acquire(None)) is not pooled
+    
+    async def test_context_rotated_after_max_age(self):
+        """Test idle contexts older than max age are not reused"""
+        pool = self._pool(max_age_seconds=0)
+        pooled = await pool.acquire(None)
+        await pool.release(pooled)
+        assert pooled.context.closed
+        assert (await pool.acquire(None)) is not pooled
+
+
+@pytest.mark.unit
+@pytest.mark.scraper
+class TestHostScheduler:
+    """Test per-host rate limiting and adaptive concurrency"""
+    
+    async def test_rate_limit_spaces_requests(self):
+        """Test token bucket spaces requests beyond the burst"""
+        scheduler = HostScheduler(requests_per_second=20, burst=1, max_in_flight=10)
+        started = asyncio.get_event_loop().time()
+        for _ in range(3):
+            await scheduler.acquire("https://example.com/page")
+        elapsed = asyncio.get_event_loop().time() - started
+        assert elapsed >= 0.09
+    
+    async def test_in_flight_limit_blocks_until_release(self):
+        """Test a host never exceeds its in-flight limit"""
+        scheduler = HostScheduler(requests_per_second=1000, burst=10, max_in_flight=1)
+        await scheduler.acquire("https://example.com/a")
+        waiter = asyncio.ensure_future(scheduler.acquire("https://example.com/b"))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        await scheduler.acquire("https://other.com/a")
+        scheduler.release("https://example.com/a", 200, 0.1)
+        await asyncio.wait_for(waiter, timeout=0.5)
+    
+    def test_backoff_status_shrinks_and_recovers(self):
+        """Test 429 halves concurrency and healthy responses grow it back"""
+        scheduler = HostScheduler(max_in_flight=8, recovery_successes=2)
+        scheduler._state("https://example.com").in_flight = 1
+        scheduler.release("https://example.com", 429, 0.1, retry_after=0)
+        assert scheduler.stats()["example.com"]["limit"] == 4
+        for _ in range(4):
+            scheduler.release("https://example.com", 200, 0.1)
+        assert scheduler.stats()["example.com"]["limit"] == 6
+    
+    def test_latency_spike_reduces_concurrency(self):
+        """Test a response much slower than the host average lowers the limit"""
+        scheduler = HostScheduler(max_in_flight=4, latency_threshold_factor=2.0)
+        for _ in range(5):
+            scheduler.release("https://example.com", 200, 0.1)
+        scheduler.release("https://example.com", 200, 1.0)
+        assert scheduler.stats()["example.com"]["limit"] == 3
+    
+    async def test_host_slot_held_until_page_processed(self, monkeypatch):
+        """Test the host slot covers extraction while latency only times navigation"""
+        class FakeResponse:
+            status = 200
+            headers = {}
+        
+        class FakePage:
+            async def goto(self, url, **kwargs):
+                return FakeResponse()
+            
+            async def close(self):
+                pass
+        
+        class FakeContext:
+            async def new_page(self):
+                return FakePage()
+        
+        scraper = Scraper("https://example.com")
+        scraper.host_scheduler = HostScheduler(requests_per_second=1000, burst=10, max_in_flight=4)
+        in_flight_during_extraction = []
+        
+        async def acquire(browser, proxy, storage_state=None):
+            return PooledContext(FakeContext(), {}, None)
+        
+        async def release(pooled, discard=False):
+            pass
+        
+        async def extract(page, depth, proxy, fingerprint, frontier_url=None):
+            in_flight_during_extraction.append(scraper.host_scheduler.stats()["example.com"]["in_flight"])
+            await asyncio.sleep(0.2)
+            return [], depth
+        
+        async def no_captcha(page):
+            return False
+        
+        async def no_scroll(page):
+            pass
+        
+        monkeypatch.setattr(scraper.context_pool, "acquire", acquire)
+        monkeypatch.setattr(scraper.context_pool, "release", release)
+        monkeypatch.setattr(scraper, "detect_captcha", no_captcha)
+        monkeypatch.setattr(scraper, "smart_scroll", no_scroll)
+        monkeypatch.setattr(scraper, "extract_and_save_data", extract)
+        
+        await scraper.process_page(None, "https://example.com/a", 0)
+        stats = scraper.host_scheduler.stats()["example.com"]
+        assert in_flight_during_extraction == [1]
+        assert stats["in_flight"] == 0
+        assert stats["avg_latency"] < 0.1
+
+
+@pytest.mark.unit
+@pytest.mark.scraper
+class TestPageExtraction:
+    """Test single-roundtrip page extraction post-processing"""
+    
+    class FakePage:
+        url = "https://example.com/docs/page"
+        
+        def __init__(self, payload):
+            self.payload = payload
+            self.evaluate_calls = 0
+        
+        async def evaluate(self, script, *args):
+            self.evaluate_calls += 1
+            if script == PAGE_EXTRACTION_SCRIPT:
+                return self.payload
+            return []
+    
+    def _payload(self, **overrides):
+        payload = {
+            "title": "Docs",
+            "description": None,
+            "has_description": False,
+            "headers": {"h1": ["Welcome"], "h2": [], "h3": []},
+            "links": ["/about", "guide", "https://other.org/x", "mailto:a@b.c"],
+            "images": [
+                {"src": "/logo.png", "alt": "Logo"},
+                {"src": "//cdn.example.com/a.png", "alt": ""},
+                {"src": None, "alt": ""},
+            ],
+            "json_ld": ['{"@type": "Article"}', "not json"],
+            "full_text": "Welcome to the docs",
+        }
+        payload.update(overrides)
+        return payload
+    
+    async def test_links_resolved_and_classified(self, tmp_path):
+        """Test raw hrefs are resolved against the page URL and split by domain"""
+        scraper = Scraper("https://example.com", base_dir=str(tmp_path), download_file_assets=False)
+        scraper.enable_diff_tracking = False
+        page = self.FakePage(self._payload())
+        internal_links, depth = await scraper.extract_and_save_data(page, 1, None, {})
+        await scraper.db_writer.close()
+        assert internal_links == ["https://example.com/about", "https://example.com/docs/guide"]
+        assert depth == 1
+        assert page.evaluate_calls == 2
+    
+    async def test_page_fields_saved(self, tmp_path):
+        """Test payload fields land in the database with the old defaults"""
+        scraper = Scraper("https://example.com", base_dir=str(tmp_path), download_file_assets=False)
+        scraper.enable_diff_tracking = False
+        await scraper.extract_and_save_data(self.FakePage(self._payload()), 0, None, {})
+        await scraper.db_writer.close()
+        conn = sqlite3.connect(scraper.db_path)
+        assert conn.execute("SELECT title, description FROM pages").fetchone() == ("Docs", "No description")
+        assert sorted(row[0] for row in conn.execute("SELECT src FROM media")) == [
+            "https://cdn.example.com/a.png", "https://example.com/logo.png"
+        ]
+        assert conn.execute("SELECT COUNT(*) FROM structured_data").fetchone()[0] == 1
+        conn.close()
+    
+    def test_file_links_from_payload(self):
+        """Test file candidates are resolved, filtered and de-duplicated"""
+        scraper = Scraper("https://example.com")
+        payload = self._payload(files=[
+            {"href": "/r/Report.PDF", "text": "Annual Report!"},
+            {"href": "https://example.com/r/Report.PDF", "text": ""},
+            {"href": "data.csv", "text": ""},
+            {"href": "page.html", "text": "Not a file"},
+        ])
+        file_links = scraper._extract_file_links(payload, "https://example.com/docs/page")
+        assert file_links == [
+            {"url": "https://example.com/r/Report.PDF", "link_text": "Annual Report"},
+            {"url": "https://example.com/docs/data.csv", "link_text": ""},
+        ]
+
+
+@pytest.mark.unit
+@pytest.mark.scraper
+class TestPageWriter:
+    """Test batched page persistence"""
+    
+    def test_single_page_commits_child_rows(self, tmp_path):
+        """Test a page and its child rows are committed together"""
+        db_path = crawl_db(tmp_path)
+        writer = PageWriter(db_path)
+        committed = writer.write_page(page_record("https://example.com/p"))
+        assert [(r["url"], r["existing"]) for r in committed] == [("https://example.com/p", False)]
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("SELECT COUNT(*) FROM headers").fetchone()[0] == 2
+        assert conn.execute("SELECT COUNT(*) FROM links").fetchone()[0] == 2
+        assert dict(conn.execute("SELECT field_name, field_type FROM custom_extracted_data")) == {
+            "price": "float", "tags": "list"
+        }
+        conn.close()
+        writer.close()
+    
+    def test_group_commit_defers_until_flush(self, tmp_path):
+        """Test grouped pages stay invisible to other connections until committed"""
+        db_path = crawl_db(tmp_path)
+        writer = PageWriter(db_path, group_commit_pages=3, group_commit_seconds=60)
+        assert writer.write_page(page_record("https://example.com/1")) == []
+        assert writer.write_page(page_record("https://example.com/2")) == []
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0] == 0
+        committed = writer.write_page(page_record("https://example.com/3"))
+        assert len(committed) == 3
+        assert conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0] == 3
+        conn.close()
+        writer.close()
+    
+    def test_duplicate_url_does_not_abort_group(self, tmp_path):
+        """Test a duplicate URL only rolls back its own page"""
+        db_path = crawl_db(tmp_path)
+        writer = PageWriter(db_path, group_commit_pages=10, group_commit_seconds=60)
+        writer.write_page(page_record("https://example.com/1"))
+        writer.write_page(page_record("https://example.com/1", title="Again"))
+        writer.write_page(page_record("https://example.com/2"))
+        committed = writer.close()
+        assert [r["existing"] for r in committed] == [False, True, False]
+        assert committed[0]["page_id"] == committed[1]["page_id"]
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("SELECT title FROM pages WHERE url = ?", ("https://example.com/1",)).fetchone() == ("T",)
+        assert conn.execute("SELECT COUNT(*) FROM headers").fetchone()[0] == 4
+        conn.close()
+    
+    def test_commits_bump_write_generation(self, tmp_path):
+        """Test every group commit advances the write generation once"""
+        db_path = crawl_db(tmp_path)
+        writer = PageWriter(db_path, group_commit_pages=2, group_commit_seconds=60)
+        conn = sqlite3.connect(db_path)
+        generation = lambda: conn.execute("SELECT generation FROM write_generation").fetchone()[0]
+        start = generation()
+        writer.write_page(page_record("https://example.com/1"))
+        assert generation() == start
+        writer.write_page(page_record("https://example.com/2"))
+        assert generation() == start + 1
+        writer.close()
+        assert generation() == start + 1
+        conn.close()
+    
+    async def test_async_writer_commits_batches(self, tmp_path):
+        """Test queued pages are committed by the writer thread and reported back"""
+        db_path = crawl_db(tmp_path)
+        committed_urls = []
+        writer = DatabaseWriter(
+            PageWriter(db_path, group_commit_pages=10),
+            after_commit=lambda committed: [r["url"] for r in committed],
+            on_results=committed_urls.extend
+        )
+        for i in range(5):
+            await writer.submit(page_record(f"https://example.com/{i}"))
+        await writer.close()
+        assert sorted(committed_urls) == [f"https://example.com/{i}" for i in range(5)]
+        assert writer.stats["pages_written"] == 5
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0] == 5
+        conn.close()
+    
+    async def test_async_writer_applies_backpressure(self, tmp_path):
+        """Test submit blocks once the queue is full"""
+        db_path = crawl_db(tmp_path)
+        release = threading.Event()
+        writer = DatabaseWriter(
+            PageWriter(db_path),
+            queue_size=1,
+            after_commit=lambda committed: release.wait(5)
+        )
+        await writer.submit(page_record("https://example.com/1"))
+        await asyncio.sleep(0.05)
+        await writer.submit(page_record("https://example.com/2"))
+        blocked = asyncio.create_task(writer.submit(page_record("https://example.com/3")))
+        await asyncio.sleep(0.05)
+        assert not blocked.done()
+        release.set()
+        await asyncio.wait_for(blocked, 5)
+        await writer.close()
+        assert writer.stats["pages_written"] == 3
+    
+    async def test_async_writer_skips_failed_record(self, tmp_path):
+        """Test one bad record is dropped without losing the rest of its batch"""
+        db_path = crawl_db(tmp_path)
+        settled = []
+        writer = DatabaseWriter(
+            PageWriter(db_path, group_commit_pages=10),
+            after_commit=lambda committed: [r["url"] for r in committed],
+            on_settled=settled.extend
+        )
+        bad = page_record("https://example.com/bad")
+        bad["headers"] = None
+        for record in [page_record("https://example.com/1"), bad, page_record("https://example.com/2")]:
+            await writer.submit(record)
+        await writer.close()
+        assert sorted(settled) == ["https://example.com/1", "https://example.com/2", "https://example.com/bad"]
+        assert writer.stats["pages_written"] == 2
+        assert writer.stats["errors"] == 1
+
+
+@pytest.mark.unit
+@pytest.mark.scraper
+class TestPageTextStore:
+    """Test content-addressed page text storage"""
+    
+    def _write(self, db_path, url, text):
+        writer = PageWriter(db_path)
+        committed = writer.write_page(page_record(url, full_text=text))
+        writer.close()
+        return committed[0]["page_id"]
+    
+    def test_identical_text_is_stored_once(self, tmp_path):
+        """Test pages with the same body share one compressed blob"""
+        db_path = crawl_db(tmp_path)
+        text = "same body text " * 200
+        self._write(db_path, "https://example.com/a", text)
+        self._write(db_path, "https://example.com/b", text)
+        conn = connect_database(db_path)
+        assert conn.execute("SELECT COUNT(*) FROM page_texts").fetchone()[0] == 1
+        size, stored = conn.execute("SELECT size, length(data) FROM page_texts").fetchone()
+        assert size == len(text) and stored < size
+        assert "full_text" not in [row[1] for row in conn.execute("PRAGMA table_info(pages)")]
+        texts = conn.execute(
+            "SELECT page_text(t.codec, t.data) FROM pages p JOIN page_texts t ON t.hash = p.text_hash"
+        ).fetchall()
+        assert texts == [(text,), (text,)]
+        conn.close()
+    
+    def test_prune_keeps_text_of_snapshots(self, tmp_path):
+        """Test a deleted page's text stays while a diff snapshot refers to it"""
+        db_path = crawl_db(tmp_path)
+        page_id = self._write(db_path, "https://example.com/a", "snapshot text")
+        DiffTracker(db_path).create_snapshot(page_id)
+        conn = connect_database(db_path)
+        conn.execute("DELETE FROM pages WHERE id = ?", (page_id,))
+        conn.execute(scraper_module.PRUNE_PAGE_TEXTS_SQL)
+        assert conn.execute("SELECT COUNT(*) FROM page_texts").fetchone()[0] == 1
+        
+        conn.execute("DELETE FROM page_snapshots")
+        conn.execute(scraper_module.PRUNE_PAGE_TEXTS_SQL)
+        assert conn.execute("SELECT COUNT(*) FROM page_texts").fetchone()[0] == 0
+        conn.close()
+    
+    def test_zlib_fallback(self, tmp_path, monkeypatch):
+        """Test text is zlib-compressed when zstandard is unavailable"""
+        monkeypatch.setattr(scraper_module, "ZSTD_AVAILABLE", False)
+        db_path = crawl_db(tmp_path)
+        self._write(db_path, "https://example.com/a", "fallback text")
+        conn = connect_database(db_path)
+        assert conn.execute("SELECT codec FROM page_texts").fetchone() == ("zlib",)
+        text_hash = conn.execute("SELECT text_hash FROM pages").fetchone()[0]
+        assert load_page_text(conn.cursor(), text_hash) == "fallback text"
+        conn.close()
+    
+    def test_migration_moves_inline_text(self, tmp_path):
+        """Test text stored inline by older versions is moved into the store"""
+        db_path = str(tmp_path / "legacy.db")
+        conn = sqlite3.connect(db_path)
+        for statement in SCHEMA_MIGRATIONS[0][1]:
+            conn.execute(statement)
+        conn.executemany("INSERT INTO pages (url, full_text) VALUES (?, ?)", [
+            ("https://example.com/a", "legacy text"), ("https://example.com/b", ""),
+        ])
+        conn.commit()
+        conn.close()
+        initialize_database(db_path)
+        conn = connect_database(db_path)
+        rows = conn.execute("SELECT url, text_hash FROM pages ORDER BY url").fetchall()
+        assert rows[1][1] is None
+        assert load_page_text(conn.cursor(), rows[0][1]) == "legacy text"
+        assert "full_text" not in [row[1] for row in conn.execute("PRAGMA table_info(pages)")]
+        conn.close()
+    
+    def test_migration_reclaims_space_of_moved_text(self, tmp_path):
+        """Test moving inline text out of pages shrinks the database file"""
+        db_path = str(tmp_path / "legacy.db")
+        conn = sqlite3.connect(db_path)
+        for statement in SCHEMA_MIGRATIONS[0][1]:
+            conn.execute(statement)
+        conn.executemany("INSERT INTO pages (url, full_text) VALUES (?, ?)", [
+            (f"https://example.com/{i}", f"page {i} " + "repeated body text " * 500) for i in range(1200)
+        ])
+        conn.commit()
+        legacy_pages = conn.execute("PRAGMA page_count").fetchone()[0]
+        conn.close()
+        
+        initialize_database(db_path)
+        conn = connect_database(db_path)
+        assert conn.execute("SELECT COUNT(*) FROM pages WHERE text_hash IS NOT NULL").fetchone()[0] == 1200
+        assert conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+        assert conn.execute("PRAGMA page_count").fetchone()[0] < legacy_pages / 4
+        conn.close()
+    
+    def test_generator_migration_commits_each_batch(self, tmp_path):
+        """Test a migration that yields commits the work done before every yield"""
+        db_path = str(tmp_path / "batches.db")
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        conn.execute("CREATE TABLE items (n INTEGER)")
+        reader = sqlite3.connect(db_path)
+        visible = []
+        
+        def migrate(conn):
+            for n in range(3):
+                conn.execute("INSERT INTO items VALUES (?)", (n,))
+                yield
+                visible.append(reader.execute("SELECT COUNT(*) FROM items").fetchone()[0])
+        
+        conn.execute("BEGIN IMMEDIATE")
+        assert scraper_module._run_migration(conn, 1, [migrate]) is True
+        conn.execute("COMMIT")
+        assert visible == [1, 2, 3]
+        reader.close()
+        conn.close()
+    
+    def test_diff_tracker_reads_previous_text_from_store(self, tmp_path):
+        """Test a text change is reported with the old and new bodies"""
+        scraper = Scraper("https://example.com", base_dir=str(tmp_path))
+        url = "https://example.com/a"
+        page_id = self._write(scraper.db_path, url, "first version of the page")
+        assert scraper.diff_tracker.detect_changes(url, page_id)["is_first_scrape"]
+        conn = connect_database(scraper.db_path)
+        conn.execute("DELETE FROM pages WHERE id = ?", (page_id,))
+        conn.commit()
+        conn.close()
+        page_id = self._write(scraper.db_path, url, "a completely different body")
+        changes = scraper.diff_tracker.detect_changes(url, page_id)
+        text_change = [c for c in changes["changes"] if c["category"] == "full_text"][0]
+        assert text_change["old_value"] == "first version of the page"
+        assert text_change["new_value"] == "a completely different body"
+
+
+@pytest.mark.unit
+@pytest.mark.scraper
+class TestContentSearch:
+    """Test the FTS5 page search index"""
+    
+    SEARCH_SQL = """
+        SELECT p.url, snippet(pages_fts, 1, '<mark>', '</mark>', '...', 8)
+        FROM pages_fts JOIN pages p ON p.id = pages_fts.rowid
+        WHERE pages_fts MATCH ?
+        ORDER BY bm25(pages_fts, 10.0, 1.0)
+    """
+    
+    def _db(self, tmp_path, pages):
+        records = [page_record(url, title=title, full_text=text) for url, title, text in pages]
+        return connect_database(crawl_db(tmp_path, records, group_commit_pages=len(pages)))
+    
+    def test_build_fts_query(self):
+        """Test user input is turned into quoted FTS5 terms"""
+        assert build_fts_query('"quick brown" fox') == '"quick brown" "fox"'
+        assert build_fts_query("jum*") == '"jum"*'
+        assert build_fts_query("C++ foo-bar") == '"C" "foo bar"'
+        assert build_fts_query("  ") is None
+    
+    def test_phrase_prefix_and_ranking(self, tmp_path):
+        """Test phrase and prefix queries, title weighting and snippets"""
+        conn = self._db(tmp_path, [
+            ("https://example.com/body", "Other", "the quick brown fox jumps over the lazy dog"),
+            ("https://example.com/title", "Brown foxes", "nothing to see"),
+            ("https://example.com/split", "Split", "brown paper and a quick exit"),
+        ])
+        phrase = conn.execute(self.SEARCH_SQL, (build_fts_query('"quick brown"'),)).fetchall()
+        assert [row[0] for row in phrase] == ["https://example.com/body"]
+        assert phrase[0][1].startswith("the <mark>quick brown</mark> fox")
+        prefix = [row[0] for row in conn.execute(self.SEARCH_SQL, (build_fts_query("fox*"),))]
+        assert prefix == ["https://example.com/title", "https://example.com/body"]
+        conn.close()
+    
+    def test_deleted_pages_leave_the_index(self, tmp_path):
+        """Test the delete trigger keeps the index in sync"""
+        conn = self._db(tmp_path, [
+            ("https://example.com/a", "A", "searchable words"),
+            ("https://example.com/b", "B", "searchable too"),
+        ])
+        conn.execute("DELETE FROM pages WHERE url = ?", ("https://example.com/a",))
+        conn.commit()
+        rows = conn.execute(self.SEARCH_SQL, (build_fts_query("searchable"),)).fetchall()
+        assert [row[0] for row in rows] == ["https://example.com/b"]
+        conn.execute("INSERT INTO pages_fts (pages_fts, rank) VALUES ('integrity-check', 1)")
+        conn.close()
+    
+    def test_migration_indexes_existing_pages(self, tmp_path):
+        """Test pages stored before the index existed become searchable"""
+        db_path = str(tmp_path / "legacy.db")
+        conn = sqlite3.connect(db_path)
+        for statement in SCHEMA_MIGRATIONS[0][1]:
+            conn.execute(statement)
+        conn.execute("INSERT INTO pages (url, title, full_text) VALUES (?, ?, ?)",
+                     ("https://example.com/old", "Old", "archived content"))
+        conn.commit()
+        conn.close()
+        initialize_database(db_path)
+        conn = connect_database(db_path)
+        assert conn.execute(self.SEARCH_SQL, (build_fts_query("archived"),)).fetchall() == [
+            ("https://example.com/old", "<mark>archived</mark> content")
+        ]
+        conn.close()
+
+
+@pytest.mark.unit
+@pytest.mark.scraper
+class TestFileSearchIndex:
+    """Test the trigram file-name index and the file search query"""
+    
+    def _db(self, tmp_path):
+        conn = connect_database(crawl_db(tmp_path))
+        conn.executemany("INSERT INTO pages (id, url, domain) VALUES (?, ?, ?)", [
+            (1, "https://docs.example.com/a", "https://docs.example.com"),
+            (2, "https://other.org/b", "https://other.org"),
+        ])
+        conn.executemany('''
+            INSERT INTO file_assets (page_id, file_name, file_extension, download_status,
+                                     file_size_bytes, download_timestamp)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [
+            (1, "Annual_Report_2023.PDF", ".PDF", "success", 5000, 1.0),
+            (2, "report-draft.pdf", ".pdf", "failed", 0, 2.0),
+            (1, "data.csv", ".csv", "success", 100, 3.0),
+        ])
+        conn.commit()
+        return conn
+    
+    def _search(self, conn, **filters):
+        sql, params = build_file_search_query(**filters)
+        return [row[0] for row in conn.execute(sql, params)]
+    
+    def test_substring_match_is_case_insensitive(self, tmp_path):
+        """Test trigram MATCH finds substrings anywhere in the name"""
+        conn = self._db(tmp_path)
+        assert self._search(conn, keyword="REPORT") == ["report-draft.pdf", "Annual_Report_2023.PDF"]
+        assert self._search(conn, keyword="al_rep") == ["Annual_Report_2023.PDF"]
+        assert self._search(conn, keyword="da") == ["data.csv"]
+        assert build_trigram_query("ab") is None
+        conn.close()
+    
+    def test_filters_combine_with_keyword(self, tmp_path):
+        """Test extension, domain, status and size filters narrow the matches"""
+        conn = self._db(tmp_path)
+        assert self._search(conn, keyword="report", extension="PDF", domain="example.com") == [
+            "Annual_Report_2023.PDF"
+        ]
+        assert self._search(conn, domain="docs.example.com", status="success", max_size=1000) == ["data.csv"]
+        assert self._search(conn, domain="ample.com") == []
+        assert self._search(conn, min_size=1, limit=1) == ["data.csv"]
+        conn.close()
+    
+    def test_triggers_follow_updates_and_deletes(self, tmp_path):
+        """Test the index tracks renamed and deleted files"""
+        conn = self._db(tmp_path)
+        conn.execute("UPDATE file_assets SET file_name = 'summary.pdf' WHERE file_name = 'report-draft.pdf'")
+        conn.execute("DELETE FROM file_assets WHERE file_name LIKE 'Annual%'")
+        conn.commit()
+        assert self._search(conn, keyword="report") == []
+        assert self._search(conn, keyword="summary") == ["summary.pdf"]
+        conn.execute("INSERT INTO file_assets_fts (file_assets_fts, rank) VALUES ('integrity-check', 1)")
+        conn.close()
+
+
+@pytest.mark.unit
+@pytest.mark.scraper
+class TestCrawlSessions:
+    """Test the per-domain crawl_sessions summary"""
+    
+    def _db(self, tmp_path):
+        return connect_database(crawl_db(tmp_path, [
+            page_record(url, depth=i, timestamp=100.0 + i, internal_links=[url],
+                        external_links=["https://other.net/"], file_assets=[{
+                            "url": f"{url}.pdf", "filename": "f.pdf", "extension": ".pdf", "size_bytes": 10,
+                            "local_path": None, "status": "failed", "mime_type": None
+                        }])
+            for i, url in enumerate(["https://a.com/1", "https://a.com/2", "https://b.org/1"])
+        ]))
+    
+    def _session(self, conn, domain):
+        return conn.execute('''
+            SELECT total_pages, start_time, end_time, max_depth, total_links, total_files, downloaded_files
+            FROM crawl_sessions WHERE domain = ?
+        ''', (domain,)).fetchone()
+    
+    def test_page_domain(self):
+        """Test the domain key is scheme and host"""
+        assert page_domain("https://Docs.example.com:8443/a?b=1") == "https://Docs.example.com:8443"
+    
+    def test_writes_update_summary(self, tmp_path):
+        """Test pages, links and files are counted per domain"""
+        conn = self._db(tmp_path)
+        assert self._session(conn, "https://a.com") == (2, 100.0, 101.0, 1, 4, 2, 0)
+        assert self._session(conn, "https://b.org") == (1, 102.0, 102.0, 2, 2, 1, 0)
+        conn.close()
+    
+    def test_updates_and_deletes_are_tracked(self, tmp_path):
+        """Test status changes and page deletes keep the summary in step"""
+        conn = self._db(tmp_path)
+        conn.execute("UPDATE file_assets SET download_status = 'success'")
+        page_id = conn.execute("SELECT id FROM pages WHERE url = 'https://a.com/2'").fetchone()[0]
+        for table in ("links", "file_assets"):
+            conn.execute(f"DELETE FROM {table} WHERE page_id = ?", (page_id,))
+        conn.execute("DELETE FROM pages WHERE id = ?", (page_id,))
+        conn.execute("DELETE FROM pages WHERE domain = 'https://b.org'")
+        conn.commit()
+        
+        assert self._session(conn, "https://a.com") == (1, 100.0, 100.0, 0, 2, 1, 1)
+        assert self._session(conn, "https://b.org") is None
+        conn.close()
+    
+    def test_file_without_status_is_not_downloaded(self, tmp_path):
+        """Test a NULL download_status is counted as not downloaded on insert, update and delete"""
+        conn = self._db(tmp_path)
+        page_id = conn.execute("SELECT id FROM pages WHERE url = 'https://a.com/1'").fetchone()[0]
+        conn.execute("INSERT INTO file_assets (page_id, file_size_bytes) VALUES (?, 5)", (page_id,))
+        conn.execute("UPDATE file_assets SET download_status = NULL WHERE page_id = ?", (page_id,))
+        conn.commit()
+        assert self._session(conn, "https://a.com") == (2, 100.0, 101.0, 1, 4, 3, 0)
+        
+        conn.execute("DELETE FROM file_assets WHERE download_status IS NULL")
+        conn.commit()
+        assert self._session(conn, "https://a.com") == (2, 100.0, 101.0, 1, 4, 1, 0)
+        conn.close()
+
+
+@pytest.mark.unit
+@pytest.mark.scraper
+class TestCrawlCounters:
+    """Test the running totals behind /api/data/stats"""
+    
+    def _counters(self, conn):
+        columns = [column for counters in scraper_module.CRAWL_COUNTERS.values() for column, _ in counters]
+        return dict(zip(columns, conn.execute(f"SELECT {', '.join(columns)} FROM crawl_counters").fetchone()))
+    
+    def test_counters_follow_writes_and_deletes(self, tmp_path):
+        """Test triggers keep every counter equal to a full recount"""
+        conn = connect_database(crawl_db(tmp_path))
+        conn.execute("INSERT INTO pages (id, url) VALUES (1, 'https://example.com/a')")
+        conn.executemany("INSERT INTO links (page_id, link_type, url) VALUES (1, ?, 'u')",
+                         [("internal",), ("internal",), ("external",), (None,)])
+        conn.executemany("INSERT INTO file_assets (page_id, download_status, file_size_bytes) VALUES (1, ?, ?)",
+                         [("success", 100), ("failed", None), ("success", 50)])
+        conn.execute("UPDATE file_assets SET download_status = 'failed' WHERE file_size_bytes = 50")
+        conn.execute("DELETE FROM links WHERE link_type = 'external'")
+        conn.commit()
+        
+        counters = self._counters(conn)
+        assert counters["total_pages"] == 1
+        assert (counters["total_links"], counters["internal_links"], counters["external_links"]) == (3, 2, 0)
+        assert (counters["successful_downloads"], counters["failed_downloads"], counters["downloaded_bytes"]) == (1, 2, 100)
+        
+        scraper_module._migrate_crawl_counters(conn)
+        assert self._counters(conn) == counters
+        conn.close()
+
+
+@pytest.mark.unit
+@pytest.mark.scraper
+class TestCrawlRollups:
+    """Test the minute / hour / day rollups behind the timeline charts"""
+    
+    def _rollups(self, conn):
+        return (
+            conn.execute("SELECT * FROM crawl_rollups ORDER BY granularity, bucket").fetchall(),
+            conn.execute("SELECT * FROM crawl_dimension_rollups WHERE pages > 0 "
+                         "ORDER BY granularity, bucket, dimension, value").fetchall(),
+        )
+    
+    def _db(self, tmp_path):
+        db_path = crawl_db(tmp_path)
+        conn = connect_database(db_path)
+        conn.executemany("INSERT INTO pages (id, url, depth, timestamp, proxy_used) VALUES (?, ?, ?, ?, ?)", [
+            (1, "https://example.com/a", 0, 1700000000.5, "proxy-1"),
+            (2, "https://example.com/b", 1, 1700000030.0, None),
+            (3, "https://example.com/c", 1, 1700003700.0, "proxy-1"),
+        ])
+        conn.executemany(
+            "INSERT INTO file_assets (page_id, download_status, file_size_bytes, download_timestamp) VALUES (1, ?, ?, ?)",
+            [("success", 100, 1700000010.0), ("failed", None, 1700000010.0), ("success", 50, 1700003710.0)]
+        )
+        conn.execute("UPDATE file_assets SET download_status = 'failed' WHERE file_size_bytes = 50")
+        conn.execute("DELETE FROM file_assets WHERE file_size_bytes = 100")
+        conn.commit()
+        return db_path, conn
+    
+    def test_rollups_follow_writes(self, tmp_path):
+        """Test triggers bucket pages and files by minute, hour and day"""
+        db_path, conn = self._db(tmp_path)
+        
+        minutes = conn.execute("SELECT bucket, pages, files, downloaded_bytes, failed_downloads FROM crawl_rollups "
+                               "WHERE granularity = 'minute' ORDER BY bucket").fetchall()
+        assert minutes == [(1699999980, 2, 1, 0, 1), (1700003700, 1, 1, 0, 1)]
+        hour = conn.execute("SELECT pages FROM crawl_rollups WHERE granularity = 'hour' AND bucket = 1699999200").fetchone()
+        assert hour == (2,)
+        proxies = conn.execute("SELECT value, SUM(pages) FROM crawl_dimension_rollups "
+                               "WHERE granularity = 'day' AND dimension = 'proxy' GROUP BY value ORDER BY value").fetchall()
+        assert proxies == [("", 1), ("proxy-1", 2)]
+        conn.close()
+    
+    def test_backfill_matches_triggers(self, tmp_path):
+        """Test rebuilding the rollups from the base tables changes nothing"""
+        db_path, conn = self._db(tmp_path)
+        expected = self._rollups(conn)
+        conn.execute("DELETE FROM crawl_rollups")
+        conn.commit()
+        
+        counts = maintenance.rebuild_rollups(db_path)
+        assert counts == {"day": 1, "hour": 2, "minute": 2}
+        assert self._rollups(conn) == expected
+        conn.close()
+
+
+@pytest.mark.unit
+@pytest.mark.scraper
+class TestFingerprintStore:
+    """Test the fingerprints dimension table"""
+    
+    FINGERPRINT = {
+        "viewport": {"width": 1920, "height": 1080},
+        "user_agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
+        "timezone_id": "Europe/Paris",
+        "geolocation": {"latitude": 48.8566, "longitude": 2.3522},
+        "locale": "fr-FR",
+    }
+    
+    def test_pages_share_fingerprint_rows(self, tmp_path):
+        """Test equal fingerprints are stored once with their attributes as columns"""
+        fingerprints = [self.FINGERPRINT, dict(reversed(list(self.FINGERPRINT.items()))), {}]
+        conn = connect_database(crawl_db(tmp_path, [
+            page_record(f"https://example.com/p{i}", fingerprint=fingerprint)
+            for i, fingerprint in enumerate(fingerprints)
+        ]))
+        ids = [row[0] for row in conn.execute("SELECT fingerprint_id FROM pages ORDER BY id")]
+        assert ids[0] == ids[1] and ids[2] is None
+        row = conn.execute("SELECT chrome_version, viewport, timezone_id, locale, city FROM fingerprints").fetchall()
+        assert row == [("121.0.0.0", "1920x1080", "Europe/Paris", "fr-FR", "Paris")]
+        assert conn.execute("SELECT COUNT(*) FROM pages WHERE fingerprint IS NOT NULL").fetchone()[0] == 0
+        conn.close()
+    
+    def test_migration_moves_json_fingerprints(self, tmp_path):
+        """Test existing JSON fingerprints are moved into the table"""
+        conn = connect_database(crawl_db(tmp_path))
+        conn.executemany("INSERT INTO pages (url, fingerprint) VALUES (?, ?)", [
+            ("https://example.com/a", json.dumps(self.FINGERPRINT)),
+            ("https://example.com/b", json.dumps(self.FINGERPRINT)),
+            ("https://example.com/c", "null"),
+        ])
+        scraper_module._migrate_fingerprints(conn)
+        conn.commit()
+        
+        rows = conn.execute("SELECT f.city FROM pages p LEFT JOIN fingerprints f ON f.id = p.fingerprint_id "
+                            "ORDER BY p.id").fetchall()
+        assert rows == [("Paris",), ("Paris",), (None,)]
+        assert conn.execute("SELECT COUNT(*) FROM pages WHERE fingerprint IS NOT NULL").fetchone()[0] == 0
+        conn.close()
+
+
+@pytest.mark.unit
+@pytest.mark.scraper
+class TestColumnarExport:
+    """Test Parquet / Arrow IPC export"""
+    
+    def _db(self, tmp_path, pages=5):
+        return crawl_db(tmp_path, [
+            page_record(f"https://example.com/p{i}", title=f"Page {i}", timestamp=1700000000.0 + i,
+                        internal_links=[f"https://example.com/p{i + 1}"], external_links=[],
+                        custom_data={"price": 9.5 if i % 2 else 10, "in_stock": bool(i % 2), "name": f"Item {i}"})
+            for i in range(pages)
+        ])
+    
+    def test_parquet_row_groups_are_bounded(self, tmp_path):
+        """Test each row group holds at most row_group_size rows"""
+        pq = pytest.importorskip("pyarrow.parquet")
+        db_path = self._db(tmp_path)
+        out = str(tmp_path / "pages.parquet")
+        assert columnar_export.export_table(db_path, "pages", out, row_group_size=2) == 5
+        
+        parquet = pq.ParquetFile(out)
+        assert parquet.metadata.num_row_groups == 3
+        table = parquet.read()
+        assert table.column("url").to_pylist()[0] == "https://example.com/p0"
+        assert str(table.schema.field("timestamp").type) == "timestamp[ms, tz=UTC]"
+        assert "full_text" not in table.column_names
+    
+    def test_extracted_fields_are_pivoted_and_typed(self, tmp_path):
+        """Test custom fields become one typed column each"""
+        ipc = pytest.importorskip("pyarrow.ipc")
+        db_path = self._db(tmp_path)
+        out = str(tmp_path / "extracted.arrow")
+        columnar_export.export_table(db_path, "custom_extracted_data", out, file_format="arrow", row_group_size=2)
+        
+        table = ipc.open_file(out).read_all()
+        assert table.num_rows == 5
+        types = {field.name: str(field.type) for field in table.schema}
+        assert types == {"page_id": "int64", "url": "string", "in_stock": "bool",
+                         "name": "string", "price": "double"}
+        assert table.column("price").to_pylist() == [10.0, 9.5, 10.0, 9.5, 10.0]
+        assert table.column("in_stock").to_pylist()[:2] == [False, True]
+    
+    def test_export_crawl_writes_every_table(self, tmp_path):
+        """Test the CLI entry point writes one dataset per table"""
+        pytest.importorskip("pyarrow")
+        db_path = self._db(tmp_path, pages=2)
+        results = columnar_export.export_crawl(db_path, str(tmp_path / "out"))
+        assert set(results) == set(columnar_export.TABLES)
+        assert results["links"]["rows"] == 2
+        assert all(Path(result["path"]).exists() for result in results.values())
+    
+    def test_extracted_field_named_like_key_column(self, tmp_path):
+        """Test a custom field called url does not overwrite the page URL"""
+        ipc = pytest.importorskip("pyarrow.ipc")
+        db_path = self._db(tmp_path, pages=1)
+        conn = connect_database(db_path)
+        conn.execute("INSERT INTO custom_extracted_data (page_id, field_name, field_value, field_type) "
+                     "VALUES (1, 'url', '/canonical', 'str')")
+        conn.commit()
+        conn.close()
+        out = str(tmp_path / "extracted.arrow")
+        columnar_export.export_table(db_path, "custom_extracted_data", out, file_format="arrow")
+        
+        table = ipc.open_file(out).read_all()
+        assert table.column_names.count("url") == 1
+        assert table.column("url").to_pylist() == ["https://example.com/p0"]
+        assert table.column("custom_url").to_pylist() == ["/canonical"]
+
+
 @pytest.mark.unit
 @pytest.mark.scraper
 class TestScraperConfiguration:
@@ -290,9 +1539,9 @@ class TestScraperConfiguration:
     def test_scraper_queue_initialization(self):
         """Test scraper queue is initialized"""
         scraper = Scraper("https://example.com")
-        assert len(scraper.queue) > 0
-        assert scraper.queue[0][0] == "https://example.com"
-        assert scraper.queue[0][1] == 0  # depth
+        assert len(scraper.frontier) > 0
+        assert scraper.frontier.peek()[0] == "https://example.com"
+        assert scraper.frontier.peek()[1] == 0  # depth
     
     def test_scraper_visited_set_initialization(self):
         """Test visited set is initialized"""
@@ -59,6 +59,36 @@ class TestSearchEndpoints:
         
         # Should handle gracefully
         assert response.status_code in [200, 400, 422]
+    
+    @pytest.mark.asyncio
+    async def test_search_files_with_filters(self, client: httpx.AsyncClient):
+        """Test file search with extension, status, size and domain filters"""
+        search_data = {
+            "keyword": "report",
+            "limit": 10,
+            "extension": "pdf",
+            "status": "success",
+            "min_size": 1,
+            "max_size": 10 * 1024 * 1024,
+            "domain": "example.com"
+        }
+        response = await client.post("/api/data/search/files", json=search_data)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["results"]) <= 10
+        for result in data["results"]:
+            assert result["file_extension"].lower() == ".pdf"
+            assert result["download_status"] == "success"
+            assert 1 <= result["file_size_bytes"] <= 10 * 1024 * 1024
+    
+    @pytest.mark.asyncio
+    async def test_search_files_short_keyword(self, client: httpx.AsyncClient):
+        """Test file search with a keyword too short for the trigram index"""
+        response = await client.post("/api/data/search/files", json={"keyword": "a", "limit": 5})
+        
+        assert response.status_code == 200
+        assert len(response.json()["results"]) <= 5
 
 
 @pytest.mark.unit